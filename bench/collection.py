@@ -0,0 +1,220 @@
+"""Generate a synthetic eXoScummVM collection, IGDB scrape and ports tree for offline benchmarks.
+
+Usage: python -m bench.collection ROOT [--titles 1000] [--seed 0] [--file-kb 16]
+
+Writes ROOT/exo (EXO_DATA_DIR), ROOT/scrapers (SCRAPERS_DATA_DIR), ROOT/ports_src (PORTS_SRC_DIR) and
+ROOT/ports (PORTS_DATA_DIR) and prints the matching environment. Common scales are 1000, 10000 and 50000 titles.
+"""
+
+import argparse
+import json
+import random
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Dict,
+    List,
+    Tuple,
+)
+
+WORDS = (
+    "Monkey Island Tentacle Throttle Loom Quest Secret Curse Legend Kyrandia Sword Broken Temple Shadow Steel "
+    "Sky Amazon Queen Lure Temptress Sam Max Road Indiana Jones Atlantis Fate Zak Maniac Mansion Day Dig Grim "
+    "Simon Sorcerer Discworld Gabriel Knight Blade Runner Riven Journey Lost Crystal Dragon Castle Island Tale"
+).split()
+PLATFORMS = ("DOS", "Amiga", "Windows", "Macintosh", "FM-Towns", "Atari ST")
+DISTROS = ("CD", "Floppy", "DVD")
+SCUMMVM_VERS = ("2.9.0", "2.8.0", "2.7.1")
+GENRES = ("Adventure", "Puzzle", "Point and Click", "Interactive Fiction")
+
+RELEASE_CARD = (
+    "descr:\n  distro:\n    files:\n    format:\n    url:\n  igdb_slug:\n  lang:\n  name:\n  platform:\n"
+    "  publisher:\n  reqs:\n  runner:\n  ts_added:\n  uuid:\n  year_released:\n"
+)
+SCUMMVM_INI = "[scummvm]\nfiltering=${filtering}\nfullscreen=${fullscreen}\nsubtitles=${subtitles}\n"
+RUN_SH = "#!/bin/sh\nexec scummvm -c ${config} -p ${path} --savepath=${save_path} -q ${lang} ${game}\n"
+
+
+@dataclass
+class Title:
+    name: str
+    parent_part: str
+    year: int
+    releases: List[Tuple[str, bool]]  # child_part, has_menu
+    engine_id: str
+    publisher: int
+
+
+def env(root: Path) -> Dict[str, str]:
+    return {
+        "EXO_DATA_DIR": str(root / "exo"),
+        "SCRAPERS_DATA_DIR": str(root / "scrapers"),
+        "PORTS_SRC_DIR": str(root / "ports_src"),
+        "PORTS_DATA_DIR": str(root / "ports"),
+        "DISCORD_HOOK_YAG_NEW_RELEASES_CHANNEL": "http://127.0.0.1:9/hook",
+    }
+
+
+def _titles(rnd: random.Random, count: int) -> List[Title]:
+    res: List[Title] = []
+    seen = set()
+    while len(res) < count:
+        name = " ".join(rnd.sample(WORDS, rnd.randint(2, 4)))
+        if rnd.random() < 0.3:
+            name += f": {rnd.choice(WORDS)} {rnd.choice(('II', 'III', 'Deluxe', 'Special Edition'))}"
+        year = rnd.randint(1984, 2012)
+        parent_part = f"{name.replace(':', '')} ({year})"
+        if parent_part.lower() in seen:
+            continue
+        seen.add(parent_part.lower())
+        releases = []
+        for platform, distro in rnd.sample([(p, d) for p in PLATFORMS for d in DISTROS], rnd.randint(1, 3)):
+            child_part = f"{name.replace(':', '')} ({platform} {distro})"
+            releases.append((child_part, rnd.random() < 0.2))
+        engine_id = "".join(w[0] for w in name.split()).lower() + str(len(res))
+        res.append(Title(name, parent_part, year, releases, engine_id, rnd.randrange(500)))
+    return res
+
+
+def _write_game_zips(rnd: random.Random, root: Path, titles: List[Title], file_kb: int) -> None:
+    game_dir = root / "exo" / "eXoScummVM" / "eXo" / "eXoScummVM"
+    game_dir.mkdir(parents=True, exist_ok=True)
+    for title in titles:
+        with zipfile.ZipFile(game_dir / f"{title.parent_part}.zip", "w", zipfile.ZIP_DEFLATED) as z:
+            z.writestr(f"{title.parent_part}/", "")
+            for child_part, has_menu in title.releases:
+                prefix = f"{title.parent_part}/{child_part}/"
+                z.writestr(prefix, "")
+                z.writestr(f"{prefix}DATA/", "")
+                z.writestr(f"{prefix}DATA/SOUND/", "")
+                if has_menu:
+                    z.writestr(f"{prefix}menu.txt", "1) Play\n2) Setup\n")
+                z.writestr(f"{prefix}{title.engine_id.upper()}.EXE", b"MZ" + rnd.randbytes(1024))
+                for ix in range(rnd.randint(2, 6)):
+                    # half random, half zeros: compresses like real game data does, roughly
+                    size = rnd.randint(file_kb // 2, file_kb * 2) * 1024
+                    data = rnd.randbytes(size // 2) + bytes(size - size // 2)
+                    sub = "DATA/SOUND/" if ix % 2 else "DATA/"
+                    z.writestr(f"{prefix}{sub}RESOURCE.{ix:03d}", data)
+
+
+def _write_metadata(root: Path, titles: List[Title]) -> None:
+    content_dir = root / "exo" / "eXoScummVM" / "Content"
+    content_dir.mkdir(parents=True, exist_ok=True)
+    xml_files: Tuple[List[str], List[str]] = ([], [])
+    for ix, title in enumerate(titles):
+        # the SVN xml carries the newer additions
+        xml_files[ix % 5 == 4].append(
+            "  <Game>\n"
+            f"    <ApplicationPath>eXo\\eXoScummVM\\!scummvm\\{title.parent_part}\\{title.name}.bat</ApplicationPath>\n"
+            f"    <Notes>{'A synthetic description of the game. ' * 10}</Notes>\n"
+            f"    <Publisher>Company {title.publisher}</Publisher>\n"
+            f"    <Rating>E - Everyone</Rating>\n"
+            f"    <ReleaseYear>{title.year}</ReleaseYear>\n"
+            f"    <RootFolder>eXo\\eXoScummVM\\!scummvm\\{title.parent_part}</RootFolder>\n"
+            f"    <Title>{title.name}</Title>\n"
+            f"    <Genre>{'; '.join(GENRES[: 1 + ix % len(GENRES)])}</Genre>\n"
+            "  </Game>\n"
+        )
+    setup = (
+        "  <Game>\n    <RootFolder>eXo\\eXoScummVM</RootFolder>\n    <Title>eXoScummVM</Title>\n"
+        "    <Publisher>eXo</Publisher>\n    <Rating>E</Rating>\n    <ReleaseYear>2020</ReleaseYear>\n"
+        "    <Genre>Utility</Genre>\n  </Game>\n"
+    )
+    with zipfile.ZipFile(content_dir / "XOScummVMMetadata.zip", "w", zipfile.ZIP_DEFLATED) as z:
+        header = '<?xml version="1.0" standalone="yes"?>\n<LaunchBox>\n'
+        z.writestr("xml/all/ScummVM.xml", header + setup + "".join(xml_files[0]) + "</LaunchBox>\n")
+        z.writestr("xml/all/ScummVM SVN.xml", header + "".join(xml_files[1]) + "</LaunchBox>\n")
+
+    util_dir = root / "exo" / "eXoScummVM" / "eXo" / "util"
+    util_dir.mkdir(parents=True, exist_ok=True)
+    lines = []
+    for ix, title in enumerate(titles):
+        ver = SCUMMVM_VERS[ix % len(SCUMMVM_VERS)]
+        lines.append(f"{title.parent_part};{title.engine_id};{ver}\\scummvm.exe")
+        for child_part, _ in title.releases:
+            lines.append(f"{child_part};{title.engine_id};{ver}\\scummvm.exe")
+    with zipfile.ZipFile(util_dir / "utilSVM.zip", "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("scummvm.txt", "\r\n".join(lines) + "\r\n")
+
+
+def _slug(name: str) -> str:
+    return "".join(c if c.isalnum() else "-" for c in name.lower()).strip("-").replace("--", "-")
+
+
+def _write_igdb(rnd: random.Random, root: Path, titles: List[Title], noise: int) -> None:
+    igdb_dir = root / "scrapers" / "igdb"
+    igdb_dir.mkdir(parents=True, exist_ok=True)
+    with open(igdb_dir / "companies.json", "w", encoding="utf-8") as f:
+        json.dump([{"id": ix, "name": f"Company {ix}"} for ix in range(500)], f)
+    games = []
+    for title in titles:
+        # most titles are spelled like in eXo, some differ slightly, a few are missing from IGDB
+        roll = rnd.random()
+        if roll < 0.05:
+            continue
+        name = title.name if roll < 0.8 else title.name.replace(":", " -").replace(" II", " 2")
+        games.append(
+            {
+                "slug": _slug(name),
+                "name": name,
+                "involved_companies": [{"company": title.publisher, "publisher": True}],
+                "genres": [{"name": "Adventure"}],
+                "platforms": [6, 13],
+            }
+        )
+    for ix in range(noise):
+        name = f"{' '.join(rnd.sample(WORDS, rnd.randint(1, 4)))} {ix}"
+        games.append({"slug": f"{_slug(name)}-{ix}", "name": name, "platforms": [rnd.randint(1, 200)]})
+    rnd.shuffle(games)
+    with open(igdb_dir / "games.json", "w", encoding="utf-8") as f:
+        json.dump(games, f)
+
+
+def _write_ports(rnd: random.Random, root: Path, titles: List[Title]) -> None:
+    ports_src = root / "ports_src"
+    for path, text in (
+        (ports_src / "scripts" / "templates" / "release.yaml.tmpl", RELEASE_CARD),
+        (ports_src / "lib" / "scummvm" / "templates" / "scummvm.ini.tmpl", SCUMMVM_INI),
+        (ports_src / "lib" / "scummvm" / "templates" / "run.sh.tmpl", RUN_SH),
+    ):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+    # a tenth of the collection is already ported
+    for title in rnd.sample(titles, len(titles) // 10):
+        slug = _slug(title.name)
+        card_dir = ports_src / "ports" / "games" / slug
+        card_dir.mkdir(parents=True, exist_ok=True)
+        (card_dir / f"{rnd.randbytes(16).hex()}.yaml").write_text(
+            f"descr:\n  igdb_slug: {slug}\n  name: {title.name!r}\n  year_released: {title.year}\n", encoding="utf-8"
+        )
+    (ports_src / "ports" / "games").mkdir(parents=True, exist_ok=True)
+    (root / "ports").mkdir(parents=True, exist_ok=True)
+
+
+def generate(root: Path, titles: int, seed: int = 0, file_kb: int = 16, igdb_noise: int = 0) -> None:
+    """Write a synthetic collection of ``titles`` games to ``root``, the same seed gives the same collection."""
+    rnd = random.Random(seed)  # nosec B311: synthetic data, not a secret
+    games = _titles(rnd, titles)
+    _write_game_zips(rnd, root, games, file_kb)
+    _write_metadata(root, games)
+    _write_igdb(rnd, root, games, igdb_noise if igdb_noise else titles * 5)
+    _write_ports(rnd, root, games)
+    (root / "exo" / "tmp").mkdir(parents=True, exist_ok=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--titles", type=int, default=1000, help="e.g. 1000, 10000 or 50000")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--file-kb", type=int, default=16, help="Typical size of a game data file")
+    args = parser.parse_args()
+    generate(args.root, args.titles, args.seed, args.file_kb)
+    for name, value in env(args.root.resolve()).items():
+        print(f"export {name}={value}")
+
+
+if __name__ == "__main__":
+    main()
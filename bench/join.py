@@ -0,0 +1,97 @@
+"""Benchmark the get_meta joins: case-insensitive dict lookups vs the normalized-key join index.
+
+Usage: python -m bench.join [--games 50000]
+"""
+
+import argparse
+import operator
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Callable,
+    List,
+    Tuple,
+)
+
+from lib.join import (
+    JoinReport,
+    KeyIndex,
+    join_iter,
+)
+
+
+@dataclass
+class Row:
+    parent_part: str
+    value: int
+
+
+def _tables(games: int) -> Tuple[List[Row], List[Row], List[Row]]:
+    rnd = random.Random(0)  # nosec B311: synthetic data, not a secret
+    names = [
+        f"Game {ix} Of The {rnd.choice(('Tentacle', 'Island', 'Sword'))} ({1980 + ix % 30})" for ix in range(games)
+    ]
+    meta0 = [Row(name, ix) for ix, name in enumerate(names)]
+    # the metadata files spell some names in another case and miss a few
+    meta1 = [Row(name.upper() if ix % 7 == 0 else name, ix) for ix, name in enumerate(names) if ix % 50]
+    meta2 = [Row(name.lower() if ix % 5 == 0 else name, ix) for ix, name in enumerate(names) if ix % 40]
+    rnd.shuffle(meta1)
+    rnd.shuffle(meta2)
+    return meta0, meta1, meta2
+
+
+def join_dicts(meta0: List[Row], meta1: List[Row], meta2: List[Row]) -> List[Any]:
+    # what get_meta did before the join index, with the lowercased keys of its case-insensitive dicts
+    meta1_dict = {m.parent_part.lower(): m for m in meta1}
+    meta2_dict = {m.parent_part.lower(): m for m in meta2}
+    res = []
+    missing = []
+    for m0 in meta0:
+        m2 = meta2_dict.get(m0.parent_part.lower())
+        m1 = meta1_dict.get(m0.parent_part.lower())
+        if m1 is None or m2 is None:
+            missing.append(m0.parent_part)
+            continue
+        res.append((m0, m1, m2))
+    return res
+
+
+def join_index(meta0: List[Row], meta1: List[Row], meta2: List[Row]) -> List[Any]:
+    key = operator.attrgetter("parent_part")
+    tables = {"meta1": KeyIndex(meta1, key), "meta2": KeyIndex(meta2, key)}
+    joined = join_iter(meta0, key, tables, JoinReport())
+    return [(m0, m1, m2) for m0, (m1, m2) in joined if m1 is not None and m2 is not None]
+
+
+def _measure(name: str, fn: Callable[[], List[Any]]) -> List[Any]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    res = fn()
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    # timed again without tracemalloc, which slows allocations down
+    start = time.perf_counter()
+    fn()
+    seconds = min(seconds, time.perf_counter() - start)
+    print(f"  {name:20} {seconds * 1000:8.1f}ms {peak / 2**20:8.2f} MiB peak")
+    return res
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=50000)
+    args = parser.parse_args()
+    meta0, meta1, meta2 = _tables(args.games)
+    print(f"{args.games} games")
+    old = _measure("lowercased dict", lambda: join_dicts(meta0, meta1, meta2))
+    new = _measure("KeyIndex", lambda: join_index(meta0, meta1, meta2))
+    if [(a.value, b.value, c.value) for a, b, c in old] != [(a.value, b.value, c.value) for a, b, c in new]:
+        raise SystemExit("ERROR: the join index matched different rows")
+
+
+if __name__ == "__main__":
+    main()
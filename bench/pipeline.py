@@ -0,0 +1,161 @@
+"""Time the ready/steady pipeline stages offline on a synthetic collection (see bench.collection).
+
+Usage: python -m bench.pipeline [--titles 1000] [--dir DIR] [--output results.json] [--baseline old.json]
+
+Every stage runs --repeat times and the fastest run is reported. Results are written as json, with
+--baseline the ratios to an earlier result file are printed as well.
+"""
+
+import argparse
+import contextlib
+import importlib
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Optional,
+)
+
+from bench.collection import (
+    env,
+    generate,
+)
+
+
+def _time(fn: Callable[[], Any], repeat: int, setup: Optional[Callable[[], None]] = None) -> Dict[str, Any]:
+    runs = []
+    items = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        items = fn()
+        runs.append(time.perf_counter() - start)
+    best = min(runs)
+    return {"seconds": best, "runs": runs, "items": items, "items_per_s": items / best if best else None}
+
+
+def run_suite(root: Path, repeat: int, jobs: int, copy_games: int) -> Dict[str, Dict[str, Any]]:
+    os.environ.update(env(root))
+    # these read their data dirs from the environment on import
+    cache_mod = importlib.import_module("lib.cache")
+    exo_scummvm = importlib.import_module("lib.exo.scummvm")
+    igdb = importlib.import_module("lib.yag.igdb")
+    igdb_snapshot = importlib.import_module("lib.yag.igdb_snapshot")
+    ports_index_mod = importlib.import_module("lib.yag.ports_index")
+    match = importlib.import_module("lib.match")
+    ready = importlib.import_module("lib.cmd.ready")
+    ports = importlib.import_module("lib.yag.ports")
+    yag_scummvm = importlib.import_module("lib.yag.scummvm")
+    state = importlib.import_module("lib.state")
+
+    exo_dir = root / "exo"
+    scrapers_dir = root / "scrapers"
+    results = {}
+    results["get_meta"] = _time(lambda: len(exo_scummvm.get_meta(exo_dir)[0]), repeat)
+    cache = cache_mod.FileCache(exo_dir / "tmp" / "bench-parse-cache.json")
+    exo_scummvm.get_meta(exo_dir, cache=cache)
+    results["get_meta_cached"] = _time(lambda: len(exo_scummvm.get_meta(exo_dir, cache=cache)[0]), repeat)
+    results["get_igdb_data"] = _time(lambda: len(igdb.get_data(scrapers_dir)), repeat)
+    snapshot_path = exo_dir / "tmp" / "igdb.snapshot"
+    results["igdb_snapshot_build"] = _time(lambda: igdb_snapshot.build_snapshot(scrapers_dir, snapshot_path), repeat)
+    ports_index = ports_index_mod.get_ports_index(root / "ports_src")
+
+    def gen_state(match_cache: Any = None) -> int:
+        with igdb_snapshot.IgdbSnapshot(snapshot_path) as snapshot:
+            ready.gen_scummvm_state(snapshot, ports_index, jobs=jobs, match_cache=match_cache)
+        with state.StateStore(ready.get_scummvm_state_path()) as store:
+            return len(store)
+
+    results["gen_scummvm_state"] = _time(gen_state, repeat)
+    match_cache_path = exo_dir / "tmp" / "bench-title-match-cache.json"
+    match_cache_path.unlink(missing_ok=True)
+    gen_state(match.MatchCache(match_cache_path))
+    # a fresh cache object per run, loaded from disk like a warm ready run does
+    results["gen_scummvm_state_cached"] = _time(lambda: gen_state(match.MatchCache(match_cache_path)), repeat)
+
+    with state.StateStore(ready.get_scummvm_state_path()) as store:
+        games = [
+            game
+            for game in store.find(min_title_sim_ratio=0.0, max_release_year=9999, scummvm_vers=["2.9.0", "None"])
+            if ports.get_best_release(game.releases) is not None
+        ][:copy_games]
+
+    def clean() -> None:
+        shutil.rmtree(root / "ports" / "apps", ignore_errors=True)
+
+    def copy_data() -> int:
+        for game in games:
+            yag_scummvm.copy_game_data(game, ports.get_best_release(game.releases))
+        return len(games)
+
+    results["copy_game_data"] = _time(copy_data, repeat, setup=clean)
+    return results
+
+
+def _compare(results: Dict[str, Dict[str, Any]], baseline_path: Path) -> None:
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    print(f"{'stage':24} {'baseline':>10} {'now':>10} {'ratio':>7}", file=sys.stderr)
+    for name, res in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]["seconds"]
+        print(f"{name:24} {old:9.3f}s {res['seconds']:9.3f}s {res['seconds'] / old:6.2f}x", file=sys.stderr)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--titles", type=int, default=1000, help="e.g. 1000, 10000 or 50000")
+    parser.add_argument("--dir", type=Path, help="Collection to use, generated there if missing (default: a temp dir)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--jobs", type=int, default=1, help="Title matching processes")
+    parser.add_argument("--copy-games", type=int, default=100, help="Games extracted by the copy_game_data stage")
+    parser.add_argument("--output", type=Path, help="Results json (default: stdout)")
+    parser.add_argument("--baseline", type=Path, help="Earlier results json to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = (args.dir or Path(tmp_dir)).resolve()
+        if not (root / "exo").exists():
+            start = time.perf_counter()
+            generate(root, args.titles, args.seed)
+            print(f"Generated {args.titles} titles in {time.perf_counter() - start:.1f}s: {root}", file=sys.stderr)
+        # keep the pipeline's own messages out of the json on stdout
+        with contextlib.redirect_stdout(sys.stderr):
+            results = run_suite(root, args.repeat, args.jobs, args.copy_games)
+
+    report: Dict[str, Any] = {
+        "meta": {
+            "titles": args.titles,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "jobs": args.jobs,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=4)
+    else:
+        json.dump(report, sys.stdout, indent=4)
+        print()
+    if args.baseline:
+        _compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Benchmark publishing releases against the local stub server: serial one-connection-per-request posts, as
+the pasted curl commands did, vs the asyncio publisher.
+
+Usage: python -m bench.publish [--games 300] [--latency 0.02] [--fail-rate 0.05] [--webhook-rate 50]
+
+The stub enforces --webhook-rate like Discord does (which allows 2.5 messages per second), the publisher is
+run with the same rate.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import socket
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from pathlib import Path
+from typing import (
+    Any,
+    List,
+)
+
+from bench.stub_server import (
+    WEBHOOK_PATH,
+    StubServer,
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _post_serial(url: str, body: bytes, content_type: str) -> None:
+    # a new connection per request and a wait on every 429 or 503, like a shell loop of curl commands
+    while True:
+        req = urllib.request.Request(url, body, {"Content-Type": content_type}, method="POST")
+        try:
+            with urllib.request.urlopen(req) as resp:  # nosec B310: the local stub's http url
+                resp.read()
+                return
+        except urllib.error.HTTPError as e:
+            if e.code not in (429, 503):
+                raise
+            time.sleep(float(e.headers.get("Retry-After", "0.5")))
+
+
+def _write_games(root: Path, games: int, manifest_mod: Any) -> List[Any]:
+    store = manifest_mod.ManifestStore(root / "ports" / "manifests")
+    res = []
+    for ix in range(games):
+        slug = f"game-{ix}"
+        game_uuid = str(uuid.UUID(int=ix))
+        release_path = root / "ports_src" / "ports" / "games" / slug / f"{game_uuid}.yaml"
+        release_path.parent.mkdir(parents=True, exist_ok=True)
+        release_path.write_text(f"name: Game {ix}\nuuid: {game_uuid}\n" + "files:\n  - DATA.001\n" * 64)
+        manifest = manifest_mod.GameManifest(
+            parent_part=f"Game {ix} (1990)",
+            child_part=f"Game {ix} (1990) (DOS)",
+            igdb_slug=slug,
+            uuid=game_uuid,
+            zip_size=0,
+            zip_mtime_ns=0,
+            complete=True,
+            files=[],
+        )
+        store.put(manifest)
+        res.append(manifest)
+    return res
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    parser.add_argument("--webhook-rate", type=float, default=50.0)
+    args = parser.parse_args()
+
+    server = StubServer(_free_port(), args.latency, args.fail_rate, webhook_rate=args.webhook_rate)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start())
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        os.environ.update(
+            {
+                "EXO_DATA_DIR": str(root / "exo"),
+                "PORTS_DATA_DIR": str(root / "ports"),
+                "PORTS_SRC_DIR": str(root / "ports_src"),
+                "SCRAPERS_DATA_DIR": str(root / "scrapers"),
+                "PORTSVC_URL": server.url,
+                "DISCORD_HOOK_YAG_NEW_RELEASES_CHANNEL": server.url + WEBHOOK_PATH,
+            }
+        )
+        # these read their urls and data dirs from the environment on import
+        manifest_mod = importlib.import_module("lib.manifest")
+        publish = importlib.import_module("lib.cmd.publish")
+        games = _write_games(root, args.games, manifest_mod)
+        manifests = manifest_mod.ManifestStore(root / "ports" / "manifests")
+        print(f"{args.games} releases, {args.latency * 1000:.0f}ms latency, {args.fail_rate:.0%} failing requests")
+
+        start = time.perf_counter()
+        for game in games:
+            body = (root / "ports_src" / "ports" / "games" / game.igdb_slug / f"{game.uuid}.yaml").read_bytes()
+            _post_serial(publish.get_release_url(game), body, "application/x-yaml")
+            message = json.dumps({"content": publish.get_game_url(game)}).encode("utf-8")
+            _post_serial(server.url + WEBHOOK_PATH, message, "application/json")
+        serial = time.perf_counter() - start
+        print(f"  {'serial':10} {serial:8.2f}s {server.stats.connections} connections")
+
+        server.stats.releases.clear()
+        server.stats.messages.clear()
+        connections = server.stats.connections
+        start = time.perf_counter()
+        report = asyncio.run(publish.publish_games(games, manifests, webhook_rate=args.webhook_rate))
+        seconds = time.perf_counter() - start
+        print(
+            f"  {'asyncio':10} {seconds:8.2f}s {server.stats.connections - connections} connections, {report.http}, "
+            f"{serial / seconds:.1f}x"
+        )
+        if report.failed:
+            raise SystemExit(f"ERROR: {len(report.failed)} failed, first: {report.failed[0][1]}")
+        posted = sorted(server.url + path for path, _ in server.stats.releases)
+        if posted != sorted(publish.get_release_url(game) for game in games):
+            raise SystemExit("ERROR: the stub didn't get every release exactly once")
+        if len(server.stats.messages) != len(games):
+            raise SystemExit(f"ERROR: {len(server.stats.messages)} announcements for {len(games)} releases")
+        if publish.get_pending(manifests):
+            raise SystemExit("ERROR: published games weren't recorded in their manifests")
+    loop.call_soon_threadsafe(loop.stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Benchmark per-game rendering of run scripts and release cards: per call compilation vs the render engine.
+
+Usage: python -m bench.render [--games 5000]
+"""
+
+import argparse
+import io
+import tempfile
+import time
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+)
+
+import yaml
+from mako.template import Template
+
+from lib.render import (
+    CardDumper,
+    TemplateEngine,
+    load_card,
+)
+
+SCUMMVM_INI = """[scummvm]
+gfx_mode=opengl
+filtering=${filtering}
+fullscreen=${fullscreen}
+subtitles=${subtitles}
+aspect_ratio=true
+% for ix in range(4):
+[keymapper-${ix}]
+keymap_global_MENU=C+F5
+% endfor
+"""
+
+RUN_SH = """#!/bin/sh
+set -eu
+cd "$(dirname "$0")"
+exec scummvm --config=${config} --path=${path} --savepath=${save_path} --language=${lang} --auto-detect ${game}
+"""
+
+RELEASE_CARD = """descr:
+  distro:
+    files:
+    format:
+    url:
+  igdb_slug:
+  lang:
+  name:
+  platform:
+  publisher:
+  reqs:
+  runner:
+  ts_added:
+  uuid:
+  year_released:
+"""
+
+
+def _ini_params() -> Dict[str, Any]:
+    return {"filtering": "true", "fullscreen": "true", "subtitles": "true"}
+
+
+def _run_params(ix: int) -> Dict[str, Any]:
+    return {"config": "scummvm.ini", "game": f"game{ix}", "path": "./APP", "save_path": "./APP", "lang": "en"}
+
+
+def _fill_card(card: dict, ix: int) -> dict:
+    card["descr"]["distro"]["url"] = "exoscummvm"
+    card["descr"]["distro"]["files"] = ["changeme"]
+    card["descr"]["distro"]["format"] = "CD"
+    card["descr"]["igdb_slug"] = f"game-{ix}"
+    card["descr"]["name"] = f"Game {ix}"
+    card["descr"]["publisher"] = None if ix % 5 == 0 else f"Company {ix % 97}"
+    card["descr"]["reqs"] = {"color_bits": 8, "midi": False, "screen_height": 480, "screen_width": 640}
+    card["descr"]["runner"] = {"name": "scummvm", "ver": "2.9.0"}
+    card["descr"]["uuid"] = f"00000000-0000-0000-0000-{ix:012d}"
+    card["descr"]["year_released"] = 1980 + ix % 30
+    return card
+
+
+def render_legacy(tmpl_dir: Path, games: int) -> List[str]:
+    res = []
+    for ix in range(games):
+        # what lib.util.template and add_installer did for every game
+        for name, params in (("scummvm.ini.tmpl", _ini_params()), ("run.sh.tmpl", _run_params(ix))):
+            with open(tmpl_dir / name, "r", encoding="UTF-8") as f:
+                res.append(Template(f.read()).render(**params))
+        with open(tmpl_dir / "release.yaml.tmpl", "r", encoding="utf-8") as f:
+            card = yaml.safe_load(f)
+        yaml.SafeDumper.add_representer(
+            type(None), lambda dumper, value: dumper.represent_scalar("tag:yaml.org,2002:null", "")
+        )
+        out = io.StringIO()
+        yaml.safe_dump(_fill_card(card, ix), out, default_flow_style=False)
+        res.append(out.getvalue())
+    return res
+
+
+def render_engine(tmpl_dir: Path, module_dir: Path, games: int) -> List[str]:
+    engine = TemplateEngine(tmpl_dir, module_dir)
+    inis = engine.render_many("scummvm.ini.tmpl", (_ini_params() for ix in range(games)))
+    runs = engine.render_many("run.sh.tmpl", (_run_params(ix) for ix in range(games)))
+    res = []
+    for ix in range(games):
+        out = io.StringIO()
+        yaml.dump(
+            _fill_card(load_card(tmpl_dir / "release.yaml.tmpl"), ix), out, Dumper=CardDumper, default_flow_style=False
+        )
+        res += [inis[ix], runs[ix], out.getvalue()]
+    return res
+
+
+def _timed(name: str, games: int, fn: Callable[[], Any]) -> Any:
+    start = time.perf_counter()
+    res = fn()
+    seconds = time.perf_counter() - start
+    print(f"  {name:32} {seconds:7.2f}s {seconds / games * 1e6:9.1f}us/game")
+    return res
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=5000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmpl_dir = Path(tmp_dir) / "templates"
+        tmpl_dir.mkdir()
+        (tmpl_dir / "scummvm.ini.tmpl").write_text(SCUMMVM_INI, encoding="utf-8")
+        (tmpl_dir / "run.sh.tmpl").write_text(RUN_SH, encoding="utf-8")
+        (tmpl_dir / "release.yaml.tmpl").write_text(RELEASE_CARD, encoding="utf-8")
+        module_dir = Path(tmp_dir) / "modules"
+        print(f"{args.games} games")
+        legacy = _timed("compile per game", args.games, lambda: render_legacy(tmpl_dir, args.games))
+        cold = _timed("engine, cold module cache", args.games, lambda: render_engine(tmpl_dir, module_dir, args.games))
+        warm = _timed("engine, warm module cache", args.games, lambda: render_engine(tmpl_dir, module_dir, args.games))
+    if not legacy == cold == warm:
+        raise SystemExit("ERROR: engine output differs from per call rendering")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Benchmark ScummvmStateEntry (de)serialization: per-row schemas vs the batch codec.
+
+Usage: python -m bench.state_codec [--entries 50000]
+"""
+
+import argparse
+import json
+import time
+from typing import (
+    Any,
+    Callable,
+    List,
+)
+
+from lib.cmd.dc import ScummvmStateEntry
+from lib.codec import get_codec
+
+
+def gen_state(entries: int) -> List[dict]:
+    res = []
+    for ix in range(entries):
+        releases = [
+            {
+                "child_part": f"Game {ix} ({platform} {distro})",
+                "has_menu": ix % 7 == 0,
+                "platform": platform,
+                "distro_format": distro,
+                "scummvm_game": f"game{ix}",
+                "scummvm_ver": "2.9.0",
+            }
+            for platform, distro in (("DOS", "CD"), ("Amiga", "Floppy"), ("Macintosh", "CD"))
+        ]
+        res.append(
+            {
+                "parent_part": f"Game {ix} (1990)",
+                "scummvm_game": f"game{ix}",
+                "scummvm_ver": "2.9.0",
+                "title": f"Game {ix}",
+                "publisher": f"Publisher {ix % 89}",
+                "rating": "E - Everyone",
+                "release_year": 1980 + ix % 30,
+                "genre": ["Adventure", "Puzzle"],
+                "releases": releases,
+                "igdb": {
+                    "slug": f"game-{ix}",
+                    "name": f"Game {ix}",
+                    "title_sim_ratio": 0.95,
+                    "publisher": None if ix % 5 == 0 else f"Company {ix % 97}",
+                },
+                "in_ports": ix % 3 == 0,
+                "ports_year": None,
+                "uuid": f"00000000-0000-0000-0000-{ix:012d}",
+            }
+        )
+    return res
+
+
+def _timed(name: str, fn: Callable[[], Any]) -> Any:
+    start = time.perf_counter()
+    res = fn()
+    print(f"  {name:32} {time.perf_counter() - start:7.2f}s")
+    return res
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=50_000)
+    args = parser.parse_args()
+    data = json.loads(json.dumps(gen_state(args.entries)))
+    codec = get_codec(ScummvmStateEntry)
+    print(f"{args.entries} entries")
+    legacy = _timed("load, Schema() per entry", lambda: [ScummvmStateEntry.Schema().load(e) for e in data])
+    validated = _timed("load_many, validated", lambda: codec.load_many(data, trusted=False))
+    trusted = _timed("load_many, trusted", lambda: codec.load_many(data))
+    legacy_dump = _timed("dump, Schema() per entry", lambda: [ScummvmStateEntry.Schema().dump(e) for e in legacy])
+    validated_dump = _timed("dump_many, schema", lambda: codec.dump_many(legacy, trusted=False))
+    trusted_dump = _timed("dump_many, trusted", lambda: codec.dump_many(legacy))
+    if not legacy == validated == trusted or not legacy_dump == validated_dump == trusted_dump == data:
+        raise SystemExit("ERROR: codec results differ from the schema")
+
+
+if __name__ == "__main__":
+    main()
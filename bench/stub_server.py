@@ -0,0 +1,161 @@
+"""Local stand-in for portsvc and the Discord webhook, to exercise `exoconv publish` offline.
+
+Usage: python -m bench.stub_server [--port 8087] [--latency 0.05] [--fail-rate 0.1] [--drop-rate 0.01]
+    [--webhook-rate 2.5]
+
+Answers POST /ports/apps/<slug>/releases/<uuid> with 200 and POST /webhook with 204, on keep-alive
+connections. --latency delays every answer, --fail-rate answers that share of the requests with a 503,
+--drop-rate handles that share of them and closes the connection without an answer, and the webhook
+answers 429 with a Retry-After once it gets more than --webhook-burst messages ahead of --webhook-rate.
+Prints the environment to point exoconv at it.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import (
+    List,
+    Optional,
+    Tuple,
+)
+
+WEBHOOK_PATH = "/webhook"
+
+
+@dataclass
+class StubStats:
+    releases: List[Tuple[str, bytes]] = field(default_factory=list)
+    messages: List[bytes] = field(default_factory=list)
+    connections: int = 0
+    failed: int = 0
+    dropped: int = 0
+    limited: int = 0
+
+
+class StubServer:
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.0,
+        fail_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        webhook_rate: float = 2.5,
+        webhook_burst: int = 5,
+        seed: int = 0,
+    ) -> None:
+        self.port = port
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self.webhook_rate = webhook_rate
+        self.webhook_burst = webhook_burst
+        self.stats = StubStats()
+        self._rnd = random.Random(seed)  # nosec B311: simulated failures, not a secret
+        self._tokens = float(webhook_burst)
+        self._last = time.monotonic()
+        self._server: Optional[asyncio.Server] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _webhook_wait(self) -> float:
+        # the same token bucket Discord keeps per webhook
+        now = time.monotonic()
+        self._tokens = min(self.webhook_burst, self._tokens + (now - self._last) * self.webhook_rate)
+        self._last = now
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.webhook_rate
+        self._tokens -= 1
+        return 0.0
+
+    def _answer(self, method: str, path: str, body: bytes) -> Tuple[int, List[str]]:
+        if method != "POST":
+            return 405, []
+        if self._rnd.random() < self.fail_rate:
+            self.stats.failed += 1
+            return 503, []
+        if path == WEBHOOK_PATH:
+            wait = self._webhook_wait()
+            if wait:
+                self.stats.limited += 1
+                return 429, [f"Retry-After: {wait:.3f}"]
+            self.stats.messages.append(body)
+            return 204, []
+        if path.startswith("/ports/apps/") and "/releases/" in path:
+            self.stats.releases.append((path, body))
+            return 200, []
+        return 404, []
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.stats.connections += 1
+        try:
+            while request_line := await reader.readline():
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                status, extra = self._answer(method, path, body)
+                if status < 400 and self._rnd.random() < self.drop_rate:
+                    # what a timeout looks like to the client: the request took effect, the answer never came
+                    self.stats.dropped += 1
+                    break
+                head = [f"HTTP/1.1 {status} Stub", "Content-Length: 0", *extra]
+                writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    server = StubServer(args.port, args.latency, args.fail_rate, args.drop_rate, args.webhook_rate, args.webhook_burst)
+    await server.start()
+    print(f"export PORTSVC_URL={server.url}")
+    print(f"export DISCORD_HOOK_YAG_NEW_RELEASES_CHANNEL={server.url}{WEBHOOK_PATH}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+        stats = server.stats
+        print(
+            f"{len(stats.releases)} releases, {len(stats.messages)} messages, {stats.connections} connections, "
+            f"{stats.failed} failed, {stats.dropped} dropped, {stats.limited} rate limited"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8087)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--webhook-rate", type=float, default=2.5)
+    parser.add_argument("--webhook-burst", type=int, default=5)
+    try:
+        asyncio.run(_serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Benchmark pushing a catalog of game trees: copying every tree vs the delta sync of `exoconv go`.
+
+Usage: python -m bench.sync [--games 200] [--files 50] [--changed 0.01]
+
+Pushes the catalog once, changes --changed of its files and pushes it again.
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+from lib.sync import (
+    SyncStats,
+    plan_tree,
+    sync_trees,
+)
+
+
+def _write_catalog(root: Path, games: int, files: int) -> List[Path]:
+    rnd = random.Random(0)  # nosec B311: synthetic data, not a secret
+    res = []
+    for game in range(games):
+        for ix in range(files):
+            path = root / "apps" / f"game-{game}" / f"{game:08x}" / "APP" / f"DATA{ix % 4}" / f"FILE{ix}.DAT"
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(rnd.randbytes(rnd.randint(1024, 64 * 1024)))
+            res.append(path)
+    return res
+
+
+def _push(root: Path, target: Path, jobs: int) -> SyncStats:
+    plans = [
+        plan_tree(
+            tree,
+            target / tree.parent.name / tree.name,
+            target / ".sync" / tree.parent.name / f"{tree.name}.json",
+            root / "sync" / tree.parent.name / f"{tree.name}.json",
+        )
+        for tree in sorted((root / "apps").glob("*/*"))
+    ]
+    return sync_trees(plans, jobs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=200)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--changed", type=float, default=0.01)
+    parser.add_argument("--jobs", type=int, default=8)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        root = Path(tmp_dir)
+        files = _write_catalog(root, args.games, args.files)
+        print(f"{args.games} games, {len(files)} files")
+
+        start = time.perf_counter()
+        shutil.copytree(root / "apps", root / "copy")
+        print(f"  {'copytree':10} {time.perf_counter() - start:8.2f}s")
+
+        target = root / "target"
+        start = time.perf_counter()
+        stats = _push(root, target, args.jobs)
+        print(f"  {'first go':10} {time.perf_counter() - start:8.2f}s {stats}")
+
+        for path in random.Random(1).sample(files, int(len(files) * args.changed)):  # nosec B311: not a secret
+            path.write_bytes(path.read_bytes()[::-1])
+        start = time.perf_counter()
+        stats = _push(root, target, args.jobs)
+        print(f"  {'re-push':10} {time.perf_counter() - start:8.2f}s {stats}")
+        for path in files:
+            if path.read_bytes() != (target / path.relative_to(root / "apps")).read_bytes():
+                raise SystemExit(f"ERROR: {path} differs in the target")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Benchmark release discovery on a large archive: zipfile's namelist() vs the central directory reader.
+
+Usage: python -m bench.zipdir [--members 50000]
+"""
+
+import argparse
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+from typing import (
+    Callable,
+    List,
+)
+
+from lib.zipdir import release_names
+
+
+def _write_archive(path: Path, members: int) -> None:
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr("Game (1990)/", "")
+        for ix in range(4):
+            z.writestr(f"Game (1990)/Game (DOS CD{ix})/", "")
+        z.writestr("Game (1990)/Game (DOS CD0)/menu.txt", "1) Play\n")
+        for ix in range(members):
+            z.writestr(f"Game (1990)/Game (DOS CD{ix % 4})/DATA/SUB{ix % 50}/FILE{ix}.DAT", "")
+
+
+def _namelist(path: Path) -> List[str]:
+    with zipfile.ZipFile(path, "r") as zip_ref:
+        return zip_ref.namelist()
+
+
+def _release_names(path: Path) -> List[str]:
+    with open(path, "rb") as f:
+        return release_names(f)
+
+
+def _measure(name: str, fn: Callable[[], List[str]]) -> List[str]:
+    tracemalloc.start()
+    res = fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    fn()
+    seconds = time.perf_counter() - start
+    print(f"  {name:16} {seconds * 1000:8.1f}ms {peak / 2**20:8.2f} MiB peak, {len(res)} names")
+    return res
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", type=int, default=50000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = Path(tmp_dir) / "game.zip"
+        _write_archive(path, args.members)
+        print(f"{args.members} members, {path.stat().st_size / 2**20:.1f} MiB")
+        _measure("namelist", lambda: _namelist(path))
+        _measure("release_names", lambda: _release_names(path))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,46 @@
+from pathlib import Path
+from typing import (
+    Optional,
+    Tuple,
+)
+
 import click
 
+from lib.cmd.gc import run as run_gc
+from lib.cmd.go import run as run_go
+from lib.cmd.igdb_index import run as run_igdb_index
+from lib.cmd.merge import run as run_merge
+from lib.cmd.publish import (
+    PUBLISH_CONCURRENCY,
+    PUBLISH_RETRIES,
+    WEBHOOK_RATE,
+    Unconfirmed,
+)
+from lib.cmd.publish import run as run_publish
 from lib.cmd.ready import run as run_ready
+from lib.cmd.state_json import run_export as run_export_json
+from lib.cmd.state_json import run_import as run_import_json
+from lib.cmd.steady import PREPARE_GAMES_LIMIT
 from lib.cmd.steady import run as run_steady
 from lib.runner import Runner
+from lib.shard import Shard
+from lib.sync import SYNC_JOBS
+from lib.timings import run_recorded
+from lib.zipscan import SCAN_WORKERS
+
+SCAN_HELP = "Archives read concurrently, tune per storage backend"
+TIMINGS_HELP = "Write a json report of per-phase wall/CPU time, peak memory and counts to PATH (- for stdout)"
+PROFILE_HELP = "Write cProfile stats of the main thread (see pstats) to PATH"
+
+
+def parse_shard(ctx: click.Context, param: click.Parameter, value: Optional[str]) -> Optional[Shard]:
+    del ctx, param
+    if value is None:
+        return None
+    try:
+        return Shard.parse(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e)) from e
 
 
 @click.group()
@@ -12,15 +50,188 @@ def cli() -> None:
 
 @cli.command()
 @click.option("--runner", type=click.Choice([runner.value for runner in Runner], case_sensitive=False), required=False)
-def ready(runner: str) -> int:
-    run_ready(Runner(runner) if runner else None)
+@click.option(
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Title matching and ports parsing processes",
+)
+@click.option("--shard", callback=parse_shard, help="Process only shard i of N, e.g. 1/4")
+@click.option("--no-cache", is_flag=True, help="Re-parse all archives, ignoring the parse cache")
+@click.option("--cache-hash", is_flag=True, help="Validate parse cache entries by content hash instead of mtime")
+@click.option("--scan-workers", type=click.IntRange(min=1), default=SCAN_WORKERS, show_default=True, help=SCAN_HELP)
+@click.option("--timings", type=click.Path(dir_okay=False, path_type=Path), help=TIMINGS_HELP)
+@click.option("--profile", type=click.Path(dir_okay=False, path_type=Path), help=PROFILE_HELP)
+def ready(
+    runner: str,
+    jobs: int,
+    shard: Optional[Shard],
+    no_cache: bool,
+    cache_hash: bool,
+    scan_workers: int,
+    timings: Optional[Path],
+    profile: Optional[Path],
+) -> int:
+    run_recorded(
+        "ready",
+        lambda: run_ready(
+            Runner(runner) if runner else None,
+            jobs=jobs,
+            shard=shard,
+            use_cache=not no_cache,
+            cache_hash=cache_hash,
+            scan_workers=scan_workers,
+        ),
+        timings,
+        profile,
+    )
+    return 0
+
+
+@cli.command()
+@click.option("--runner", type=click.Choice([runner.value for runner in Runner], case_sensitive=False), required=False)
+@click.option("--shard", callback=parse_shard, help="Process only shard i of N, e.g. 1/4")
+@click.option("--seed", type=int, help="Seed for a reproducible game selection")
+@click.option(
+    "--jobs",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Title matching processes and games prepared concurrently",
+)
+@click.option(
+    "--limit", type=click.IntRange(min=1), default=PREPARE_GAMES_LIMIT, show_default=True, help="Games to prepare"
+)
+@click.option("--dedup", is_flag=True, help="Link identical game files to a shared content-addressed blob store")
+@click.option("--verify", is_flag=True, help="Check the files of every prepared game by crc and repair them")
+@click.option("--no-cache", is_flag=True, help="Re-parse all archives, ignoring the parse cache")
+@click.option("--cache-hash", is_flag=True, help="Validate parse cache entries by content hash instead of mtime")
+@click.option("--scan-workers", type=click.IntRange(min=1), default=SCAN_WORKERS, show_default=True, help=SCAN_HELP)
+@click.option("--timings", type=click.Path(dir_okay=False, path_type=Path), help=TIMINGS_HELP)
+@click.option("--profile", type=click.Path(dir_okay=False, path_type=Path), help=PROFILE_HELP)
+def steady(
+    runner: str,
+    shard: Optional[Shard],
+    seed: Optional[int],
+    jobs: int,
+    limit: int,
+    dedup: bool,
+    verify: bool,
+    no_cache: bool,
+    cache_hash: bool,
+    scan_workers: int,
+    timings: Optional[Path],
+    profile: Optional[Path],
+) -> int:
+    run_recorded(
+        "steady",
+        lambda: run_steady(
+            Runner(runner) if runner else None,
+            shard=shard,
+            seed=seed,
+            use_cache=not no_cache,
+            cache_hash=cache_hash,
+            scan_workers=scan_workers,
+            jobs=jobs,
+            limit=limit,
+            dedup=dedup,
+            verify=verify,
+        ),
+        timings,
+        profile,
+    )
+    return 0
+
+
+@cli.command()
+@click.option("--runner", type=click.Choice([runner.value for runner in Runner], case_sensitive=False), required=False)
+@click.argument("paths", nargs=-1, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+def merge(runner: str, paths: Tuple[Path, ...]) -> int:
+    """Merge partial (sharded) state databases or json files, all databases in EXO_DATA_DIR/tmp without PATHS."""
+    run_merge(Runner(runner) if runner else None, list(paths))
+    return 0
+
+
+@cli.command()
+@click.option("--dry-run", is_flag=True, help="Only list the releases that would be posted and announced")
+@click.option("--no-notify", is_flag=True, help="Post the releases without announcing them on the webhook")
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=PUBLISH_CONCURRENCY,
+    show_default=True,
+    help="Requests in flight",
+)
+@click.option("--retries", type=click.IntRange(min=0), default=PUBLISH_RETRIES, show_default=True)
+@click.option(
+    "--webhook-rate",
+    type=click.FloatRange(min=0, min_open=True),
+    default=WEBHOOK_RATE,
+    show_default=True,
+    help="Webhook messages per second",
+)
+@click.option(
+    "--unconfirmed",
+    type=click.Choice(["skip", "retry", "done"]),
+    default="skip",
+    show_default=True,
+    help="Steps sent without an answer: leave them, send them again or mark them as done",
+)
+def publish(
+    dry_run: bool, no_notify: bool, concurrency: int, retries: int, webhook_rate: float, unconfirmed: Unconfirmed
+) -> int:
+    """Post the releases steady prepared to portsvc and announce them on the new releases webhook."""
+    run_publish(not no_notify, dry_run, concurrency, retries, webhook_rate, unconfirmed)
     return 0
 
 
 @cli.command()
+@click.option(
+    "--jobs", type=click.IntRange(min=1), default=SYNC_JOBS, show_default=True, help="Files copied concurrently"
+)
+@click.option("--verify", is_flag=True, help="Hash the target files instead of trusting the target's manifests")
+@click.option("--dry-run", is_flag=True, help="Only report what would be transferred and deleted")
+@click.argument("target", type=click.Path(file_okay=False, path_type=Path))
+def go(target: Path, jobs: int, verify: bool, dry_run: bool) -> int:
+    """Push the prepared games to TARGET (e.g. the mounted prod apps dir), transferring only changed files."""
+    run_go(target, jobs, verify, dry_run)
+    return 0
+
+
+@cli.command("export-json")
+@click.option("--runner", type=click.Choice([runner.value for runner in Runner], case_sensitive=False), required=False)
+@click.option("--shard", callback=parse_shard, help="Export the partial state of shard i of N, e.g. 1/4")
+@click.argument("path", required=False, type=click.Path(dir_okay=False, path_type=Path))
+def export_json(runner: str, shard: Optional[Shard], path: Optional[Path]) -> int:
+    """Export the state database as json, to EXO_DATA_DIR/tmp/scummvm-state.json if no PATH is given."""
+    run_export_json(Runner(runner) if runner else None, path, shard)
+    return 0
+
+
+@cli.command("import-json")
 @click.option("--runner", type=click.Choice([runner.value for runner in Runner], case_sensitive=False), required=False)
-def steady(runner: str) -> int:
-    run_steady(Runner(runner) if runner else None)
+@click.option("--shard", callback=parse_shard, help="Import into the partial state of shard i of N, e.g. 1/4")
+@click.argument("path", required=False, type=click.Path(exists=True, dir_okay=False, path_type=Path))
+def import_json(runner: str, shard: Optional[Shard], path: Optional[Path]) -> int:
+    """Replace the state database with a json state, EXO_DATA_DIR/tmp/scummvm-state.json if no PATH is given."""
+    run_import_json(Runner(runner) if runner else None, path, shard)
+    return 0
+
+
+@cli.command("igdb-index")
+@click.option("--force", is_flag=True, help="Rebuild even if the snapshot is up to date")
+def igdb_index(force: bool) -> int:
+    """Compile the IGDB scrape into a memory mapped snapshot (ready rebuilds a stale one on its own)."""
+    run_igdb_index(force)
+    return 0
+
+
+@cli.command()
+@click.option("--dry-run", is_flag=True, help="Only report what would be removed")
+def gc(dry_run: bool) -> int:
+    """Remove blob store files no game links to any more and report the dedup savings."""
+    run_gc(dry_run)
     return 0
 
 
@@ -0,0 +1,189 @@
+import errno
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Dict,
+    Tuple,
+)
+
+INDEX_VERSION = 1
+COPY_CHUNK_SIZE = 1024 * 1024
+# linux ioctl cloning a whole file (btrfs, xfs): _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+# a failed hardlink with one of these means the filesystem won't link, fall back to a reflink or a copy
+_NO_LINK_ERRNOS = (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP)
+
+
+@dataclass
+class BlobReport:
+    blobs: int = 0
+    stored_bytes: int = 0
+    linked_bytes: int = 0
+    unreferenced: int = 0
+    unreferenced_bytes: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.blobs} blobs, {self.stored_bytes / 2**20:.2f} MiB stored, "
+            f"{self.linked_bytes / 2**20:.2f} MiB linked into games, "
+            f"{max(self.linked_bytes - self.stored_bytes, 0) / 2**20:.2f} MiB saved, "
+            f"{self.unreferenced} unreferenced ({self.unreferenced_bytes / 2**20:.2f} MiB)"
+        )
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+            return True
+        except OSError:
+            pass
+    dst.unlink()
+    return False
+
+
+class BlobStore:
+    """Content-addressed store of extracted files, games link their files to the blobs.
+
+    Blobs are keyed by the sha256 of their content. The zip CRC32 and size of a member map to the blob it was
+    stored as, so a member seen before is linked without being written again; it's still inflated and hashed,
+    as a CRC32 of the same size (a disk image, say) doesn't make the same content. Blobs are read-only: a
+    hardlinked game file shares its inode with every other game using the same content, an in-place write
+    would change all of them.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self._index_path = root / "index.json"
+        self._lock = threading.Lock()
+        self._by_crc: Dict[str, str] = {}
+        self._dirty = False
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == INDEX_VERSION:
+                self._by_crc = data["by_crc"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    @staticmethod
+    def _digest(zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo) -> str:
+        sha = hashlib.sha256()
+        with zip_ref.open(info) as source:
+            while chunk := source.read(COPY_CHUNK_SIZE):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    def _store(self, zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo) -> Path:
+        tmp_dir = self.root / "tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        sha = hashlib.sha256()
+        fd, tmp_name = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with zip_ref.open(info) as source, os.fdopen(fd, "wb") as target:
+                while chunk := source.read(COPY_CHUNK_SIZE):
+                    sha.update(chunk)
+                    target.write(chunk)
+            os.chmod(tmp_name, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+            digest = sha.hexdigest()
+            blob_path = self._blob_path(digest)
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            if blob_path.exists():
+                # same content under another crc key (or stored by a concurrent game)
+                os.unlink(tmp_name)
+            else:
+                os.replace(tmp_name, blob_path)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.unlink(tmp_name)
+            raise
+        with self._lock:
+            self._by_crc[f"{info.CRC:08x}:{info.file_size}"] = digest
+            self._dirty = True
+        return blob_path
+
+    def materialize(
+        self, zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, target_path: Path, mtime: float
+    ) -> Tuple[int, bool]:
+        """Put ``info`` at ``target_path``, returns the bytes and whether they were linked from a stored blob."""
+        with self._lock:
+            digest = self._by_crc.get(f"{info.CRC:08x}:{info.file_size}")
+        blob_path = self._blob_path(digest) if digest else None
+        reused = True
+        if blob_path is not None and blob_path.exists() and self._digest(zip_ref, info) != digest:
+            # a CRC32 collision, the member is stored as a blob of its own
+            blob_path = None
+        if blob_path is None or not blob_path.exists():
+            blob_path = self._store(zip_ref, info)
+            # a fresh blob takes the timestamp of the first member stored as it, links share it
+            os.utime(blob_path, (mtime, mtime))
+            reused = False
+        target_path.unlink(missing_ok=True)
+        try:
+            os.link(blob_path, target_path)
+        except OSError as e:
+            if e.errno not in _NO_LINK_ERRNOS:
+                raise
+            if not _reflink(blob_path, target_path):
+                shutil.copyfile(blob_path, target_path)
+            os.utime(target_path, (mtime, mtime))
+        return info.file_size, reused
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp_path = self._index_path.with_name(self._index_path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"version": INDEX_VERSION, "by_crc": self._by_crc}, f)
+            os.replace(tmp_path, self._index_path)
+            self._dirty = False
+
+    def report(self) -> BlobReport:
+        res = BlobReport()
+        for path in self.root.glob("??/*"):
+            st = path.stat()
+            res.blobs += 1
+            res.stored_bytes += st.st_size
+            # every hardlink but the blob itself is a game file
+            res.linked_bytes += st.st_size * (st.st_nlink - 1)
+            if st.st_nlink == 1:
+                res.unreferenced += 1
+                res.unreferenced_bytes += st.st_size
+        return res
+
+    def gc(self, dry_run: bool = False) -> BlobReport:
+        """Remove the blobs no game links to any more, returns the report from before the collection.
+
+        Games materialized by reflink or copy don't hold a link, their blobs only speed up later extractions
+        and are collected as well.
+        """
+        res = self.report()
+        if dry_run:
+            return res
+        removed = set()
+        for path in self.root.glob("??/*"):
+            if path.stat().st_nlink == 1:
+                path.unlink()
+                removed.add(path.name)
+        shutil.rmtree(self.root / "tmp", ignore_errors=True)
+        with self._lock:
+            by_crc = {k: v for k, v in self._by_crc.items() if v not in removed}
+            if by_crc != self._by_crc:
+                self._by_crc = by_crc
+                self._dirty = True
+        self.save()
+        return res
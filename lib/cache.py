@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    Optional,
+    TypeVar,
+)
+
+from marshmallow import Schema
+
+T = TypeVar("T")
+
+# bump whenever a cached parser starts producing different results
+CACHE_VERSION = 3
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    hashed: int = 0
+    pruned: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} misses ({self.stale} stale), "
+            f"{self.hashed} files hashed, {self.pruned} pruned"
+        )
+
+
+def _file_digest(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+class FileCache:
+    """On-disk cache of per-file parse results.
+
+    An entry is keyed on the file path and the schema it was dumped with, and is valid while the file's
+    size and mtime are unchanged. With ``content_hash`` the sha256 of the file is compared instead of the
+    mtime, which survives copies and touches at the cost of reading every file. A cache created without
+    a path is disabled: every lookup is a miss and nothing is written.
+    """
+
+    def __init__(self, cache_path: Optional[Path], content_hash: bool = False) -> None:
+        self.cache_path = cache_path
+        self.content_hash = content_hash
+        self.stats = CacheStats()
+        self._entries: Dict[str, dict] = {}
+        self._pending: Dict[str, dict] = {}
+        self._dirty = False
+        if cache_path is not None and cache_path.exists():
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"WARNING: ignoring unreadable cache {cache_path}: {e}")
+                data = {}
+            if data.get("version") == CACHE_VERSION:
+                self._entries = data.get("entries", {})
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache_path is not None
+
+    @staticmethod
+    def _key(path: Path, schema: Schema) -> str:
+        return f"{type(schema).__name__}:{path.resolve()}"
+
+    def get(self, path: Path, schema: Schema) -> Optional[T]:
+        """Return the cached result for ``path`` or None, a miss is expected to be followed by ``put()``."""
+        if not self.enabled:
+            self.stats.misses += 1
+            return None
+        key = self._key(path, schema)
+        st = path.stat()
+        entry = self._entries.get(key)
+        digest = None
+        if entry is not None and entry["size"] == st.st_size:
+            if self.content_hash:
+                digest = _file_digest(path)
+                self.stats.hashed += 1
+                valid = entry.get("sha256") == digest
+            else:
+                valid = entry["mtime_ns"] == st.st_mtime_ns
+            if valid:
+                self.stats.hits += 1
+                if entry["mtime_ns"] != st.st_mtime_ns:
+                    entry["mtime_ns"] = st.st_mtime_ns
+                    self._dirty = True
+                return schema.load(entry["data"])
+        if entry is not None:
+            self.stats.stale += 1
+        self.stats.misses += 1
+        # remember what the file looked like before parsing, a change during parsing then shows up next run
+        self._pending[key] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        return None
+
+    def put(self, path: Path, schema: Schema, value: T) -> None:
+        if not self.enabled:
+            return
+        key = self._key(path, schema)
+        entry = self._pending.pop(key, None)
+        if entry is None:
+            st = path.stat()
+            entry = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": None}
+        if self.content_hash and entry["sha256"] is None:
+            entry["sha256"] = _file_digest(path)
+            self.stats.hashed += 1
+        entry["data"] = schema.dump(value)
+        self._entries[key] = entry
+        self._dirty = True
+
+    def load(self, path: Path, schema: Schema, parse: Callable[[Path], T]) -> T:
+        res: Optional[T] = self.get(path, schema)
+        if res is None:
+            res = parse(path)
+            self.put(path, schema, res)
+        return res
+
+    def save(self) -> None:
+        if self.cache_path is None:
+            return
+        for key in list(self._entries):
+            # entries of removed archives
+            if not os.path.exists(key.split(":", 1)[1]):
+                del self._entries[key]
+                self.stats.pruned += 1
+                self._dirty = True
+        if not self._dirty:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "entries": self._entries}, f)
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
+
+
+def get_parse_cache(data_dir: Path, enabled: bool = True, content_hash: bool = False) -> FileCache:
+    return FileCache(data_dir / "tmp" / "exo-parse-cache.json" if enabled else None, content_hash)
+
+
+def get_ports_cache(data_dir: Path, enabled: bool = True) -> FileCache:
+    return FileCache(data_dir / "tmp" / "ports-index.json" if enabled else None)
@@ -0,0 +1,56 @@
+import bisect
+import re
+from typing import (
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+_SEP = "\n"
+
+
+class KeywordClassifier:
+    """Tells which of ``keywords`` a text contains, case-insensitively and as a plain substring.
+
+    The keywords are compiled into one alternation, longest first, inside a lookahead and matched against the
+    lowercased text: at every position the longest keyword starting there matches, overlapping matches
+    included. Of all the matches the longest wins and the leftmost breaks ties, so the result depends neither
+    on the order the keywords are given in nor on hash seeds: "Mac" never beats "Macintosh", nor "CD" a "DVD"
+    it overlaps in "xcdvd".
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self.keywords = sorted(set(keywords), key=lambda k: (-len(k), k))
+        if any(_SEP in k for k in self.keywords):
+            raise ValueError("keywords can't contain a newline")
+        self._canonical = {k.lower(): k for k in self.keywords}
+        # lowercasing the text once is much faster than re.IGNORECASE, which defeats the regex prefix scan
+        self._re = re.compile(f"(?=({'|'.join(re.escape(k.lower()) for k in self.keywords)}))")
+
+    def _best(self, matches: Iterable[Tuple[int, str]]) -> Optional[str]:
+        best: Optional[Tuple[int, int, str]] = None
+        for pos, found in matches:
+            candidate = (-len(found), pos, found)
+            if best is None or candidate < best:
+                best = candidate
+        return self._canonical[best[2]] if best is not None else None
+
+    def classify(self, text: str) -> Optional[str]:
+        return self._best((m.start(), m.group(1)) for m in self._re.finditer(text.lower()))
+
+    def classify_many(self, texts: Sequence[str]) -> List[Optional[str]]:
+        """classify() of every text, matched in one regex pass over all of them."""
+        # lowercasing can change the length of a text, so the offsets are taken after it
+        lowered = [text.lower() for text in texts]
+        starts = []
+        offset = 0
+        for text in lowered:
+            starts.append(offset)
+            offset += len(text) + len(_SEP)
+        found: List[List[Tuple[int, str]]] = [[] for _ in texts]
+        for m in self._re.finditer(_SEP.join(lowered)):
+            ix = bisect.bisect_right(starts, m.start()) - 1
+            found[ix].append((m.start() - starts[ix], m.group(1)))
+        return [self._best(matches) for matches in found]
@@ -0,0 +1,12 @@
+from lib.blobstore import BlobStore
+from lib.yag.scummvm import get_blob_store_path
+
+
+def run(dry_run: bool) -> None:
+    store = BlobStore(get_blob_store_path())
+    report = store.gc(dry_run=dry_run)
+    print(f"Blob store: {report}")
+    if dry_run:
+        print(f"Would remove {report.unreferenced} blobs ({report.unreferenced_bytes / 2**20:.2f} MiB)")
+    else:
+        print(f"Removed {report.unreferenced} blobs ({report.unreferenced_bytes / 2**20:.2f} MiB)")
@@ -0,0 +1,52 @@
+import time
+from pathlib import Path
+
+from lib.manifest import GameManifest
+from lib.pipeline import run_pipeline
+from lib.sync import (
+    SYNC_JOBS,
+    TreePlan,
+    plan_tree,
+    sync_trees,
+)
+from lib.yag.scummvm import (
+    get_app_dir,
+    get_manifest_store,
+    get_sync_cache_path,
+)
+
+# next to the pushed games, one manifest per game tree
+TARGET_MANIFESTS_DIR = ".sync"
+
+
+def run(target: Path, jobs: int = SYNC_JOBS, verify: bool = False, dry_run: bool = False) -> None:
+    # games an interrupted steady run didn't finish aren't pushed
+    games = [m for m in get_manifest_store() if m.complete]
+
+    def plan_game(game: GameManifest) -> TreePlan:
+        return plan_tree(
+            get_app_dir(game.igdb_slug, game.uuid),
+            target / game.igdb_slug / game.uuid,
+            target / TARGET_MANIFESTS_DIR / game.igdb_slug / f"{game.uuid}.json",
+            get_sync_cache_path(game.igdb_slug, game.uuid),
+            verify,
+        )
+
+    start = time.monotonic()
+    report = run_pipeline(games, plan_game, jobs=jobs)
+    for game, error in report.failed:
+        print(f"ERROR: {game.igdb_slug} ({game.parent_part}): {error}")
+    plans = [plan for _, plan in report.done]
+    to_copy = sum(plan.src_files[rel_path].size for plan in plans for rel_path in plan.copy)
+    print(
+        f"Compared {len(plans)} games in {time.monotonic() - start:.2f}s: "
+        f"{sum(len(plan.copy) for plan in plans)} files ({to_copy / 2**20:.2f} MiB) to transfer, "
+        f"{sum(len(plan.delete) for plan in plans)} to delete, {sum(plan.hashed for plan in plans)} files hashed"
+    )
+    if dry_run:
+        for game, plan in report.done:
+            if plan.copy or plan.delete:
+                print(f"{game.igdb_slug}/{game.uuid}: {len(plan.copy)} to transfer, {len(plan.delete)} to delete")
+        return
+    stats = sync_trees(plans, jobs)
+    print(f"Pushed {len(plans)} games to {target}: {stats}")
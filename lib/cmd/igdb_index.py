@@ -0,0 +1,26 @@
+import time
+from pathlib import Path
+
+from lib.context import (
+    SCRAPERS_DATA_DIR,
+    get_igdb_snapshot_path,
+)
+from lib.yag.igdb_snapshot import (
+    IgdbSnapshot,
+    build_snapshot,
+)
+
+
+def run(force: bool) -> None:
+    snapshot_path = get_igdb_snapshot_path()
+    if not force and snapshot_path.exists():
+        try:
+            with IgdbSnapshot(snapshot_path) as snapshot:
+                if snapshot.is_fresh(Path(SCRAPERS_DATA_DIR)):
+                    print(f"IGDB snapshot is up to date: {snapshot_path} ({len(snapshot)} games)")
+                    return
+        except ValueError as e:
+            print(f"WARNING: rebuilding IGDB snapshot: {e}")
+    start = time.monotonic()
+    count = build_snapshot(Path(SCRAPERS_DATA_DIR), snapshot_path)
+    print(f"IGDB snapshot written: {snapshot_path} ({count} games in {time.monotonic() - start:.2f}s)")
@@ -0,0 +1,71 @@
+import json
+import re
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+)
+
+from lib.cmd.ready import get_scummvm_state_path
+from lib.runner import (
+    Runner,
+    select_runners,
+)
+from lib.state import (
+    StateStore,
+    state_key,
+)
+
+SHARD_FILE_RE = re.compile(r"\.shard-(\d+)-of-(\d+)\.(db|json)$")
+
+
+def _check_shards(paths: List[Path]) -> None:
+    shards: Dict[int, set] = {}
+    for path in paths:
+        m = SHARD_FILE_RE.search(path.name)
+        if m is None:
+            continue
+        shards.setdefault(int(m.group(2)), set()).add(int(m.group(1)))
+    if len(shards) > 1:
+        raise ValueError(f"Partial state files from different shard counts: {sorted(shards)}")
+    for count, indices in shards.items():
+        missing = set(range(1, count + 1)) - indices
+        if missing:
+            raise ValueError(f"Missing partial state files for shards: {sorted(missing)} of {count}")
+
+
+def _load_partial(path: Path) -> List[dict]:
+    if path.suffix == ".json":
+        with open(path, "r", encoding="utf-8") as f:
+            return list(json.load(f))
+    with StateStore(path) as store:
+        return list(store.iter_dumped())
+
+
+def merge_scummvm_state(paths: List[Path]) -> None:
+    if not paths:
+        paths = sorted(get_scummvm_state_path().parent.glob("scummvm-state.shard-*-of-*.db"))
+    if not paths:
+        raise ValueError("No partial state files found")
+    _check_shards(paths)
+    res: Dict[str, dict] = {}
+    for path in paths:
+        for entry in _load_partial(path):
+            key = state_key(entry["parent_part"])
+            if key in res:
+                raise ValueError(f"Entry is present in more than one partial state file: {entry['parent_part']}")
+            res[key] = entry
+    with StateStore(get_scummvm_state_path()) as store:
+        store.replace_all(res.values())
+
+
+STATE_MERGERS: Dict[Runner, Callable[[List[Path]], None]] = {
+    Runner.SCUMMVM: merge_scummvm_state,
+}
+
+
+def run(runner: Optional[Runner], paths: List[Path]) -> None:
+    for r in select_runners(runner, STATE_MERGERS):
+        STATE_MERGERS[r](paths)
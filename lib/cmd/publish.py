@@ -0,0 +1,183 @@
+import asyncio
+import json
+import os
+import time
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import (
+    Any,
+    List,
+    Literal,
+    Tuple,
+)
+
+from lib.http import (
+    HttpClient,
+    HttpStats,
+    RateLimiter,
+    RequestUncertain,
+)
+from lib.manifest import (
+    GameManifest,
+    ManifestStore,
+)
+from lib.yag.scummvm import (
+    get_manifest_store,
+    get_release_path,
+)
+
+PORTSVC_URL = os.environ.get("PORTSVC_URL", "http://portsvc.yag.dc:8087")
+DISCORD_HOOK_YAG_NEW_RELEASES_CHANNEL = os.environ["DISCORD_HOOK_YAG_NEW_RELEASES_CHANNEL"]
+
+PUBLISH_CONCURRENCY = 16
+PUBLISH_RETRIES = 5
+# a Discord webhook takes 5 messages per 2 seconds
+WEBHOOK_RATE = 2.5
+WEBHOOK_BURST = 5
+
+# what to do with a step whose request went out without an answer: leave it, send it again or take it as done
+Unconfirmed = Literal["skip", "retry", "done"]
+
+
+@dataclass
+class PublishReport:
+    published: List[GameManifest] = field(default_factory=list)
+    announced: List[GameManifest] = field(default_factory=list)
+    failed: List[Tuple[GameManifest, str]] = field(default_factory=list)
+    unconfirmed: List[Tuple[GameManifest, str]] = field(default_factory=list)
+    http: HttpStats = field(default_factory=HttpStats)
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{len(self.published)} published, {len(self.announced)} announced, {len(self.failed)} failed, "
+            f"{len(self.unconfirmed)} unconfirmed in {self.seconds:.2f}s ({self.http})"
+        )
+
+
+def get_release_url(manifest: GameManifest) -> str:
+    return f"{PORTSVC_URL}/ports/apps/{manifest.igdb_slug}/releases/{manifest.uuid}"
+
+
+def get_game_url(manifest: GameManifest) -> str:
+    return f"https://yag.im/games/{manifest.uuid}/{manifest.igdb_slug}"
+
+
+def get_pending(manifests: ManifestStore, notify: bool = True, unconfirmed: Unconfirmed = "skip") -> List[GameManifest]:
+    """Prepared games whose release isn't posted yet, or (with ``notify``) not announced yet.
+
+    Games with an unconfirmed step are left out unless ``unconfirmed`` says what to do with them.
+    """
+    return [
+        m
+        for m in manifests
+        if m.complete
+        and not (m.published and (m.announced or not notify))
+        and (m.unconfirmed is None or unconfirmed != "skip")
+    ]
+
+
+async def publish_games(
+    games: List[GameManifest],
+    manifests: ManifestStore,
+    notify: bool = True,
+    concurrency: int = PUBLISH_CONCURRENCY,
+    retries: int = PUBLISH_RETRIES,
+    webhook_rate: float = WEBHOOK_RATE,
+    unconfirmed: Unconfirmed = "skip",
+) -> PublishReport:
+    """Post the release yaml of every game to portsvc and announce it on the webhook, all games concurrently.
+
+    A game is announced only once its release is posted. Both steps are recorded in the game's manifest as
+    soon as they succeed, so a re-run picks up where a failed one stopped and never announces a game twice.
+    A step whose request got no answer may have gone through, it's recorded as unconfirmed and not sent again
+    until ``unconfirmed`` is "retry" (send it again) or "done" (it went through, mark it so).
+    """
+    report = PublishReport()
+    start = time.monotonic()
+    limiter = RateLimiter(webhook_rate, WEBHOOK_BURST)
+
+    async def send(client: HttpClient, game: GameManifest, step: str, *args: Any) -> bool:
+        if game.unconfirmed == step and unconfirmed == "done":
+            return True
+        if game.unconfirmed is not None and unconfirmed == "skip":
+            return False
+        try:
+            await client.request("POST", *args)
+        except RequestUncertain as e:
+            game.unconfirmed = step
+            manifests.put(game)
+            report.unconfirmed.append((game, f"{step}: {e}"))
+            return False
+        return True
+
+    async def publish_game(client: HttpClient, game: GameManifest) -> None:
+        try:
+            if not game.published:
+                body = get_release_path(game.igdb_slug, game.uuid).read_bytes()
+                if not await send(
+                    client, game, "publish", get_release_url(game), body, {"Content-Type": "application/x-yaml"}
+                ):
+                    return
+                game.published = True
+                game.unconfirmed = None
+                manifests.put(game)
+                report.published.append(game)
+            if notify and not game.announced:
+                body = json.dumps({"content": get_game_url(game)}).encode("utf-8")
+                if not await send(
+                    client,
+                    game,
+                    "announce",
+                    DISCORD_HOOK_YAG_NEW_RELEASES_CHANNEL,
+                    body,
+                    {"Content-Type": "application/json"},
+                    limiter,
+                ):
+                    return
+                game.announced = True
+                game.unconfirmed = None
+                manifests.put(game)
+                report.announced.append(game)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            report.failed.append((game, f"{type(e).__name__}: {e}"))
+
+    async with HttpClient(concurrency, retries) as client:
+        await asyncio.gather(*(publish_game(client, game) for game in games))
+        report.http = client.stats
+    report.seconds = time.monotonic() - start
+    return report
+
+
+def run(
+    notify: bool = True,
+    dry_run: bool = False,
+    concurrency: int = PUBLISH_CONCURRENCY,
+    retries: int = PUBLISH_RETRIES,
+    webhook_rate: float = WEBHOOK_RATE,
+    unconfirmed: Unconfirmed = "skip",
+) -> None:
+    manifests = get_manifest_store()
+    games = get_pending(manifests, notify, unconfirmed)
+    if dry_run:
+        for game in games:
+            steps = [] if game.published else [f"POST {get_release_url(game)}"]
+            steps += [f"announce {get_game_url(game)}"] if notify and not game.announced else []
+            if game.unconfirmed is not None:
+                steps[0] += f" (unconfirmed, {unconfirmed})"
+            print(f"{game.igdb_slug} ({game.parent_part}): {', '.join(steps)}")
+        print(f"{len(games)} games to publish")
+        skipped = sum(1 for m in manifests if m.unconfirmed is not None) if unconfirmed == "skip" else 0
+        if skipped:
+            print(f"{skipped} games with an unconfirmed step skipped, see --unconfirmed")
+        return
+    report = asyncio.run(publish_games(games, manifests, notify, concurrency, retries, webhook_rate, unconfirmed))
+    print(f"Publish: {report}")
+    for game, error in report.failed:
+        print(f"ERROR: {game.igdb_slug} ({game.parent_part}): {error}")
+    for game, error in report.unconfirmed:
+        print(f"UNCONFIRMED: {game.igdb_slug} ({game.parent_part}): {error}, check it and re-run with --unconfirmed")
+    for game in report.published:
+        print(f"./publish.sh {game.igdb_slug} {game.uuid}")
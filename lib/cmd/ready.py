@@ -1,65 +1,153 @@
-import json
 import os
 from pathlib import Path
 from typing import (
-    List,
+    Callable,
+    Dict,
     Optional,
+    Tuple,
 )
 
+from lib.cache import FileCache
 from lib.cmd.dc import ScummvmStateEntry
-from lib.exo.scummvm import ScummvmMeta
-from lib.exo.scummvm import get_meta as get_scummvm_meta
-from lib.runner import Runner
-from lib.util import (
-    CaseInsensitiveDict,
-    get_similar_string,
+from lib.codec import get_codec
+from lib.context import RunContext
+from lib.exo.dc import ScummvmMeta
+from lib.exo.scummvm import (
+    SCUMMVM_TXT,
+    SCUMMVM_XML,
+)
+from lib.exo.scummvm import iter_meta as iter_scummvm_meta
+from lib.join import JoinReport
+from lib.match import (
+    MatchCache,
+    match_iter,
+)
+from lib.runner import (
+    Runner,
+    select_runners,
+)
+from lib.shard import Shard
+from lib.state import StateStore
+from lib.timings import (
+    phase,
+    stream_phases,
 )
 from lib.yag.igdb import IgdbGame
-from lib.yag.igdb import get_data as get_igdb_data
-from lib.yag.ports import get_ports_metadata as get_ports_data
+from lib.yag.igdb_snapshot import IgdbSnapshot
+from lib.yag.ports_index import PortsIndex
+from lib.zipscan import (
+    SCAN_WORKERS,
+    ListZips,
+)
 
 EXO_DATA_DIR = Path(os.environ["EXO_DATA_DIR"])
-PORTS_SRC_DIR = Path(os.environ["PORTS_SRC_DIR"])
-SCRAPERS_DATA_DIR = Path(os.environ["SCRAPERS_DATA_DIR"])
+
+
+def get_scummvm_state_path(shard: Optional[Shard] = None) -> Path:
+    if shard is None:
+        return EXO_DATA_DIR / "tmp" / "scummvm-state.db"
+    return EXO_DATA_DIR / "tmp" / f"scummvm-state.shard-{shard.index}-of-{shard.count}.db"
+
+
+def get_scummvm_state_json_path() -> Path:
+    return EXO_DATA_DIR / "tmp" / "scummvm-state.json"
+
+
+def _state_entry(
+    sm: ScummvmMeta, sim: Tuple[str, float], igdb_data: IgdbSnapshot, ports_index: PortsIndex
+) -> ScummvmStateEntry:
+    igdb_entry: Optional[IgdbGame] = igdb_data.find_by_name(sim[0])
+    if igdb_entry is None:
+        raise KeyError(sim[0])
+    ports_entry = ports_index.get(igdb_entry.slug) if igdb_entry.slug else None
+    return ScummvmStateEntry(
+        **vars(sm),
+        igdb=ScummvmStateEntry.IgdbMeta(
+            slug=igdb_entry.slug,
+            name=igdb_entry.name,
+            title_sim_ratio=sim[1],
+            publisher=igdb_entry.publisher,
+        ),
+        in_ports=ports_entry is not None,
+        ports_year=ports_entry.year_released if ports_entry else None,
+    )
 
 
 # merger
-def gen_scummvm_state(igdb_data: List[IgdbGame], ports_meta: List[dict]) -> None:
-    scummvm_meta: List[ScummvmMeta] = get_scummvm_meta(Path(EXO_DATA_DIR))
-    final_res: List[ScummvmStateEntry] = []
-    igdb_titles_set = set({game.name.lower() for game in igdb_data})
-    igdb_titles_dict = CaseInsensitiveDict({game.name: game for game in igdb_data})
-    ports_slugs_dict = CaseInsensitiveDict({port["descr"]["igdb_slug"]: port for port in ports_meta})
-    for sm in scummvm_meta:
-        sim = get_similar_string(sm.title.lower(), igdb_titles_set)
-        igdb_entry: IgdbGame = igdb_titles_dict[sim[0]]
-        ports_entry = ports_slugs_dict.get(igdb_entry.slug, None)
-        fin_entry = ScummvmStateEntry(
-            **vars(sm),
-            igdb=ScummvmStateEntry.IgdbMeta(
-                slug=igdb_entry.slug,
-                name=igdb_entry.name,
-                title_sim_ratio=sim[1],
-                publisher=igdb_entry.publisher,
-            ),
-            in_ports=ports_entry is not None,
-            ports_year=ports_entry["descr"]["year_released"] if ports_entry else None,
+def gen_scummvm_state(
+    igdb_data: IgdbSnapshot,
+    ports_index: PortsIndex,
+    jobs: int = 1,
+    shard: Optional[Shard] = None,
+    cache: Optional[FileCache] = None,
+    scan_workers: int = SCAN_WORKERS,
+    list_zips: Optional[ListZips] = None,
+    match_cache: Optional[MatchCache] = None,
+) -> None:
+    report = JoinReport()
+    if match_cache is not None:
+        with phase("match"):
+            match_cache.bind(igdb_data.titles)
+    dump = get_codec(ScummvmStateEntry).dump
+    # games flow from the archive scan through matching into the store one chunk at a time, never all at once,
+    # every stage is still timed as a phase of its own
+    with stream_phases("state_dump") as stages, StateStore(get_scummvm_state_path(shard)) as store:
+        scummvm_meta = stages.wrap(
+            "get_meta", iter_scummvm_meta(EXO_DATA_DIR, report, shard, cache, scan_workers, list_zips)
         )
-        final_res.append(fin_entry)
-        final_res = sorted(final_res, key=lambda fr: fr.title.lower())
-    with open(EXO_DATA_DIR / "tmp" / "scummvm-state.json", "w", encoding="utf-8") as f:
-        json.dump([ScummvmStateEntry.Schema().dump(fr) for fr in final_res], f, indent=4)
-
-
-def run(runner: Optional[Runner]) -> None:
-    ports_meta = get_ports_data(Path(PORTS_SRC_DIR))
-    igdb_data = get_igdb_data(Path(SCRAPERS_DATA_DIR))
-    if runner == Runner.SCUMMVM:
-        gen_scummvm_state(igdb_data, ports_meta)
-    elif runner == Runner.DOS:
-        pass
-    elif runner == Runner.WIN3X:
-        pass
-    else:
-        gen_scummvm_state(igdb_data, ports_meta)
-        pass
+        matches = stages.wrap(
+            "match",
+            match_iter(scummvm_meta, lambda sm: sm.title.lower(), igdb_data.titles, jobs=jobs, cache=match_cache),
+        )
+        stages.count = store.replace_all(dump(_state_entry(sm, sim, igdb_data, ports_index)) for sm, sim in matches)
+    for key in report.missing[SCUMMVM_TXT]:
+        print(f"ERROR: entry is absent in scummvm.txt: {key}")
+    for key in report.missing[SCUMMVM_XML]:
+        print(f"ERROR: entry is absent in scummvm.xml: {key}")
+    for key in report.ambiguous[SCUMMVM_TXT]:
+        print(f"ERROR: release matches several scummvm.txt entries: {key}")
+    if shard is None:
+        # with a shard most of scummvm.txt belongs to other shards, so this can't be told apart
+        for key in report.unused[SCUMMVM_TXT]:
+            print(f"ERROR: entry is present only in scummvm.txt: {key}")
+    if cache and cache.enabled:
+        print(f"Parse cache: {cache.stats}")
+    if match_cache and match_cache.enabled:
+        match_cache.save()
+        print(f"Title match cache: {match_cache.stats}")
+
+
+def ready_scummvm(ctx: RunContext) -> None:
+    gen_scummvm_state(
+        ctx.igdb,
+        ctx.ports_index,
+        jobs=ctx.jobs,
+        shard=ctx.shard,
+        cache=ctx.cache,
+        scan_workers=ctx.scan_workers,
+        list_zips=ctx.list_zips,
+        match_cache=ctx.match_cache,
+    )
+
+
+# a runner contributes its metadata parsers and matching, IGDB, ports and archive listings come from the context
+STATE_GENERATORS: Dict[Runner, Callable[[RunContext], None]] = {
+    Runner.SCUMMVM: ready_scummvm,
+}
+
+
+def gen_states(runner: Optional[Runner], ctx: RunContext) -> None:
+    for r in select_runners(runner, STATE_GENERATORS):
+        STATE_GENERATORS[r](ctx)
+
+
+def run(
+    runner: Optional[Runner],
+    jobs: int = 1,
+    shard: Optional[Shard] = None,
+    use_cache: bool = True,
+    cache_hash: bool = False,
+    scan_workers: int = SCAN_WORKERS,
+) -> None:
+    with RunContext(jobs, shard, use_cache, cache_hash, scan_workers) as ctx:
+        gen_states(runner, ctx)
@@ -0,0 +1,49 @@
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    Optional,
+)
+
+from lib.cmd.ready import (
+    get_scummvm_state_json_path,
+    get_scummvm_state_path,
+)
+from lib.runner import (
+    Runner,
+    select_runners,
+)
+from lib.shard import Shard
+from lib.state import StateStore
+
+
+def export_scummvm_state(json_path: Optional[Path], shard: Optional[Shard]) -> None:
+    json_path = json_path or get_scummvm_state_json_path()
+    with StateStore(get_scummvm_state_path(shard)) as store:
+        count = store.export_json(json_path)
+    print(f"Exported {count} entries to {json_path}")
+
+
+def import_scummvm_state(json_path: Optional[Path], shard: Optional[Shard]) -> None:
+    json_path = json_path or get_scummvm_state_json_path()
+    with StateStore(get_scummvm_state_path(shard)) as store:
+        count = store.import_json(json_path)
+    print(f"Imported {count} entries from {json_path}")
+
+
+STATE_EXPORTERS: Dict[Runner, Callable[[Optional[Path], Optional[Shard]], None]] = {
+    Runner.SCUMMVM: export_scummvm_state,
+}
+STATE_IMPORTERS: Dict[Runner, Callable[[Optional[Path], Optional[Shard]], None]] = {
+    Runner.SCUMMVM: import_scummvm_state,
+}
+
+
+def run_export(runner: Optional[Runner], json_path: Optional[Path], shard: Optional[Shard] = None) -> None:
+    for r in select_runners(runner, STATE_EXPORTERS):
+        STATE_EXPORTERS[r](json_path, shard)
+
+
+def run_import(runner: Optional[Runner], json_path: Optional[Path], shard: Optional[Shard] = None) -> None:
+    for r in select_runners(runner, STATE_IMPORTERS):
+        STATE_IMPORTERS[r](json_path, shard)
@@ -1,29 +1,64 @@
-import json
 import os
 import random
+from dataclasses import dataclass
 from pathlib import Path
 from typing import (
+    Callable,
+    Dict,
     List,
     Optional,
 )
 
-from lib.cmd.ready import ScummvmStateEntry
-from lib.cmd.ready import run as run_ready
-from lib.runner import Runner
+from lib.blobstore import BlobStore
+from lib.cmd.ready import (
+    ScummvmStateEntry,
+    gen_states,
+    get_scummvm_state_path,
+)
+from lib.context import RunContext
+from lib.extract import (
+    IO_BUDGET,
+    ExtractStats,
+)
+from lib.pipeline import (
+    ByteBudget,
+    run_pipeline,
+)
+from lib.runner import (
+    Runner,
+    select_runners,
+)
+from lib.shard import (
+    Shard,
+    stable_hash,
+)
+from lib.state import StateStore
+from lib.timings import phase
 from lib.yag.ports import (
     add_scummvm_game,
     get_best_release,
 )
+from lib.yag.scummvm import (
+    get_blob_store_path,
+    get_manifest_store,
+)
+from lib.yag.scummvm import remove_game as scummvm_remove_game
+from lib.zipscan import SCAN_WORKERS
 
 EXO_DATA_DIR = Path(os.environ["EXO_DATA_DIR"])
-SCRAPERS_DATA_DIR = Path(os.environ["SCRAPERS_DATA_DIR"])
-DISCORD_HOOK_YAG_NEW_RELEASES_CHANNEL = os.environ["DISCORD_HOOK_YAG_NEW_RELEASES_CHANNEL"]
 
 PREPARE_GAMES_LIMIT = 10
 MAX_YEAR = 2010
 
 
-def prepare_scummvm_games() -> None:
+def prepare_scummvm_games(
+    shard: Optional[Shard] = None,
+    seed: Optional[int] = None,
+    jobs: int = 1,
+    limit: int = PREPARE_GAMES_LIMIT,
+    dedup: bool = False,
+    verify: bool = False,
+) -> None:
     def _skip_title(title: str) -> bool:
         skip_titles = {
             "eXoScummVM",
@@ -35,55 +70,107 @@ def prepare_scummvm_games() -> None:
         }
         return title in skip_titles or "myst" in title.lower()
 
-    def get_good_scummvm_games(entries: List[ScummvmStateEntry], limit: int) -> List[ScummvmStateEntry]:
+    def get_good_scummvm_games(store: StateStore, limit: int) -> List[ScummvmStateEntry]:
         filtered_entries = []
-        for entry in entries:
+        # title_sim_ratio > 0.9, not in ports, released before MAX_YEAR, with a publisher and a supported
+        # scummvm version are matched on indexed columns, only the rest is checked on loaded entries
+        for entry in store.find(min_title_sim_ratio=0.9, max_release_year=MAX_YEAR, scummvm_vers=["2.9.0", "None"]):
             best_release = get_best_release(entry.releases)
-            if (
-                (entry.igdb.title_sim_ratio > 0.9)
-                and (not entry.in_ports)
-                and (entry.release_year < MAX_YEAR)
-                and (entry.igdb.publisher is not None)
-                and (best_release is not None)
-                and (best_release.has_menu is False)
-                and (entry.scummvm_ver == "2.9.0" or entry.scummvm_ver == "None")
-                and _skip_title(entry.title) is False
-            ):
+            if (best_release is not None) and (best_release.has_menu is False) and _skip_title(entry.title) is False:
                 filtered_entries.append(entry)
         # return random subset to avoid alphabetical bias
-        return random.sample(filtered_entries, min(limit, len(filtered_entries)))
-
-    with open(EXO_DATA_DIR / "tmp" / "scummvm-state.json", "r", encoding="utf-8") as f:
-        all_games = [ScummvmStateEntry.Schema().load(entry) for entry in json.load(f)]
-        good_games = get_good_scummvm_games(all_games, limit=PREPARE_GAMES_LIMIT)
-        for game in good_games:
-            add_scummvm_game(game)
-        for game in good_games:
-            print(
-                f"curl --request POST \\\n"
-                f"  --url http://portsvc.yag.dc:8087/ports/apps/{game.igdb.slug}/releases/{game.uuid} \\\n"
-                f"  --header 'content-type: application/x-yaml' \\\n"
-                f"  --header 'user-agent: vscode-restclient' \\\n"
-                f"  --data-binary '@/workspaces/ports/ports/games/{game.igdb.slug}/{game.uuid}.yaml'\n"
-            )
-        for game in good_games:
-            print(f"./publish.sh {game.igdb.slug} {game.uuid}\n")
-        for game in good_games:
-            print(
-                f'curl -X POST "{DISCORD_HOOK_YAG_NEW_RELEASES_CHANNEL}" \\\n'
-                f'     -H "Content-Type: application/json" \\\n'
-                f'     -d \'{{"content": "https://yag.im/games/{game.uuid}/{game.igdb.slug}"}}\'\n'
-            )
-
-
-def run(runner: Optional[Runner]) -> None:
-    run_ready(runner)
-    if runner == Runner.SCUMMVM:
-        prepare_scummvm_games()
-    elif runner == Runner.DOS:
-        pass
-    elif runner == Runner.WIN3X:
-        pass
-    else:
-        prepare_scummvm_games()
-        pass
+        if seed is None:
+            return random.sample(filtered_entries, min(limit, len(filtered_entries)))  # nosec B311: not a secret
+        # a seeded per-game rank doesn't depend on which shard a game landed in: a game the full state would
+        # pick ranks no worse among its shard's games, so the shards pick those and up to ``limit`` more each
+        return sorted(filtered_entries, key=lambda e: stable_hash(f"{seed}:{e.parent_part}"))[:limit]
+
+    manifests = get_manifest_store()
+    with phase("select_games") as p, StateStore(get_scummvm_state_path(shard)) as store:
+        good_games = get_good_scummvm_games(store, limit=limit)
+        # games an interrupted run didn't finish (and with verify all prepared games) are taken up first
+        prepared = list(manifests)
+        resumed = store.get_many([m.parent_part for m in prepared if not m.complete])
+        verified = store.get_many([m.parent_part for m in prepared if m.complete]) if verify else []
+        prepared_keys = {m.parent_part.lower() for m in prepared}
+        known_keys = {game.parent_part.lower() for game in resumed + verified}
+        games = resumed + verified + [game for game in good_games if game.parent_part.lower() not in known_keys]
+        p.count = len(games)
+    for game in games:
+        manifest = manifests.get(game.parent_part)
+        if manifest is not None:
+            # keep the uuid the game was started with instead of the fresh one from ready
+            game.uuid = manifest.uuid
+    # games are added concurrently, each one as a whole: installer, game data, run scripts
+    budget = ByteBudget(IO_BUDGET)
+    blobs = BlobStore(get_blob_store_path()) if dedup else None
+
+    def add_game(game: ScummvmStateEntry) -> ExtractStats:
+        with phase("add_scummvm_game", game.igdb.slug) as p:
+            stats = add_scummvm_game(game, budget, blobs, manifests, verify)
+            p.count = stats.files
+            return stats
+
+    def remove_new_game(game: ScummvmStateEntry) -> None:
+        # a game prepared before is left for the next run to repair, its manifest is incomplete now
+        if game.parent_part.lower() not in prepared_keys:
+            scummvm_remove_game(game)
+
+    report = run_pipeline(games, add_game, jobs=jobs, on_error=remove_new_game)
+    for game, stats in report.done:
+        if stats.files or not stats.files_kept:
+            print(f"{game.igdb.slug}: extracted {stats}")
+        else:
+            print(f"{game.igdb.slug}: up to date, {stats.files_kept} files")
+    print(
+        f"Prepared {report} ({len(resumed)} resumed{f', {len(verified)} verified' if verify else ''}), "
+        f"{sum(stats.files for _, stats in report.done)} files, "
+        f"{sum(stats.bytes_written for _, stats in report.done) / 2**20:.2f} MiB"
+    )
+    for game, error in report.failed:
+        kept = ", kept for repair" if game.parent_part.lower() in prepared_keys else ""
+        print(f"ERROR: {game.igdb.slug} ({game.parent_part}): {error}{kept}")
+    if blobs is not None:
+        blobs.save()
+        print(f"Blob store: {blobs.report()}")
+    # games that were already up to date have been published by the run that prepared them
+    new_games = [game for game, stats in report.done if stats.files or not stats.files_kept]
+    if new_games:
+        print(f"{len(new_games)} new releases, post and announce them with: exoconv publish")
+
+
+@dataclass
+class PrepareOptions:
+    seed: Optional[int] = None
+    limit: int = PREPARE_GAMES_LIMIT
+    dedup: bool = False
+    verify: bool = False
+
+
+def steady_scummvm(ctx: RunContext, opts: PrepareOptions) -> None:
+    prepare_scummvm_games(ctx.shard, opts.seed, ctx.jobs, opts.limit, opts.dedup, opts.verify)
+
+
+# a runner contributes its game selection rules and installers on top of the state its ready step generated
+PREPARERS: Dict[Runner, Callable[[RunContext, PrepareOptions], None]] = {
+    Runner.SCUMMVM: steady_scummvm,
+}
+
+
+def run(
+    runner: Optional[Runner],
+    shard: Optional[Shard] = None,
+    seed: Optional[int] = None,
+    use_cache: bool = True,
+    cache_hash: bool = False,
+    scan_workers: int = SCAN_WORKERS,
+    jobs: int = 1,
+    limit: int = PREPARE_GAMES_LIMIT,
+    dedup: bool = False,
+    verify: bool = False,
+) -> None:
+    opts = PrepareOptions(seed, limit, dedup, verify)
+    with RunContext(jobs, shard, use_cache, cache_hash, scan_workers) as ctx:
+        gen_states(runner, ctx)
+        for r in select_runners(runner, PREPARERS):
+            PREPARERS[r](ctx, opts)
@@ -0,0 +1,133 @@
+import dataclasses
+import functools
+import itertools
+from types import NoneType
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+    get_args,
+    get_origin,
+)
+
+T = TypeVar("T")
+
+# items per schema call when a stream is loaded with validation
+LOAD_BATCH_SIZE = 1000
+
+_Converter = Optional[Callable[[Any], Any]]
+_Dumper = Callable[[Any], Dict[str, Any]]
+_Loader = Callable[[Dict[str, Any]], Any]
+
+# per dataclass, built on first use
+_dumpers: Dict[type, _Dumper] = {}
+_loaders: Dict[type, _Loader] = {}
+
+
+def _converter(tp: Any, nested: Callable[[type], Callable[[Any], Any]]) -> _Converter:
+    # None means the value is used as is, ``nested`` converts dataclass values
+    if dataclasses.is_dataclass(tp):
+        return nested(tp)  # type: ignore[arg-type]
+    origin = get_origin(tp)
+    if origin is Union:
+        args = [arg for arg in get_args(tp) if arg is not NoneType]
+        inner = _converter(args[0], nested) if len(args) == 1 else None
+        if inner is None:
+            return None
+        return lambda v: None if v is None else inner(v)
+    if origin is list:
+        (arg,) = get_args(tp) or (Any,)
+        item = _converter(arg, nested)
+        if item is None:
+            return list
+        return lambda v: [item(x) for x in v]
+    return None
+
+
+def _dumper(cls: type) -> _Dumper:
+    if cls in _dumpers:
+        return _dumpers[cls]
+    plan = [(f.name, _converter(f.type, _dumper)) for f in dataclasses.fields(cls)]
+
+    def dump(obj: Any) -> Dict[str, Any]:
+        res = {}
+        for name, conv in plan:
+            value = getattr(obj, name)
+            res[name] = value if conv is None else conv(value)
+        return res
+
+    _dumpers[cls] = dump
+    return dump
+
+
+def _loader(cls: type) -> _Loader:
+    if cls in _loaders:
+        return _loaders[cls]
+    plan = [(f.name, _converter(f.type, _loader)) for f in dataclasses.fields(cls) if f.init]
+
+    def load(data: Dict[str, Any]) -> Any:
+        kwargs = {}
+        for name, conv in plan:
+            if name in data:
+                value = data[name]
+                kwargs[name] = value if conv is None else conv(value)
+        return cls(**kwargs)
+
+    _loaders[cls] = load
+    return load
+
+
+class Codec(Generic[T]):
+    """Batch (de)serializer for the marshmallow dataclasses.
+
+    The trusted path converts between dataclasses and dicts directly and is meant for files this tool
+    wrote itself; the validated path runs the marshmallow schema, built once per batch, for external input.
+    Both produce the same dicts and objects the schema does.
+    """
+
+    def __init__(self, cls: Type[T]) -> None:
+        self.cls = cls
+        self._load = _loader(cls)
+        self._dump = _dumper(cls)
+
+    def dump_many(self, objs: Iterable[T], trusted: bool = True) -> List[dict]:
+        if trusted:
+            dump = self._dump
+            return [dump(obj) for obj in objs]
+        return list(self.cls.Schema(many=True).dump(list(objs)))  # type: ignore[attr-defined]
+
+    def load_many(self, data: Iterable[dict], trusted: bool = True) -> List[T]:
+        if trusted:
+            load = self._load
+            return [load(item) for item in data]
+        return list(self.cls.Schema(many=True).load(list(data)))  # type: ignore[attr-defined]
+
+    def load_iter(self, data: Iterable[dict], trusted: bool = True) -> Iterator[T]:
+        """``load_many()`` over a stream, validated ``LOAD_BATCH_SIZE`` items at a time by a single schema."""
+        if trusted:
+            load = self._load
+            yield from (load(item) for item in data)
+            return
+        schema = self.cls.Schema(many=True)  # type: ignore[attr-defined]
+        items = iter(data)
+        while batch := list(itertools.islice(items, LOAD_BATCH_SIZE)):
+            yield from schema.load(batch)
+
+    def dump(self, obj: T, trusted: bool = True) -> dict:
+        return self.dump_many([obj], trusted)[0]
+
+    def load(self, data: dict, trusted: bool = True) -> T:
+        return self.load_many([data], trusted)[0]
+
+
+@functools.cache
+def get_codec(cls: Type[T]) -> Codec[T]:
+    return Codec(cls)
@@ -0,0 +1,98 @@
+import functools
+import os
+from pathlib import Path
+from typing import (
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from lib.cache import (
+    FileCache,
+    get_parse_cache,
+    get_ports_cache,
+)
+from lib.match import (
+    MatchCache,
+    get_match_cache,
+)
+from lib.shard import Shard
+from lib.timings import phase
+from lib.yag.igdb_snapshot import IgdbSnapshot
+from lib.yag.igdb_snapshot import get_snapshot as get_igdb_snapshot
+from lib.yag.ports_index import (
+    PortsIndex,
+    get_ports_index,
+)
+from lib.zipdir import release_names
+from lib.zipscan import (
+    SCAN_WORKERS,
+    ScanResult,
+    ScanStats,
+    scan_zips,
+)
+
+EXO_DATA_DIR = Path(os.environ["EXO_DATA_DIR"])
+PORTS_SRC_DIR = Path(os.environ["PORTS_SRC_DIR"])
+SCRAPERS_DATA_DIR = Path(os.environ["SCRAPERS_DATA_DIR"])
+
+
+def get_igdb_snapshot_path() -> Path:
+    return EXO_DATA_DIR / "tmp" / "igdb.snapshot"
+
+
+class RunContext:
+    """What a ready/steady run shares between the runners: IGDB data, the ports index, the parse and title match
+    caches and the archive lister.
+
+    Everything is loaded on first use and at most once per process, so processing all runners in one pass reads
+    IGDB and the ports tree once, not once per runner. Archive listings aren't kept: every runner scans its own
+    tree and holding them would make memory grow with the collection, the parse cache spares the re-reads.
+    """
+
+    def __init__(
+        self,
+        jobs: int = 1,
+        shard: Optional[Shard] = None,
+        use_cache: bool = True,
+        cache_hash: bool = False,
+        scan_workers: int = SCAN_WORKERS,
+    ) -> None:
+        self.jobs = jobs
+        self.shard = shard
+        self.use_cache = use_cache
+        self.scan_workers = scan_workers
+        self.cache: FileCache = get_parse_cache(EXO_DATA_DIR, enabled=use_cache, content_hash=cache_hash)
+        self.match_cache: MatchCache = get_match_cache(EXO_DATA_DIR, enabled=use_cache)
+
+    @functools.cached_property
+    def ports_index(self) -> PortsIndex:
+        with phase("get_ports_metadata") as p:
+            ports_index = get_ports_index(
+                PORTS_SRC_DIR, get_ports_cache(EXO_DATA_DIR, enabled=self.use_cache), jobs=self.jobs
+            )
+            p.count = len(ports_index)
+        print(ports_index.summary())
+        return ports_index
+
+    @functools.cached_property
+    def igdb(self) -> IgdbSnapshot:
+        with phase("get_igdb_data") as p:
+            igdb_data = get_igdb_snapshot(SCRAPERS_DATA_DIR, get_igdb_snapshot_path())
+            p.count = len(igdb_data)
+        return igdb_data
+
+    def list_zips(self, paths: Sequence[Path]) -> Tuple[List[ScanResult[List[str]]], ScanStats]:
+        """Release discovery names (see ``release_names()``) of the archives at ``paths``, in ``paths`` order."""
+        return scan_zips(paths, release_names, self.scan_workers)
+
+    def close(self) -> None:
+        if "igdb" in self.__dict__:
+            self.igdb.close()
+
+    def __enter__(self) -> "RunContext":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
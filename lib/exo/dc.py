@@ -1,8 +1,11 @@
 from typing import (
+    ClassVar,
     List,
     Optional,
+    Type,
 )
 
+from marshmallow import Schema
 from marshmallow_dataclass import dataclass
 
 
@@ -17,6 +20,7 @@ class GameMeta0:
 
     parent_part: str
     releases: List[Entity]
+    Schema: ClassVar[Type[Schema]] = Schema  # pylint: disable=invalid-name
 
 
 @dataclass
@@ -27,6 +31,7 @@ class GameMeta1:
     rating: str
     release_year: int
     genre: List[str]
+    Schema: ClassVar[Type[Schema]] = Schema  # pylint: disable=invalid-name
 
 
 @dataclass
@@ -34,6 +39,7 @@ class GameMeta2:
     parent_part: str
     scummvm_game: str
     scummvm_ver: Optional[str]
+    Schema: ClassVar[Type[Schema]] = Schema  # pylint: disable=invalid-name
 
 
 @dataclass
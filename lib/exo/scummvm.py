@@ -1,24 +1,53 @@
+import functools
+import operator
 import os
 import zipfile
 from pathlib import Path
 from typing import (
+    Any,
+    Dict,
+    Iterator,
     List,
     Optional,
+    Set,
+    Tuple,
 )
 
 import defusedxml.ElementTree as ET
 
+from lib.cache import FileCache
+from lib.classify import KeywordClassifier
 from lib.exo.dc import (
     GameMeta0,
     GameMeta1,
     GameMeta2,
     ScummvmMeta,
 )
-from lib.util import CaseInsensitiveDict
+from lib.join import (
+    JoinReport,
+    KeyIndex,
+    join_iter,
+    norm_key,
+)
+from lib.shard import (
+    Shard,
+    owns,
+)
+from lib.zipdir import release_names
+from lib.zipscan import (
+    SCAN_WORKERS,
+    ListZips,
+    ScanStats,
+    scan_zips,
+)
 
+SCUMMVM_XML = "scummvm.xml"
+SCUMMVM_TXT = "scummvm.txt"
+SCAN_BATCH = 256
 
-def _extract_platform(path_part: str) -> Optional[str]:
-    platforms = {
+
+PLATFORMS = KeywordClassifier(
+    [
         "Acorn",
         "Advsys",
         "Amiga",
@@ -41,41 +70,46 @@ def _extract_platform(path_part: str) -> Optional[str]:
         "Windows",
         "ZCode",
         "ZX Spectrum",
-    }
-    return next((platform for platform in platforms if platform.lower() in path_part.lower()), None)
-
-
-def _extract_distro_format(path_part: str) -> Optional[str]:
-    distros = {"CD", "DVD", "Floppy"}
-    return next((distro for distro in distros if distro.lower() in path_part.lower()), None)
+    ]
+)
+DISTRO_FORMATS = KeywordClassifier(["CD", "DVD", "Floppy"])
 
 
-def _parse_XOScummVMMetadata(zip_path: Path) -> List[GameMeta1]:  # pylint: disable=invalid-name
-    xml_files = {
+def _iter_XOScummVMMetadata(zip_path: Path) -> Iterator[GameMeta1]:  # pylint: disable=invalid-name
+    xml_files = [
         "xml/all/ScummVM.xml",
         "xml/all/ScummVM SVN.xml",
-    }
-    res = []
-    for xml_file in xml_files:
-        with zipfile.ZipFile(zip_path, "r") as zip_ref:
+    ]
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        for xml_file in xml_files:
             with zip_ref.open(xml_file) as f:
-                tree = ET.parse(f)
-                root = tree.getroot()
-                for game in root.findall("Game"):
-                    if game.findtext("Title") == "eXoScummVM":
-                        # Setup eXoScummVM.bat "game". A bug?
+                # stream <Game> elements (direct children of the root) and drop each one once it's consumed,
+                # so memory doesn't grow with the size of the xml
+                context = ET.iterparse(f, events=("start", "end"))
+                _, root = next(context)
+                depth = 1
+                for event, elem in context:
+                    if event == "start":
+                        depth += 1
+                        continue
+                    depth -= 1
+                    if depth != 1:
                         continue
-                    res.append(
-                        GameMeta1(
-                            game.findtext("RootFolder").split("\\")[-1],
-                            game.findtext("Title"),
-                            game.findtext("Publisher"),
-                            game.findtext("Rating"),
-                            int(game.findtext("ReleaseYear")),
-                            game.findtext("Genre").split("; "),
+                    if elem.tag == "Game" and elem.findtext("Title") != "eXoScummVM":
+                        # skipping Setup eXoScummVM.bat "game". A bug?
+                        yield GameMeta1(
+                            elem.findtext("RootFolder").split("\\")[-1],
+                            elem.findtext("Title"),
+                            elem.findtext("Publisher"),
+                            elem.findtext("Rating"),
+                            int(elem.findtext("ReleaseYear")),
+                            elem.findtext("Genre").split("; "),
                         )
-                    )
-    return res
+                    root.clear()
+
+
+def _parse_XOScummVMMetadata(zip_path: Path) -> List[GameMeta1]:  # pylint: disable=invalid-name
+    return list(_iter_XOScummVMMetadata(zip_path))
 
 
 def _parse_utilSVM(zip_path: Path) -> List[GameMeta2]:  # pylint: disable=invalid-name
@@ -96,89 +130,171 @@ def _parse_utilSVM(zip_path: Path) -> List[GameMeta2]:  # pylint: disable=invali
     return res
 
 
-def _parse_eXoScummVM(root_dir: Path) -> List[GameMeta0]:  # pylint: disable=invalid-name
-    res = []
-    zip_files = [f for f in os.listdir(root_dir) if f.endswith(".zip")]
-    for zip_file in zip_files:
-        zip_path = os.path.join(root_dir, zip_file)
-        with zipfile.ZipFile(zip_path, "r") as zip_ref:
-            file_list = set(zip_ref.namelist())
-            game_meta0 = GameMeta0("", [])
-            for file_path in file_list:
-                # matching only paths like e.g.: /1.5 Ritter (Windows)/1.5 Ritter (Windows)/
-                if file_path.endswith("/"):
-                    path_parts = file_path.strip("/").split("/")
-                    if len(path_parts) != 2:
-                        continue
-                    has_menu = file_path + "menu.txt" in file_list
-                    platform = _extract_platform(path_parts[1]) or _extract_platform(path_parts[0])
-                    distro_fmt = _extract_distro_format(path_parts[1]) or _extract_distro_format(path_parts[0])
-                    child_part = path_parts[1]
-                    game_meta0.releases.append(GameMeta0.Entity(child_part, has_menu, platform, distro_fmt))
-                    game_meta0.parent_part = path_parts[0]
-            res.append(game_meta0)
-    return res
+def _parse_eXoScummVM_names(names: List[str]) -> GameMeta0:  # pylint: disable=invalid-name
+    file_list = set(names)
+    game_meta0 = GameMeta0("", [])
+    releases = []
+    # walk in archive order, set order changes between processes and so would the releases order
+    for file_path in names:
+        # matching only paths like e.g.: /1.5 Ritter (Windows)/1.5 Ritter (Windows)/
+        if file_path.endswith("/"):
+            path_parts = file_path.strip("/").split("/")
+            if len(path_parts) != 2:
+                continue
+            releases.append((path_parts[1], file_path + "menu.txt" in file_list))
+            game_meta0.parent_part = path_parts[0]
+    # every release dir and the parent dir are classified at once, a release takes the parent's when it has none
+    parts = [child_part for child_part, _ in releases] + [game_meta0.parent_part]
+    platforms = PLATFORMS.classify_many(parts)
+    distro_fmts = DISTRO_FORMATS.classify_many(parts)
+    for ix, (child_part, has_menu) in enumerate(releases):
+        game_meta0.releases.append(
+            GameMeta0.Entity(child_part, has_menu, platforms[ix] or platforms[-1], distro_fmts[ix] or distro_fmts[-1])
+        )
+    return game_meta0
 
 
-def _upd_releases(meta_arr: List[ScummvmMeta], meta2_arr: List[GameMeta2]) -> None:
-    releases_dict = CaseInsensitiveDict({})
-    for m in meta_arr:
-        for ix, r in enumerate(m.releases):
-            releases_dict[r.child_part] = (m.parent_part, ix)
+def _iter_eXoScummVM(  # pylint: disable=invalid-name
+    root_dir: Path, cache: FileCache, list_zips: ListZips, shard: Optional[Shard] = None
+) -> Iterator[GameMeta0]:
+    # game archives are named after their parent_part, so foreign shards are skipped without opening them
+    zip_paths = sorted(
+        root_dir / f for f in os.listdir(root_dir) if f.endswith(".zip") and owns(shard, f[: -len(".zip")])
+    )
+    schema = GameMeta0.Schema()
+    stats = ScanStats()
+    # archives are listed a batch at a time, so only one batch of results is held at once
+    for ix in range(0, len(zip_paths), SCAN_BATCH):
+        batch = zip_paths[ix : ix + SCAN_BATCH]
+        cached: Dict[Path, GameMeta0] = {}
+        for zip_path in batch:
+            meta0 = cache.get(zip_path, schema)
+            if meta0 is not None:
+                cached[zip_path] = meta0
+        scan_res, scan_stats = list_zips([zip_path for zip_path in batch if zip_path not in cached])
+        stats.add(scan_stats)
+        for r in scan_res:
+            if r.value is not None:
+                cached[r.path] = _parse_eXoScummVM_names(r.value)
+                cache.put(r.path, schema, cached[r.path])
+            else:
+                print(f"ERROR: unable to read {r.path}: {r.error}")
+        yield from (cached[zip_path] for zip_path in batch if zip_path in cached)
+    if stats.files:
+        print(f"Scanned {stats}")
 
-    meta_dict = CaseInsensitiveDict({m.parent_part: m for m in meta_arr})
 
-    for m2 in meta2_arr:
-        if (m2.parent_part not in releases_dict) and (m2.parent_part not in meta_dict):
-            print(f"ERROR: entry is present only in scummvm.txt: {m2.parent_part}")
-            continue
-        if m2.parent_part in meta_dict:
-            continue
-        release_descr = releases_dict[m2.parent_part]
-        release: ScummvmMeta.Entity = meta_dict[release_descr[0]].releases[release_descr[1]]
-        release.scummvm_game = m2.scummvm_game
-        release.scummvm_ver = m2.scummvm_ver
+class _ReleaseLines:
+    """The scummvm.txt lines of releases, by name. Release dirs aren't unique across games, games of the same
+    name from different years have release dirs of the same name. The line of a game's release is the one with
+    the game's scummvm id, or else the one listed after the game's own line.
+    """
 
+    def __init__(self, lines: List[GameMeta2], parent_keys: Set[str]) -> None:
+        self._by_key: Dict[str, List[int]] = {}
+        # position of every line, and of the game line each one follows
+        self._pos = {id(line): ix for ix, line in enumerate(lines)}
+        self._owner: List[int] = []
+        owner = -1
+        for ix, line in enumerate(lines):
+            key = norm_key(line.parent_part)
+            if key in parent_keys:
+                owner = ix
+            else:
+                self._by_key.setdefault(key, []).append(ix)
+            self._owner.append(owner)
+        self._lines = lines
 
-def get_meta(data_path: Path) -> List[ScummvmMeta]:
-    meta0_arr = _parse_eXoScummVM(data_path / "eXoScummVM" / "eXo" / "eXoScummVM")
-    meta1_arr = _parse_XOScummVMMetadata(data_path / "eXoScummVM" / "Content" / "XOScummVMMetadata.zip")
-    meta2_arr = _parse_utilSVM(data_path / "eXoScummVM" / "eXo" / "util" / "utilSVM.zip")
+    def find(self, key: str, game: GameMeta2) -> List[GameMeta2]:
+        """The lines that may be release ``key`` of ``game`` (its own scummvm.txt line), one unless ambiguous."""
+        candidates = self._by_key.get(key, [])
+        if len(candidates) > 1:
+            candidates = [ix for ix in candidates if self._lines[ix].scummvm_game == game.scummvm_game] or candidates
+        if len(candidates) > 1:
+            game_ix = self._pos.get(id(game))
+            candidates = [ix for ix in candidates if self._owner[ix] == game_ix] or candidates
+        return [self._lines[ix] for ix in candidates]
 
-    meta1_dict: CaseInsensitiveDict = CaseInsensitiveDict({meta1.parent_part: meta1 for meta1 in meta1_arr})
-    meta2_dict: CaseInsensitiveDict = CaseInsensitiveDict({meta2.parent_part: meta2 for meta2 in meta2_arr})
 
-    res = []
+def iter_meta(
+    data_path: Path,
+    report: JoinReport,
+    shard: Optional[Shard] = None,
+    cache: Optional[FileCache] = None,
+    scan_workers: int = SCAN_WORKERS,
+    list_zips: Optional[ListZips] = None,
+) -> Iterator[ScummvmMeta]:
+    """The collection's games joined with their scummvm.xml and scummvm.txt entries, one archive at a time.
 
-    for meta0 in meta0_arr:
-        scummvm_game = None
-        scummvm_ver = None
-        meta2: Optional[GameMeta2] = meta2_dict.get(meta0.parent_part)
-        if meta2:
-            scummvm_game = meta2.scummvm_game
-            scummvm_ver = meta2.scummvm_ver
-        else:
-            print(f"ERROR: entry is absent in scummvm.txt: {meta0.parent_part}")
+    Only scummvm.xml and scummvm.txt are loaded whole. Games missing from either are left out, once the
+    iterator is exhausted ``report`` lists them along with scummvm.txt lines that name neither a game nor a
+    release. Releases several scummvm.txt lines fit are left without a scummvm id and reported as ambiguous.
+    """
+    cache = cache or FileCache(None)
+    if list_zips is None:
+        list_zips = functools.partial(scan_zips, parse=release_names, workers=scan_workers)
+    game_dir = data_path / "eXoScummVM" / "eXo" / "eXoScummVM"
+    parent_part = operator.attrgetter("parent_part")
+    meta1_index = KeyIndex(
+        cache.load(
+            data_path / "eXoScummVM" / "Content" / "XOScummVMMetadata.zip",
+            GameMeta1.Schema(many=True),
+            _parse_XOScummVMMetadata,
+        ),
+        parent_part,
+    )
+    meta2_lines = cache.load(
+        data_path / "eXoScummVM" / "eXo" / "util" / "utilSVM.zip",
+        GameMeta2.Schema(many=True),
+        _parse_utilSVM,
+    )
+    meta2_index = KeyIndex(meta2_lines, parent_part)
+    # scummvm.txt lines naming a game are never applied to a release, archives are named after their game
+    parent_keys = {norm_key(f[: -len(".zip")]) for f in os.listdir(game_dir) if f.endswith(".zip")}
+    release_lines = _ReleaseLines(meta2_lines, parent_keys)
+    report.ambiguous[SCUMMVM_TXT] = []
+    release_keys = set()
+    meta0_iter = _iter_eXoScummVM(game_dir, cache, list_zips, shard)
+    tables: Dict[str, KeyIndex[Any]] = {SCUMMVM_XML: meta1_index, SCUMMVM_TXT: meta2_index}
+    for meta0, (meta1, meta2) in join_iter(meta0_iter, parent_part, tables, report):
+        if meta1 is None or meta2 is None:
             continue
-        meta1: Optional[GameMeta1] = meta1_dict.get(meta0.parent_part)
-        if meta1:
-            meta = ScummvmMeta(
-                parent_part=meta0.parent_part,
-                title=meta1.title,
-                publisher=meta1.publisher,
-                rating=meta1.rating,
-                release_year=meta1.release_year,
-                genre=meta1.genre,
-                releases=[
-                    ScummvmMeta.Entity(**vars(entity), scummvm_game=None, scummvm_ver=None) for entity in meta0.releases
-                ],
-                scummvm_game=scummvm_game,
-                scummvm_ver=scummvm_ver,
-            )
-            res.append(meta)
-        else:
-            print(f"ERROR: entry is absent in scummvm.xml: {meta0.parent_part}")
-
-    _upd_releases(res, meta2_arr)
+        releases = []
+        for entity in meta0.releases:
+            release = ScummvmMeta.Entity(**vars(entity), scummvm_game=None, scummvm_ver=None)
+            key = norm_key(entity.child_part)
+            found = release_lines.find(key, meta2) if key not in parent_keys else []
+            if len(found) > 1:
+                report.ambiguous[SCUMMVM_TXT].append(f"{meta0.parent_part}/{entity.child_part}")
+                release_keys.add(key)
+            elif found:
+                release.scummvm_game = found[0].scummvm_game
+                release.scummvm_ver = found[0].scummvm_ver
+                release_keys.add(key)
+            releases.append(release)
+        yield ScummvmMeta(
+            parent_part=meta0.parent_part,
+            title=meta1.title,
+            publisher=meta1.publisher,
+            rating=meta1.rating,
+            release_year=meta1.release_year,
+            genre=meta1.genre,
+            releases=releases,
+            scummvm_game=meta2.scummvm_game,
+            scummvm_ver=meta2.scummvm_ver,
+        )
+    cache.save()
+    report.unused[SCUMMVM_TXT] = [key for key in report.unused[SCUMMVM_TXT] if norm_key(key) not in release_keys]
 
-    return res
+
+def get_meta(
+    data_path: Path,
+    shard: Optional[Shard] = None,
+    cache: Optional[FileCache] = None,
+    scan_workers: int = SCAN_WORKERS,
+    list_zips: Optional[ListZips] = None,
+) -> Tuple[List[ScummvmMeta], JoinReport]:
+    """iter_meta() collected into a list."""
+    report = JoinReport()
+    res = list(iter_meta(data_path, report, shard, cache, scan_workers, list_zips))
+    return res, report
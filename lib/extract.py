@@ -0,0 +1,152 @@
+import os
+import shutil
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import (
+    dataclass,
+    field,
+)
+from pathlib import Path
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from lib.blobstore import BlobStore
+from lib.pipeline import ByteBudget
+
+COPY_CHUNK_SIZE = 1024 * 1024
+# members at least this large are decompressed on the thread pool, zlib releases the GIL while inflating
+PARALLEL_MIN_SIZE = 8 * 1024 * 1024
+EXTRACT_WORKERS = 4
+# uncompressed bytes concurrent extractions may have in flight
+IO_BUDGET = 2 * 1024 * 1024 * 1024
+
+
+@dataclass
+class ExtractStats:
+    files: int = 0
+    dirs: int = 0
+    bytes_written: int = 0
+    files_reused: int = 0
+    bytes_reused: int = 0
+    files_kept: int = 0
+    seconds: float = 0.0
+    # every file member of the prefix, written or kept
+    members: List[Tuple[zipfile.ZipInfo, Path]] = field(default_factory=list, repr=False)
+
+    def add(self, size: int, reused: bool) -> None:
+        self.files += 1
+        self.bytes_written += size
+        if reused:
+            self.files_reused += 1
+            self.bytes_reused += size
+
+    def __str__(self) -> str:
+        rate = self.bytes_written / self.seconds / 2**20 if self.seconds else 0.0
+        res = f"{self.files} files, {self.bytes_written / 2**20:.2f} MiB in {self.seconds:.2f}s ({rate:.1f} MiB/s)"
+        if self.files_reused:
+            res += f", {self.files_reused} files ({self.bytes_reused / 2**20:.2f} MiB) linked from the blob store"
+        if self.files_kept:
+            res += f", {self.files_kept} files up to date"
+        return res
+
+
+def _prefix_index(infos: List[zipfile.ZipInfo], depth: int) -> Dict[str, List[zipfile.ZipInfo]]:
+    res: Dict[str, List[zipfile.ZipInfo]] = {}
+    for info in infos:
+        parts = info.filename.split("/", depth)
+        if len(parts) > depth:
+            res.setdefault("/".join(parts[:depth]) + "/", []).append(info)
+    return res
+
+
+def _zip_mtime(info: zipfile.ZipInfo) -> float:
+    # zip timestamps are local time without a zone, which is what mktime() expects
+    return time.mktime(info.date_time + (0, 0, -1))
+
+
+def _copy_member(
+    zip_ref: zipfile.ZipFile, info: zipfile.ZipInfo, target_path: Path, store: Optional[BlobStore]
+) -> Tuple[int, bool]:
+    mtime = _zip_mtime(info)
+    if store is not None:
+        return store.materialize(zip_ref, info, target_path, mtime)
+    # a file extracted with the blob store may be a hardlink to a shared blob, it's replaced instead of written to
+    target_path.unlink(missing_ok=True)
+    with zip_ref.open(info) as source, open(target_path, "wb") as target:
+        shutil.copyfileobj(source, target, COPY_CHUNK_SIZE)
+    os.utime(target_path, (mtime, mtime))
+    return info.file_size, False
+
+
+def extract_prefix(
+    zip_path: Path,
+    prefix: str,
+    dest_dir: Path,
+    workers: int = EXTRACT_WORKERS,
+    budget: Optional[ByteBudget] = None,
+    store: Optional[BlobStore] = None,
+    keep: Optional[Callable[[zipfile.ZipInfo, Path], bool]] = None,
+) -> ExtractStats:
+    """Extract the members under ``prefix`` (a directory, ending with "/") into ``dest_dir``.
+
+    Members are streamed in ``COPY_CHUNK_SIZE`` chunks, so memory use doesn't grow with the member size, and
+    keep their zip timestamps. With a ``budget`` the extraction waits until the uncompressed size of the
+    members fits in it. With a ``store`` files are linked to its blobs instead of written out. Members
+    ``keep`` returns True for are left as they are.
+    """
+    start = time.monotonic()
+    stats = ExtractStats()
+    dest_dir = dest_dir.resolve()
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        members = _prefix_index(zip_ref.infolist(), prefix.count("/")).get(prefix, [])
+        dirs = []
+        small: List[Tuple[zipfile.ZipInfo, Path]] = []
+        large: List[Tuple[zipfile.ZipInfo, Path]] = []
+        for info in members:
+            target_path = (dest_dir / info.filename[len(prefix) :]).resolve()
+            if not target_path.is_relative_to(dest_dir) or target_path == dest_dir:
+                if info.filename != prefix:
+                    print(f"WARNING: skipping {info.filename} in {zip_path}, it points outside {dest_dir}")
+                continue
+            if info.is_dir():
+                target_path.mkdir(parents=True, exist_ok=True)
+                dirs.append((info, target_path))
+                continue
+            stats.members.append((info, target_path))
+            if keep is not None and keep(info, target_path):
+                stats.files_kept += 1
+                continue
+            target_path.parent.mkdir(parents=True, exist_ok=True)
+            (large if info.file_size >= PARALLEL_MIN_SIZE else small).append((info, target_path))
+
+        size = sum(info.file_size for info, _ in large + small)
+        if budget is not None:
+            budget.acquire(size)
+        try:
+            if workers > 1 and len(large) > 1:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(_copy_member, zip_ref, info, path, store) for info, path in large]
+                    for info, path in small:
+                        stats.add(*_copy_member(zip_ref, info, path, store))
+                    for future in futures:
+                        stats.add(*future.result())
+            else:
+                for info, path in large + small:
+                    stats.add(*_copy_member(zip_ref, info, path, store))
+        finally:
+            if budget is not None:
+                budget.release(size)
+
+        # files written into a directory bump its mtime, so directories go last, deepest first
+        for info, path in sorted(dirs, key=lambda d: len(d[1].parts), reverse=True):
+            mtime = _zip_mtime(info)
+            os.utime(path, (mtime, mtime))
+        stats.dirs = len(dirs)
+    stats.seconds = time.monotonic() - start
+    return stats
@@ -0,0 +1,284 @@
+import asyncio
+import random
+import ssl
+import time
+from dataclasses import dataclass
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+from urllib.parse import urlsplit
+
+USER_AGENT = "exoconv"
+# worth another try: the server is busy, overloaded or rate limiting
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# the server turned the request down without acting on it, so even a POST can be sent again
+NOT_PROCESSED_STATUSES = {408, 425, 429, 503}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+_Key = Tuple[str, str, int]
+_Connection = Tuple[asyncio.StreamReader, asyncio.StreamWriter]
+# what a broken or dropped connection raises while talking to the server
+_TRANSIENT_ERRORS = (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError)
+
+
+class HttpError(Exception):
+    def __init__(self, method: str, url: str, status: int, body: bytes) -> None:
+        super().__init__(f"{method} {url}: HTTP {status} {body[:200].decode('utf-8', 'replace')}".rstrip())
+        self.status = status
+
+
+class RequestUncertain(ConnectionError):
+    """A request that isn't idempotent was sent but no answer came back, it may or may not have taken effect."""
+
+
+class _Attempt:
+    # whether any of the request went out on the connection
+    sent = False
+
+
+@dataclass
+class Response:
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+    keep_alive: bool
+
+
+@dataclass
+class HttpStats:
+    requests: int = 0
+    retries: int = 0
+    connections: int = 0
+
+    def __str__(self) -> str:
+        return f"{self.requests} requests, {self.retries} retries, {self.connections} connections"
+
+
+class RateLimiter:
+    """Token bucket: lets ``burst`` calls through at once, then ``rate`` per second.
+
+    ``hold()`` stops everyone for a while, e.g. for the Retry-After of a 429.
+    """
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._not_before = 0.0
+        self._lock = asyncio.Lock()
+
+    def hold(self, seconds: float) -> None:
+        self._not_before = max(self._not_before, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        # waiting under the lock serves the callers in order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                wait = max(self._not_before - now, (1 - self._tokens) / self.rate)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self._tokens -= 1
+
+
+def _retry_after(response: Optional[Response]) -> Optional[float]:
+    if response is None:
+        return None
+    try:
+        return max(0.0, float(response.headers["retry-after"]))
+    except (KeyError, ValueError):
+        # absent or an HTTP date, the backoff will do
+        return None
+
+
+class HttpClient:
+    """Minimal HTTP/1.1 client on asyncio streams, enough to POST payloads to our services.
+
+    Connections are kept alive and pooled per host, at most ``concurrency`` requests are in flight. Failed
+    connections, timeouts and ``RETRY_STATUSES`` are retried up to ``retries`` times with exponential backoff
+    and full jitter, or after the server's Retry-After. A pooled connection the server has closed in the
+    meantime is replaced right away without using up a retry.
+
+    Requests that aren't idempotent (POST) are only repeated when the server can't have acted on them: the
+    request never went out or was answered with one of ``NOT_PROCESSED_STATUSES``. A timeout or a dropped
+    connection after sending raises ``RequestUncertain``, other error answers raise ``HttpError``.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 16,
+        retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        timeout: float = 30.0,
+    ) -> None:
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.stats = HttpStats()
+        self._sem = asyncio.Semaphore(concurrency)
+        self._idle: Dict[_Key, List[_Connection]] = {}
+        self._ssl: Optional[ssl.SSLContext] = None
+
+    async def __aenter__(self) -> "HttpClient":
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        conns = [conn for idle in self._idle.values() for conn in idle]
+        self._idle.clear()
+        for _, writer in conns:
+            writer.close()
+        for _, writer in conns:
+            try:
+                await writer.wait_closed()
+            except _TRANSIENT_ERRORS:
+                pass
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        body: bytes = b"",
+        headers: Optional[Dict[str, str]] = None,
+        limiter: Optional[RateLimiter] = None,
+        idempotent: Optional[bool] = None,
+    ) -> Response:
+        """Send the request until it gets a final answer, a 4xx (other than the retried ones) raises HttpError.
+
+        With ``limiter`` every attempt waits for it, and a Retry-After answer holds it as long. ``idempotent``
+        defaults to what the method is, pass True for a POST the server deduplicates.
+        """
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Unsupported url: {url}")
+        key = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+        target = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        host = parts.hostname if parts.port is None else f"{parts.hostname}:{parts.port}"
+        head_lines = [f"{method} {target} HTTP/1.1", f"Host: {host}", f"User-Agent: {USER_AGENT}"]
+        head_lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+        head_lines.append(f"Content-Length: {len(body)}")
+        payload = ("\r\n".join(head_lines) + "\r\n\r\n").encode("latin-1") + body
+
+        attempt = 0
+        while True:
+            if limiter is not None:
+                await limiter.acquire()
+            response = None
+            error: Optional[BaseException] = None
+            sending = _Attempt()
+            try:
+                async with self._sem:
+                    self.stats.requests += 1
+                    response = await asyncio.wait_for(
+                        self._send(key, method, payload, sending, idempotent), self.timeout
+                    )
+            except _TRANSIENT_ERRORS as e:
+                error = e
+            if response is not None and response.status not in RETRY_STATUSES:
+                if response.status >= 400:
+                    raise HttpError(method, url, response.status, response.body)
+                return response
+            if not idempotent:
+                if response is None and sending.sent:
+                    raise RequestUncertain(f"{method} {url}: sent, but got no answer: {error!r}") from error
+                if response is not None and response.status not in NOT_PROCESSED_STATUSES:
+                    raise HttpError(method, url, response.status, response.body)
+            if attempt >= self.retries:
+                if response is not None:
+                    raise HttpError(method, url, response.status, response.body)
+                raise ConnectionError(f"{method} {url}: {error!r}") from error
+            delay = _retry_after(response)
+            if delay is None:
+                delay = random.uniform(
+                    0, min(self.max_backoff, self.backoff * 2**attempt)
+                )  # nosec B311: jitter, not a secret
+            elif limiter is not None:
+                limiter.hold(delay)
+            attempt += 1
+            self.stats.retries += 1
+            await asyncio.sleep(delay)
+
+    async def _connect(self, key: _Key) -> _Connection:
+        scheme, host, port = key
+        if scheme == "https" and self._ssl is None:
+            self._ssl = ssl.create_default_context()
+        self.stats.connections += 1
+        return await asyncio.open_connection(host, port, ssl=self._ssl if scheme == "https" else None)
+
+    async def _send(self, key: _Key, method: str, payload: bytes, sending: _Attempt, idempotent: bool) -> Response:
+        idle = self._idle.setdefault(key, [])
+        while idle and idle[-1][0].at_eof():
+            # closed by the server while idle
+            idle.pop()[1].close()
+        reused = bool(idle)
+        conn = idle.pop() if idle else await self._connect(key)
+        while True:
+            try:
+                response = await _exchange(conn, method, payload, sending)
+                break
+            except _TRANSIENT_ERRORS:
+                conn[1].close()
+                # a POST can't tell a connection closed just before it was sent from a server that took it and
+                # went away, only requests that are safe to repeat get another connection
+                if not reused or not idempotent:
+                    raise
+                # the server closed the idle connection, the request never got there
+                conn = await self._connect(key)
+                reused = False
+                sending.sent = False
+            except BaseException:
+                # cancelled (timeout) mid-exchange, the connection is in an unknown state
+                conn[1].close()
+                raise
+        if response.keep_alive:
+            self._idle.setdefault(key, []).append(conn)
+        else:
+            conn[1].close()
+        return response
+
+
+async def _exchange(conn: _Connection, method: str, payload: bytes, sending: _Attempt) -> Response:
+    reader, writer = conn
+    sending.sent = True
+    writer.write(payload)
+    await writer.drain()
+    status_line = (await reader.readuntil(b"\r\n")).decode("latin-1").rstrip("\r\n")
+    version, status_text, *_ = status_line.split(" ", 2) + [""]
+    if not version.startswith("HTTP/") or not status_text.isdigit():
+        raise ConnectionError(f"Malformed status line: {status_line!r}")
+    status = int(status_text)
+    headers = {}
+    while (line := await reader.readuntil(b"\r\n")) != b"\r\n":
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+    if method == "HEAD" or status in (204, 304) or status < 200:
+        body = b""
+    elif "chunked" in headers.get("transfer-encoding", "").lower():
+        chunks = []
+        while size := int((await reader.readuntil(b"\r\n")).split(b";", 1)[0], 16):
+            chunks.append(await reader.readexactly(size + 2))
+        # trailers, up to the empty line
+        while await reader.readuntil(b"\r\n") != b"\r\n":
+            pass
+        body = b"".join(chunk[:-2] for chunk in chunks)
+    elif "content-length" in headers:
+        body = await reader.readexactly(int(headers["content-length"]))
+    else:
+        # delimited by the server closing the connection
+        body = await reader.read()
+        keep_alive = False
+    return Response(status, headers, body, keep_alive)
@@ -0,0 +1,103 @@
+import sys
+import unicodedata
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+def norm_key(key: str) -> str:
+    """Join key of ``key``: NFKC normalized, casefolded and interned, so equal keys share one string."""
+    if key.isascii():
+        # casefold() is lower() on ascii, which NFKC leaves alone
+        return sys.intern(key.lower())
+    return sys.intern(unicodedata.normalize("NFKC", key).casefold())
+
+
+class KeyIndex(Generic[T]):
+    """Values of one table by normalized key, like a dict keys are normalized once when the index is built.
+
+    For duplicate keys the last value wins, as with the case-insensitive dicts it replaces.
+    """
+
+    def __init__(self, items: Iterable[T], key: Callable[[T], str]) -> None:
+        self._key = key
+        # normalized key -> value, for lookups with keys already normalized
+        self.by_key: Dict[str, T] = {norm_key(key(item)): item for item in items}
+
+    def get(self, key: str) -> Optional[T]:
+        return self.by_key.get(norm_key(key))
+
+    def get_norm(self, norm: str) -> Optional[T]:
+        """get() of a key already normalized with norm_key()."""
+        return self.by_key.get(norm)
+
+    def key_of(self, norm: str) -> str:
+        """The original spelling of a normalized key."""
+        return self._key(self.by_key[norm])
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and norm_key(key) in self.by_key
+
+    def __len__(self) -> int:
+        return len(self.by_key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.by_key)
+
+
+@dataclass
+class JoinReport:
+    """Keys without a partner, per joined table: ``missing`` are keys of the driving rows the table lacks,
+    ``unused`` are the table's keys no row referred to, both in input order. ``ambiguous`` are keys the
+    table has several candidates for and none could be told apart, they're left unjoined."""
+
+    missing: Dict[str, List[str]] = field(default_factory=dict)
+    unused: Dict[str, List[str]] = field(default_factory=dict)
+    ambiguous: Dict[str, List[str]] = field(default_factory=dict)
+
+    def __str__(self) -> str:
+        parts = [f"{len(keys)} missing in {table}" for table, keys in self.missing.items() if keys]
+        parts += [f"{len(keys)} unused in {table}" for table, keys in self.unused.items() if keys]
+        parts += [f"{len(keys)} ambiguous in {table}" for table, keys in self.ambiguous.items() if keys]
+        return ", ".join(parts) or "all keys matched"
+
+
+def join_iter(
+    rows: Iterable[T], key: Callable[[T], str], tables: Dict[str, KeyIndex[Any]], report: JoinReport
+) -> Iterator[Tuple[T, List[Any]]]:
+    """Left join ``rows`` to every table: yields every row with its matches (or None) in ``tables`` order as it
+    comes in, each row's key is normalized once.
+
+    ``report`` is filled along the way, its unused keys once ``rows`` is exhausted. Only the keys seen are
+    kept, not the rows.
+    """
+    lookups = [(report.missing.setdefault(name, []), index.by_key.get) for name, index in tables.items()]
+    used = set()
+    for row in rows:
+        row_key = key(row)
+        norm = norm_key(row_key)
+        used.add(norm)
+        matches = []
+        for missing, lookup in lookups:
+            value = lookup(norm)
+            if value is None:
+                missing.append(row_key)
+            matches.append(value)
+        yield row, matches
+    for name, index in tables.items():
+        report.unused[name] = [index.key_of(k) for k in index if k not in used]
@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Optional,
+)
+
+from marshmallow_dataclass import dataclass
+
+from lib.codec import get_codec
+
+CRC_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class GameManifest:
+    """What ``steady`` materialized for a game, so a re-run can skip it or repair only what changed."""
+
+    @dataclass
+    class File:
+        path: str  # relative to the APP dir
+        size: int
+        crc: int
+        mtime_ns: int
+
+    parent_part: str
+    child_part: str
+    igdb_slug: str
+    uuid: str
+    zip_size: int
+    zip_mtime_ns: int
+    complete: bool
+    files: List[File]
+    # the release was posted to portsvc and announced on the webhook by ``exoconv publish``
+    published: bool = False
+    announced: bool = False
+    # the step ("publish" or "announce") whose request went out without an answer, it may have gone through
+    unconfirmed: Optional[str] = None
+
+    def files_by_path(self) -> Dict[str, File]:
+        return {f.path: f for f in self.files}
+
+
+def file_crc(path: Path) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(CRC_CHUNK_SIZE):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def is_intact(record: GameManifest.File, path: Path, verify: bool = False) -> bool:
+    """Size and mtime of ``path`` match its record, with ``verify`` the content is checked against the crc too."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return False
+    if st.st_size != record.size or st.st_mtime_ns != record.mtime_ns:
+        return False
+    return not verify or file_crc(path) == record.crc
+
+
+class ManifestStore:
+    """One json manifest per game, keyed by its (case-insensitive) parent_part."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+
+    def _path(self, parent_part: str) -> Path:
+        key = hashlib.sha1(parent_part.lower().encode("utf-8"), usedforsecurity=False).hexdigest()
+        return self.root / f"{key}.json"
+
+    def get(self, parent_part: str) -> Optional[GameManifest]:
+        try:
+            with open(self._path(parent_part), "r", encoding="utf-8") as f:
+                return get_codec(GameManifest).load(json.load(f))
+        except FileNotFoundError:
+            return None
+
+    def put(self, manifest: GameManifest) -> None:
+        path = self._path(manifest.parent_part)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(GameManifest.Schema().dump(manifest), f, indent=4)  # type: ignore[attr-defined]
+        os.replace(tmp_path, path)
+
+    def remove(self, parent_part: str) -> None:
+        self._path(parent_part).unlink(missing_ok=True)
+
+    def __iter__(self) -> Iterator[GameManifest]:
+        for path in sorted(self.root.glob("*.json")):
+            with open(path, "r", encoding="utf-8") as f:
+                yield get_codec(GameManifest).load(json.load(f))
+
+    def incomplete(self) -> List[GameManifest]:
+        return [manifest for manifest in self if not manifest.complete]
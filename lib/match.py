@@ -0,0 +1,404 @@
+import bisect
+import hashlib
+import json
+import os
+import time
+from collections import (
+    Counter,
+    defaultdict,
+    deque,
+)
+from concurrent.futures import (
+    Future,
+    ProcessPoolExecutor,
+)
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+from typing import (
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from thefuzz import (
+    fuzz,
+    process,
+)
+
+NGRAM_SIZE = 3
+# candidates taken from the n-gram blocking stage before the exhaustive length-bound pass
+BLOCK_SIZE = 32
+# n-grams present in more than this share of titles are too common to be useful for blocking
+MAX_POSTING_SHARE = 0.05
+# queries per chunk when matching a stream, and chunks in flight per worker
+STREAM_CHUNK_SIZE = 256
+STREAM_CHUNKS_PER_JOB = 2
+MATCH_CACHE_VERSION = 1
+# match cache entries no run looked up for this many days are evicted
+MATCH_CACHE_MAX_AGE_DAYS = 30
+
+T = TypeVar("T")
+
+
+def _ngrams(s: str) -> Set[str]:
+    padded = f" {s} "
+    return {padded[i : i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+
+def _tokens(s: str) -> Set[str]:
+    return {f"#{token}" for token in s.split() if len(token) > 1}
+
+
+def _max_ratio(len_a: int, len_b: int) -> float:
+    # fuzz.ratio is 200 * LCS / (len_a + len_b) and LCS can't exceed the shorter string
+    if len_a + len_b == 0:
+        return 100.0
+    return 200.0 * min(len_a, len_b) / (len_a + len_b)
+
+
+class TitleIndex:
+    """A reusable ``fuzz.ratio`` nearest-title index.
+
+    Candidates are first gathered from an inverted index of word tokens and character n-grams, the best of
+    them sets a score cutoff, and then only titles whose length can still reach that cutoff are scored.
+    Results are identical to scoring every title with ``fuzz.ratio``; ties are resolved in favour of the
+    title that was added first.
+    """
+
+    def __init__(self, titles: Iterable[str]) -> None:
+        self._ids: Dict[str, int] = {}
+        self._titles: List[str] = []
+        self._by_len: Dict[int, Dict[int, str]] = defaultdict(dict)
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for title in titles:
+            if title in self._ids:
+                continue
+            title_id = len(self._titles)
+            self._ids[title] = title_id
+            self._titles.append(title)
+            self._by_len[len(title)][title_id] = title
+            for key in _ngrams(title) | _tokens(title):
+                postings[key].append(title_id)
+        max_posting = max(int(len(self._titles) * MAX_POSTING_SHARE), BLOCK_SIZE)
+        self._postings: Dict[str, List[int]] = {k: v for k, v in postings.items() if len(v) <= max_posting}
+        self._lengths: List[int] = sorted(self._by_len)
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def __contains__(self, title: object) -> bool:
+        return title in self._ids
+
+    def _block(self, query: str) -> List[int]:
+        hits: Counter = Counter()
+        for key in _ngrams(query) | _tokens(query):
+            hits.update(self._postings.get(key, ()))
+        return [title_id for title_id, _ in hits.most_common(BLOCK_SIZE)]
+
+    def _scan(self, query: str, cutoff: int, skip: Set[int]) -> List[Tuple[int, int]]:
+        res = []
+        for length in self._lengths:
+            if _max_ratio(len(query), length) < cutoff - 0.5:
+                continue
+            for _, score, title_id in process.extractWithoutOrder(
+                query, self._by_len[length], processor=None, scorer=fuzz.ratio, score_cutoff=max(cutoff - 0.5, 0)
+            ):
+                if title_id not in skip:
+                    res.append((score, title_id))
+        return res
+
+    def top(self, query: str, limit: int = 5, score_cutoff: float = 0.0) -> List[Tuple[str, float]]:
+        if limit <= 0 or not self._titles:
+            return []
+        cutoff = int(round(score_cutoff * 100))
+        blocked = self._block(query)
+        scored = [(fuzz.ratio(query, self._titles[title_id]), title_id) for title_id in blocked]
+        scored = [s for s in scored if s[0] >= cutoff]
+        if len(scored) >= limit:
+            cutoff = max(cutoff, sorted((s[0] for s in scored), reverse=True)[limit - 1])
+        scored += self._scan(query, cutoff, skip=set(blocked))
+        scored = sorted((s for s in scored if s[0] >= cutoff), key=lambda s: (-s[0], s[1]))
+        return [(self._titles[title_id], score / 100.0) for score, title_id in scored[:limit]]
+
+    def best(self, query: str, score_cutoff: float = 0.0) -> Optional[Tuple[str, float]]:
+        if query in self._ids:
+            return query, 1.0
+        res = self.top(query, limit=1, score_cutoff=score_cutoff)
+        return res[0] if res else None
+
+
+def corpus_fingerprint(corpus: Sequence[str]) -> str:
+    sha = hashlib.sha256()
+    for title in corpus:
+        sha.update(title.encode("utf-8"))
+        sha.update(b"\0")
+    return sha.hexdigest()
+
+
+def _moved_titles(old_corpus: Sequence[str], corpus: Sequence[str]) -> Set[str]:
+    """Titles of both corpora whose order relative to the others changed.
+
+    The longest run of common titles that kept their old order (a longest increasing subsequence of the old
+    positions) stays put, every other common title counts as moved.
+    """
+    new_titles = set(corpus)
+    old_positions = {title: ix for ix, title in enumerate(t for t in old_corpus if t in new_titles)}
+    common = [title for title in corpus if title in old_positions]
+    tails: List[int] = []  # old position ending the best run of every length
+    tail_ix: List[int] = []
+    prev = [-1] * len(common)
+    for ix, title in enumerate(common):
+        pos = old_positions[title]
+        length = bisect.bisect_left(tails, pos)
+        if length == len(tails):
+            tails.append(pos)
+            tail_ix.append(ix)
+        else:
+            tails[length] = pos
+            tail_ix[length] = ix
+        prev[ix] = tail_ix[length - 1] if length else -1
+    kept = set()
+    ix = tail_ix[-1] if tail_ix else -1
+    while ix >= 0:
+        kept.add(ix)
+        ix = prev[ix]
+    return {title for ix, title in enumerate(common) if ix not in kept}
+
+
+def _today() -> int:
+    return int(time.time() // 86400)
+
+
+@dataclass
+class MatchCacheStats:
+    hits: int = 0
+    misses: int = 0
+    rescored: int = 0
+    dropped: int = 0
+    evicted: int = 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.hits} hits, {self.misses} misses, {self.rescored} rescored against new titles, "
+            f"{self.dropped} dropped with their title, {self.evicted} evicted"
+        )
+
+
+class MatchCache:
+    """Best corpus match of every query, kept on disk between runs.
+
+    The cache is tagged with a fingerprint of the corpus it was scored against. When ``bind()`` finds the
+    corpus changed, only the added titles are scored, and those that moved relative to the others (ties go
+    to the first title): a cached match stays unless one of them beats it or ties it and comes first, as a
+    full match would pick. Queries whose matched title was removed or moved are dropped and matched again.
+    Entries no run looked up for ``MATCH_CACHE_MAX_AGE_DAYS`` are evicted on ``save()``. A cache created
+    without a path is disabled: every lookup is a miss and nothing is written.
+    """
+
+    def __init__(self, cache_path: Optional[Path]) -> None:
+        self.cache_path = cache_path
+        self.stats = MatchCacheStats()
+        self._fingerprint: Optional[str] = None
+        self._corpus: List[str] = []
+        # query -> [title, ratio, day last used]
+        self._entries: Dict[str, list] = {}
+        self._dirty = False
+        if cache_path is not None and cache_path.exists():
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"WARNING: ignoring unreadable cache {cache_path}: {e}")
+                data = {}
+            if data.get("version") == MATCH_CACHE_VERSION:
+                self._fingerprint = data["fingerprint"]
+                self._corpus = data["corpus"]
+                self._entries = data["entries"]
+
+    @property
+    def enabled(self) -> bool:
+        return self.cache_path is not None
+
+    def bind(self, corpus: Sequence[str]) -> None:
+        """Bring the cached matches up to date with ``corpus``, must be called before any lookup."""
+        unique = list(dict.fromkeys(corpus))
+        fingerprint = corpus_fingerprint(unique)
+        if not self.enabled or fingerprint == self._fingerprint:
+            return
+        old_corpus = self._corpus
+        self._fingerprint = fingerprint
+        self._corpus = unique
+        self._dirty = True
+        if not self._entries:
+            return
+        positions = {title: ix for ix, title in enumerate(unique)}
+        old_titles = set(old_corpus)
+        moved = _moved_titles(old_corpus, unique)
+        candidates = TitleIndex(title for title in unique if title not in old_titles or title in moved)
+        for query, entry in list(self._entries.items()):
+            title, ratio, _ = entry
+            if title not in positions or title in moved:
+                del self._entries[query]
+                self.stats.dropped += 1
+                continue
+            if not candidates:
+                continue
+            best = candidates.best(query)
+            if best is None:
+                continue
+            best_title, best_ratio = best
+            if (best_ratio, -positions[best_title]) > (ratio, -positions[title]):
+                entry[0], entry[1] = best_title, best_ratio
+                self.stats.rescored += 1
+
+    def get(self, query: str) -> Optional[Tuple[str, float]]:
+        entry = self._entries.get(query)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        today = _today()
+        if entry[2] != today:
+            entry[2] = today
+            self._dirty = True
+        return entry[0], entry[1]
+
+    def put(self, query: str, match: Tuple[str, float]) -> None:
+        if not self.enabled:
+            return
+        self._entries[query] = [match[0], match[1], _today()]
+        self._dirty = True
+
+    def save(self) -> None:
+        if self.cache_path is None:
+            return
+        oldest = _today() - MATCH_CACHE_MAX_AGE_DAYS
+        for query in [query for query, entry in self._entries.items() if entry[2] < oldest]:
+            del self._entries[query]
+            self.stats.evicted += 1
+            self._dirty = True
+        if not self._dirty:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            data = {"fingerprint": self._fingerprint, "corpus": self._corpus, "entries": self._entries}
+            json.dump({"version": MATCH_CACHE_VERSION, **data}, f)
+        os.replace(tmp_path, self.cache_path)
+        self._dirty = False
+
+
+def get_match_cache(data_dir: Path, enabled: bool = True) -> MatchCache:
+    return MatchCache(data_dir / "tmp" / "title-match-cache.json" if enabled else None)
+
+
+# per-process index, built once by the pool initializer
+_worker_index: Optional[TitleIndex] = None
+
+
+def _init_worker(corpus: Sequence[str]) -> None:
+    global _worker_index
+    _worker_index = TitleIndex(corpus)
+
+
+def _best_many(index: TitleIndex, queries: Sequence[str]) -> List[Tuple[str, float]]:
+    res = []
+    for query in queries:
+        best = index.best(query)
+        if best is None:
+            raise ValueError("Title corpus is empty")
+        res.append(best)
+    return res
+
+
+def _match_chunk(queries: Sequence[str]) -> List[Tuple[str, float]]:
+    if _worker_index is None:
+        raise RuntimeError("Matcher worker is not initialized")
+    return _best_many(_worker_index, queries)
+
+
+def _chunks(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    chunk: List[T] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _LazyMatcher:
+    """Matches queries against ``corpus`` in this process or on ``jobs`` workers, set up on the first query."""
+
+    def __init__(self, corpus: Sequence[str], jobs: int, stack: ExitStack) -> None:
+        self.corpus = corpus
+        self.jobs = jobs
+        self._stack = stack
+        self._index: Optional[TitleIndex] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def submit(self, queries: List[str]) -> Callable[[], List[Tuple[str, float]]]:
+        if not queries:
+            return list
+        if self.jobs <= 1:
+            if self._index is None:
+                self._index = TitleIndex(self.corpus)
+            res = _best_many(self._index, queries)
+            return lambda: res
+        if self._executor is None:
+            self._executor = self._stack.enter_context(
+                ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker, initargs=(list(self.corpus),))
+            )
+        future: "Future[List[Tuple[str, float]]]" = self._executor.submit(_match_chunk, queries)
+        return future.result
+
+
+def match_iter(
+    items: Iterable[T],
+    query: Callable[[T], str],
+    corpus: Sequence[str],
+    jobs: int = 1,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    cache: Optional[MatchCache] = None,
+) -> Iterator[Tuple[T, Tuple[str, float]]]:
+    """Yield every item with the best ``corpus`` match for ``query(item)``, in order.
+
+    Items are pulled in chunks and, with ``jobs > 1``, at most a couple of chunks per worker are in flight, so
+    only those are held in memory however long the stream is. With ``cache`` (bound to ``corpus``) only the
+    queries it misses are matched, the title index or the worker pool isn't built at all while everything hits.
+    """
+    # chunk items, their queries, the cached matches (None for a miss) and the getter of the misses' matches
+    pending: Deque[
+        Tuple[List[T], List[str], List[Optional[Tuple[str, float]]], Callable[[], List[Tuple[str, float]]]]
+    ] = deque()
+
+    def finish() -> Iterator[Tuple[T, Tuple[str, float]]]:
+        chunk, queries, cached, result = pending.popleft()
+        matched = iter(result())
+        for item, q, match in zip(chunk, queries, cached):
+            if match is None:
+                match = next(matched)
+                if cache is not None:
+                    cache.put(q, match)
+            yield item, match
+
+    with ExitStack() as stack:
+        matcher = _LazyMatcher(corpus, jobs, stack)
+        for chunk in _chunks(items, chunk_size):
+            queries = [query(item) for item in chunk]
+            cached: List[Optional[Tuple[str, float]]] = [cache.get(q) if cache is not None else None for q in queries]
+            pending.append((chunk, queries, cached, matcher.submit([q for q, m in zip(queries, cached) if m is None])))
+            if len(pending) >= jobs * STREAM_CHUNKS_PER_JOB:
+                yield from finish()
+        while pending:
+            yield from finish()
@@ -0,0 +1,86 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import (
+    dataclass,
+    field,
+)
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    List,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+class ByteBudget:
+    """Caps the bytes that concurrent jobs have in flight.
+
+    A request larger than the whole budget is let through once nothing else holds any, so it waits instead
+    of deadlocking.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, size: int) -> None:
+        with self._cond:
+            self._cond.wait_for(lambda: self._in_use == 0 or self._in_use + size <= self.limit)
+            self._in_use += size
+
+    def release(self, size: int) -> None:
+        with self._cond:
+            self._in_use -= size
+            self._cond.notify_all()
+
+
+@dataclass
+class PipelineReport(Generic[T]):
+    done: List[Tuple[T, Any]] = field(default_factory=list)
+    failed: List[Tuple[T, str]] = field(default_factory=list)
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        return f"{len(self.done)} done, {len(self.failed)} failed in {self.seconds:.2f}s"
+
+
+def run_pipeline(
+    items: Sequence[T], func: Callable[[T], Any], jobs: int = 1, on_error: Callable[[T], None] = lambda item: None
+) -> PipelineReport[T]:
+    """Run ``func`` over ``items`` on ``jobs`` threads, one item failing doesn't stop the others.
+
+    ``on_error`` is called for a failed item to clean up after it. Results keep the ``items`` order.
+    """
+    start = time.monotonic()
+
+    def _run(item: T) -> Tuple[T, Any, str]:
+        try:
+            return item, func(item), ""
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            error = f"{type(e).__name__}: {e}"
+            try:
+                on_error(item)
+            except Exception as cleanup_e:  # pylint: disable=broad-exception-caught
+                error += f" (cleanup failed: {type(cleanup_e).__name__}: {cleanup_e})"
+            return item, None, error
+
+    if jobs <= 1:
+        results = [_run(item) for item in items]
+    else:
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            results = list(executor.map(_run, items))
+
+    report: PipelineReport[T] = PipelineReport(seconds=time.monotonic() - start)
+    for item, value, error in results:
+        if error:
+            report.failed.append((item, error))
+        else:
+            report.done.append((item, value))
+    return report
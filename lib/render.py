@@ -0,0 +1,70 @@
+import copy
+import functools
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+)
+
+import yaml
+from mako.lookup import TemplateLookup
+
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+class CardDumper(yaml.SafeDumper):
+    """SafeDumper writing None as an empty value, like the hand-written release cards do."""
+
+
+CardDumper.add_representer(type(None), lambda dumper, value: dumper.represent_scalar("tag:yaml.org,2002:null", ""))
+
+
+class TemplateEngine:
+    """Renders the mako templates of one directory, every template is compiled once per process.
+
+    With a ``module_dir`` the compiled modules are cached on disk as well and only recompiled when their
+    template changes, so later runs skip the compilation too.
+    """
+
+    def __init__(self, template_dir: Path, module_dir: Optional[Path] = None) -> None:
+        self.lookup = TemplateLookup(
+            directories=[str(template_dir)],
+            module_directory=str(module_dir) if module_dir else None,
+            input_encoding="utf-8",
+        )
+
+    def render(self, name: str, params: Dict[str, Any]) -> str:
+        return str(self.lookup.get_template(name).render(**params))
+
+    def render_many(self, name: str, params: Iterable[Dict[str, Any]]) -> List[str]:
+        tmpl = self.lookup.get_template(name)
+        return [str(tmpl.render(**p)) for p in params]
+
+    def render_to(self, name: str, dst: Path, params: Dict[str, Any], newline: str = "\n") -> None:
+        output = self.render(name, params)
+        with open(dst, "w", newline=newline, encoding="UTF-8") as f:
+            f.write(output)
+
+
+@functools.cache
+def get_engine(template_dir: Path, module_dir: Optional[Path] = None) -> TemplateEngine:
+    return TemplateEngine(template_dir, module_dir)
+
+
+@functools.cache
+def _load_card(path: Path) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return dict(yaml.load(f, Loader=YamlLoader))  # nosec B506: a safe loader
+
+
+def load_card(path: Path) -> Dict[str, Any]:
+    """A fresh copy of the yaml card skeleton at ``path``, the file is parsed once per process."""
+    return copy.deepcopy(_load_card(path))
+
+
+def dump_card(card: Dict[str, Any], dst: Path) -> None:
+    with open(dst, "w", encoding="utf-8") as f:
+        yaml.dump(card, f, Dumper=CardDumper, default_flow_style=False)
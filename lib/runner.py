@@ -1,7 +1,23 @@
 from enum import StrEnum
+from typing import (
+    Iterable,
+    List,
+    Optional,
+)
 
 
 class Runner(StrEnum):
     SCUMMVM = "scummvm"
     DOS = "dos"
     WIN3X = "win3x"
+
+
+def select_runners(runner: Optional[Runner], supported: Iterable[Runner]) -> List[Runner]:
+    """``runner`` alone if given, otherwise every runner in ``supported`` in declaration order."""
+    supported = set(supported)
+    if runner is None:
+        return [r for r in Runner if r in supported]
+    if runner not in supported:
+        print(f"Runner {runner} has no metadata parsers yet, nothing to do")
+        return []
+    return [runner]
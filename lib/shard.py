@@ -0,0 +1,35 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Optional
+
+
+def stable_hash(key: str) -> int:
+    # keys are joined case-insensitively all over the place, so shard on the lowercased key;
+    # the builtin hash() is salted per process and can't be used across hosts
+    return int.from_bytes(hashlib.sha1(key.lower().encode("utf-8"), usedforsecurity=False).digest()[:8], "big")
+
+
+@dataclass(frozen=True)
+class Shard:
+    index: int  # 1-based
+    count: int
+
+    @classmethod
+    def parse(cls, value: str) -> "Shard":
+        try:
+            index, count = (int(part) for part in value.split("/"))
+        except ValueError as e:
+            raise ValueError(f"Invalid shard: {value}, expected i/N, e.g. 1/4") from e
+        if count < 1 or not 1 <= index <= count:
+            raise ValueError(f"Invalid shard: {value}, expected 1 <= i <= N")
+        return cls(index, count)
+
+    def owns(self, key: str) -> bool:
+        return stable_hash(key) % self.count == self.index - 1
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+
+def owns(shard: Optional[Shard], key: str) -> bool:
+    return shard is None or shard.owns(key)
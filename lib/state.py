@@ -0,0 +1,204 @@
+import json
+import sqlite3
+from pathlib import Path
+from typing import (
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+)
+
+from lib.cmd.dc import ScummvmStateEntry
+from lib.codec import get_codec
+from lib.join import norm_key
+from lib.util import iter_json_array
+
+# 2: keys are norm_key(parent_part), 1 had parent_part.lower()
+SCHEMA_VERSION = 2
+# keys bound per query, well below SQLite's variable limit (999 before 3.32)
+QUERY_KEYS = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scummvm_state (
+    key TEXT PRIMARY KEY,
+    parent_part TEXT NOT NULL,
+    sort_title TEXT NOT NULL,
+    title_sim_ratio REAL NOT NULL,
+    in_ports INTEGER NOT NULL,
+    release_year INTEGER NOT NULL,
+    scummvm_ver TEXT,
+    has_publisher INTEGER NOT NULL,
+    igdb_slug TEXT NOT NULL,
+    uuid TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scummvm_state_order ON scummvm_state (sort_title, parent_part);
+CREATE INDEX IF NOT EXISTS scummvm_state_title_sim_ratio ON scummvm_state (title_sim_ratio);
+CREATE INDEX IF NOT EXISTS scummvm_state_in_ports ON scummvm_state (in_ports);
+CREATE INDEX IF NOT EXISTS scummvm_state_release_year ON scummvm_state (release_year);
+CREATE INDEX IF NOT EXISTS scummvm_state_scummvm_ver ON scummvm_state (scummvm_ver);
+CREATE INDEX IF NOT EXISTS scummvm_state_has_publisher ON scummvm_state (has_publisher);
+"""
+
+_COLUMNS = """scummvm_state (
+    key, parent_part, sort_title, title_sim_ratio, in_ports, release_year, scummvm_ver, has_publisher, igdb_slug,
+    uuid, data
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+_INSERT = "INSERT INTO " + _COLUMNS
+_UPSERT = "INSERT OR REPLACE INTO " + _COLUMNS
+
+
+def state_key(parent_part: str) -> str:
+    """The key of a game in the state, parent_parts are joined on norm_key() everywhere."""
+    return norm_key(parent_part)
+
+
+def _placeholders(count: int) -> str:
+    # what goes into an IN (...) of ``count`` values, the values themselves are bound
+    return ", ".join("?" * count)
+
+
+def _row(entry: dict) -> tuple:
+    return (
+        state_key(entry["parent_part"]),
+        entry["parent_part"],
+        entry["title"].lower(),
+        entry["igdb"]["title_sim_ratio"],
+        int(entry["in_ports"]),
+        entry["release_year"],
+        entry["scummvm_ver"],
+        int(entry["igdb"]["publisher"] is not None),
+        entry["igdb"]["slug"],
+        entry["uuid"],
+        json.dumps(entry),
+    )
+
+
+class StateStore:
+    """SQLite backed ``ScummvmStateEntry`` store.
+
+    Every entry is kept as its serialized json next to indexed copies of the fields games are selected by,
+    so a selection only deserializes the rows it returns. Rows are ordered like the json state file:
+    by lowercased title, then parent_part.
+    """
+
+    def __init__(self, db_path: Path) -> None:
+        self.db_path = db_path
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(db_path)
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, 1, SCHEMA_VERSION):
+            self._conn.close()
+            raise ValueError(f"Unsupported state schema version {version}: {db_path}")
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            if version == 1:
+                rows = self._conn.execute("SELECT key, parent_part FROM scummvm_state").fetchall()
+                self._conn.executemany(
+                    "UPDATE scummvm_state SET key = ? WHERE key = ?",
+                    [(state_key(parent_part), key) for key, parent_part in rows if state_key(parent_part) != key],
+                )
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> "StateStore":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return int(self._conn.execute("SELECT count(*) FROM scummvm_state").fetchone()[0])
+
+    def replace_all(self, entries: Iterable[dict]) -> int:
+        """Replace the whole state with serialized ``entries`` in a single transaction, returns their count.
+
+        ``entries`` is consumed lazily, a generator is written without being held in memory. Two entries with
+        the same key raise ValueError and leave the state as it was.
+        """
+        last: Optional[dict] = None
+
+        def rows() -> Iterator[tuple]:
+            nonlocal last
+            for entry in entries:
+                last = entry
+                yield _row(entry)
+
+        try:
+            with self._conn:
+                self._conn.execute("DELETE FROM scummvm_state")
+                return int(self._conn.executemany(_INSERT, rows()).rowcount)
+        except sqlite3.IntegrityError as e:
+            # executemany pulls one row at a time, the one it failed on is the last one pulled
+            parent_part = last["parent_part"] if last is not None else None
+            raise ValueError(f"Duplicate state entry: {parent_part}") from e
+
+    def upsert(self, entries: Iterable[dict]) -> int:
+        """Insert ``entries``, replacing the stored entries with the same keys."""
+        with self._conn:
+            return int(self._conn.executemany(_UPSERT, (_row(entry) for entry in entries)).rowcount)
+
+    def iter_dumped(self) -> Iterator[dict]:
+        for (data,) in self._conn.execute("SELECT data FROM scummvm_state ORDER BY sort_title, parent_part"):
+            yield json.loads(data)
+
+    def find(
+        self,
+        min_title_sim_ratio: float,
+        max_release_year: int,
+        scummvm_vers: Sequence[str],
+        in_ports: bool = False,
+        has_publisher: bool = True,
+    ) -> List[ScummvmStateEntry]:
+        query = (
+            "SELECT data FROM scummvm_state"  # nosec B608: only "?" are inlined
+            " WHERE title_sim_ratio > ? AND release_year < ? AND in_ports = ? AND has_publisher = ?"
+            f" AND scummvm_ver IN ({_placeholders(len(scummvm_vers))})"
+            " ORDER BY sort_title, parent_part"
+        )
+        params = (min_title_sim_ratio, max_release_year, int(in_ports), int(has_publisher), *scummvm_vers)
+        rows = [json.loads(data) for (data,) in self._conn.execute(query, params)]
+        # the store is only written by this tool
+        return get_codec(ScummvmStateEntry).load_many(rows, trusted=True)
+
+    def get_many(self, parent_parts: Sequence[str]) -> List[ScummvmStateEntry]:
+        keys = [state_key(parent_part) for parent_part in parent_parts]
+        found = []
+        for ix in range(0, len(keys), QUERY_KEYS):
+            chunk = keys[ix : ix + QUERY_KEYS]
+            query = (
+                "SELECT sort_title, parent_part, data FROM scummvm_state"  # nosec B608: only "?" are inlined
+                f" WHERE key IN ({_placeholders(len(chunk))})"
+            )
+            found += self._conn.execute(query, chunk).fetchall()
+        # python orders str like SQLite's binary collation orders their utf-8
+        found.sort(key=lambda row: (row[0], row[1]))
+        rows = [json.loads(data) for _, _, data in found]
+        return get_codec(ScummvmStateEntry).load_many(rows, trusted=True)
+
+    def export_json(self, json_path: Path) -> int:
+        """Write the state as the canonical json file, sorted like the store, an entry at a time.
+
+        The output is what ``json.dump(entries, f, indent=4)`` writes, the order comes from the store's index.
+        """
+        count = 0
+        with open(json_path, "w", encoding="utf-8") as f:
+            for entry in self.iter_dumped():
+                f.write(",\n    " if count else "[\n    ")
+                f.write(json.dumps(entry, indent=4).replace("\n", "\n    "))
+                count += 1
+            f.write("\n]" if count else "[]")
+        return count
+
+    def import_json(self, json_path: Path, replace: bool = True) -> int:
+        codec = get_codec(ScummvmStateEntry)
+        with open(json_path, "r", encoding="utf-8") as f:
+            # validate external input before it lands in the store
+            entries = (codec.dump(entry) for entry in codec.load_iter(iter_json_array(f), trusted=False))
+            if replace:
+                return self.replace_all(entries)
+            return self.upsert(entries)
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import (
+    dataclass,
+    field,
+)
+from pathlib import Path
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from lib.pipeline import run_pipeline
+
+SYNC_VERSION = 1
+COPY_CHUNK_SIZE = 1024 * 1024
+SYNC_JOBS = 8
+
+
+@dataclass
+class FileState:
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+# relative posix path -> state, of every file in a tree
+TreeFiles = Dict[str, FileState]
+
+
+def load_tree_manifest(path: Path) -> Optional[TreeFiles]:
+    """The files a tree manifest records, None if there is no (usable) manifest."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"WARNING: ignoring unreadable sync manifest {path}: {e}")
+        return None
+    if data.get("version") != SYNC_VERSION:
+        return None
+    return {rel_path: FileState(*state) for rel_path, state in data["files"].items()}
+
+
+def save_tree_manifest(path: Path, files: TreeFiles) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        data = {rel_path: [s.size, s.mtime_ns, s.sha256] for rel_path, s in sorted(files.items())}
+        json.dump({"version": SYNC_VERSION, "files": data}, f)
+    os.replace(tmp_path, path)
+
+
+def _file_digest(path: Path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def scan_tree(root: Path, known: TreeFiles) -> Tuple[TreeFiles, int]:
+    """States of the files under ``root`` and how many of them were hashed.
+
+    A file whose size and mtime match its ``known`` state keeps that state's hash, the others are read.
+    """
+    res = {}
+    hashed = 0
+    for dir_path, dir_names, file_names in os.walk(root):
+        dir_names.sort()
+        for name in sorted(file_names):
+            path = Path(dir_path) / name
+            rel_path = path.relative_to(root).as_posix()
+            st = path.stat()
+            state = known.get(rel_path)
+            if state is None or (state.size, state.mtime_ns) != (st.st_size, st.st_mtime_ns):
+                state = FileState(st.st_size, st.st_mtime_ns, _file_digest(path))
+                hashed += 1
+            res[rel_path] = state
+    return res, hashed
+
+
+def copy_file(src: Path, dst: Path) -> FileState:
+    """Copy ``src`` over ``dst`` atomically: into a temp file next to it, renamed once complete.
+
+    The copy keeps the source's mode and mtime, readers of ``dst`` see the old or the new file, never a part.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    sha = hashlib.sha256()
+    st = src.stat()
+    fd, tmp_name = tempfile.mkstemp(dir=dst.parent, prefix=f".{dst.name}.", suffix=".tmp")
+    try:
+        with open(src, "rb") as source, os.fdopen(fd, "wb") as target:
+            while chunk := source.read(COPY_CHUNK_SIZE):
+                sha.update(chunk)
+                target.write(chunk)
+        shutil.copymode(src, tmp_name)
+        os.utime(tmp_name, ns=(st.st_atime_ns, st.st_mtime_ns))
+        os.replace(tmp_name, dst)
+    except BaseException:
+        if os.path.exists(tmp_name):
+            os.unlink(tmp_name)
+        raise
+    return FileState(os.path.getsize(dst), st.st_mtime_ns, sha.hexdigest())
+
+
+@dataclass
+class SyncStats:
+    files: int = 0
+    bytes_written: int = 0
+    files_kept: int = 0
+    bytes_kept: int = 0
+    files_deleted: int = 0
+    failed: int = 0
+    seconds: float = 0.0
+
+    def __str__(self) -> str:
+        total = self.bytes_written + self.bytes_kept
+        saved = self.bytes_kept / total if total else 0.0
+        res = f"{self.files} files, {self.bytes_written / 2**20:.2f} MiB transferred in {self.seconds:.2f}s"
+        if self.bytes_written and self.seconds:
+            res += f" ({self.bytes_written / self.seconds / 2**20:.1f} MiB/s)"
+        return (
+            f"{res}, {self.files_kept} files up to date, {self.bytes_kept / 2**20:.2f} MiB ({saved:.0%}) saved, "
+            f"{self.files_deleted} deleted, {self.failed} failed"
+        )
+
+
+@dataclass
+class TreePlan:
+    """What it takes to make ``dst`` a copy of ``src``: the files to transfer and the stale ones to delete.
+
+    ``dst_files`` is what the target holds, the source state of every transferred file replaces its entry.
+    """
+
+    src: Path
+    dst: Path
+    manifest_path: Path
+    src_files: TreeFiles
+    dst_files: TreeFiles
+    copy: List[str] = field(default_factory=list)
+    delete: List[str] = field(default_factory=list)
+    hashed: int = 0
+
+
+def plan_tree(src: Path, dst: Path, manifest_path: Path, src_cache_path: Path, verify: bool = False) -> TreePlan:
+    """Compare the source tree with the target's manifest at ``manifest_path``.
+
+    Source hashes are cached at ``src_cache_path`` and only recomputed for files whose size or mtime changed.
+    The target is trusted to hold what its manifest says and isn't read; without a manifest (a tree copied
+    by hand) or with ``verify`` the target files are hashed instead, so identical files aren't transferred
+    again and damaged ones are.
+    """
+    if not src.is_dir():
+        raise FileNotFoundError(f"No source tree at {src}")
+    src_files, hashed = scan_tree(src, load_tree_manifest(src_cache_path) or {})
+    if hashed:
+        save_tree_manifest(src_cache_path, src_files)
+    dst_files = None if verify else load_tree_manifest(manifest_path)
+    if dst_files is None:
+        dst_files, dst_hashed = scan_tree(dst, {}) if dst.exists() else ({}, 0)
+        hashed += dst_hashed
+    plan = TreePlan(src, dst, manifest_path, src_files, dst_files, hashed=hashed)
+    for rel_path, state in src_files.items():
+        dst_state = dst_files.get(rel_path)
+        if dst_state is None or (dst_state.size, dst_state.sha256) != (state.size, state.sha256):
+            plan.copy.append(rel_path)
+    plan.delete = sorted(dst_files.keys() - src_files.keys())
+    return plan
+
+
+def _remove_empty_dirs(path: Path, root: Path) -> None:
+    while path != root:
+        try:
+            path.rmdir()
+        except OSError:
+            return
+        path = path.parent
+
+
+def sync_trees(plans: List[TreePlan], jobs: int = SYNC_JOBS) -> SyncStats:
+    """Carry out ``plans``: the files of all trees are transferred together on ``jobs`` threads.
+
+    Every tree's manifest is written once its files are done and records only what made it: a failed
+    transfer leaves the old target file and its entry in place, the next run retries it.
+    """
+    start = time.monotonic()
+    stats = SyncStats()
+    copies = [(plan, rel_path) for plan in plans for rel_path in plan.copy]
+    report = run_pipeline(copies, lambda c: copy_file(c[0].src / c[1], c[0].dst / c[1]), jobs=jobs)
+    for (plan, rel_path), state in report.done:
+        plan.dst_files[rel_path] = state
+        stats.files += 1
+        stats.bytes_written += state.size
+    for (plan, rel_path), error in report.failed:
+        print(f"ERROR: {plan.dst / rel_path}: {error}")
+    stats.failed = len(report.failed)
+    for plan in plans:
+        copied = set(plan.copy)
+        for rel_path in plan.src_files.keys() - copied:
+            stats.files_kept += 1
+            stats.bytes_kept += plan.src_files[rel_path].size
+        for rel_path in plan.delete:
+            path = plan.dst / rel_path
+            path.unlink(missing_ok=True)
+            _remove_empty_dirs(path.parent, plan.dst)
+            del plan.dst_files[rel_path]
+            stats.files_deleted += 1
+        save_tree_manifest(plan.manifest_path, plan.dst_files)
+    stats.seconds = time.monotonic() - start
+    return stats
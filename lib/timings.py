@@ -0,0 +1,236 @@
+import cProfile
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+
+class Phase:
+    def __init__(self, recorder: "Recorder", name: str, item: Optional[str]) -> None:
+        self._recorder = recorder
+        self.name = name
+        self.item = item
+        self.count: Optional[int] = None
+        self._child_peak = 0
+
+    def __enter__(self) -> "Phase":
+        self._recorder.stack().append(self)
+        tracemalloc.reset_peak()
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        peak = max(tracemalloc.get_traced_memory()[1], self._child_peak)
+        stack = self._recorder.stack()
+        stack.pop()
+        if stack:
+            stack[-1].add_child_peak(peak)
+        self._recorder.add(
+            {"name": self.name, "item": self.item, "wall": wall, "cpu": cpu, "peak_mem": peak, "count": self.count}
+        )
+
+    def add_child_peak(self, peak: int) -> None:
+        # a nested phase resets the tracemalloc peak, its own peak counts towards this one
+        self._child_peak = max(self._child_peak, peak)
+
+
+class StreamPhases:
+    """Times the stages of a stream, generators pulling items from one another, as a phase each.
+
+    The clock runs for the stage doing the work: while a stage waits for the next item of the stage it pulls
+    from, that one is charged. The ``with`` block itself is stage ``consumer``, set ``count`` for its items.
+    All stages report the peak memory of the whole stream.
+    """
+
+    def __init__(self, recorder: Optional["Recorder"], consumer: str) -> None:
+        self._recorder = recorder
+        self._consumer = consumer
+        self.count: Optional[int] = None
+        self._counts: Dict[str, int] = {}
+        self._wall: Dict[str, float] = {consumer: 0.0}
+        self._cpu: Dict[str, float] = {consumer: 0.0}
+        self._current = consumer
+        self._last_wall = 0.0
+        self._last_cpu = 0.0
+
+    def __enter__(self) -> "StreamPhases":
+        if self._recorder is not None:
+            tracemalloc.reset_peak()
+            self._last_wall = time.perf_counter()
+            self._last_cpu = time.process_time()
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        if self._recorder is None:
+            return
+        self._switch(self._consumer)
+        peak = tracemalloc.get_traced_memory()[1]
+        stack = self._recorder.stack()
+        if stack:
+            stack[-1].add_child_peak(peak)
+        for name, wall in self._wall.items():
+            count = self.count if name == self._consumer else self._counts[name]
+            self._recorder.add(
+                {"name": name, "item": None, "wall": wall, "cpu": self._cpu[name], "peak_mem": peak, "count": count}
+            )
+
+    def _switch(self, name: str) -> str:
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        self._wall[self._current] += wall - self._last_wall
+        self._cpu[self._current] += cpu - self._last_cpu
+        self._last_wall = wall
+        self._last_cpu = cpu
+        prev, self._current = self._current, name
+        return prev
+
+    def wrap(self, name: str, items: Iterable[T]) -> Iterable[T]:
+        """``items`` as stage ``name``, the time spent producing them is charged to it."""
+        if self._recorder is None:
+            return items
+        self._counts[name] = 0
+        self._wall[name] = 0.0
+        self._cpu[name] = 0.0
+        return self._timed(name, iter(items))
+
+    def _timed(self, name: str, items: Iterator[T]) -> Iterator[T]:
+        while True:
+            prev = self._switch(name)
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            finally:
+                self._switch(prev)
+            self._counts[name] += 1
+            yield item
+
+
+class _NoPhase:
+    # what phase() hands out while nothing is recorded, setting count on it is a no-op
+    count: Optional[int] = None
+
+    def __enter__(self) -> "_NoPhase":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        pass
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+class Recorder:
+    """Collects wall/CPU time, tracemalloc peak and item counts of the phases of a run.
+
+    CPU time is the process' (threads included, worker processes not). Peaks of phases running concurrently
+    on threads overlap.
+    """
+
+    def __init__(self) -> None:
+        self.phases: List[Dict[str, Any]] = []
+        self.peak_mem = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def stack(self) -> List[Phase]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack  # type: ignore[no-any-return]
+
+    def add(self, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self.phases.append(record)
+            self.peak_mem = max(self.peak_mem, record["peak_mem"])
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        res: Dict[str, Dict[str, Any]] = {}
+        for record in self.phases:
+            entry = res.setdefault(record["name"], {"calls": 0, "wall": 0.0, "cpu": 0.0, "peak_mem": 0, "count": 0})
+            entry["calls"] += 1
+            entry["wall"] += record["wall"]
+            entry["cpu"] += record["cpu"]
+            entry["peak_mem"] = max(entry["peak_mem"], record["peak_mem"])
+            entry["count"] += record["count"] or 0
+        return res
+
+
+_recorder: Optional[Recorder] = None
+
+
+def phase(name: str, item: Optional[str] = None) -> Any:
+    """Time the block as phase ``name``, costs a global lookup when no run is being recorded.
+
+    Set ``count`` on the returned object to report the items the phase handled.
+    """
+    if _recorder is None:
+        return _NO_PHASE
+    return Phase(_recorder, name, item)
+
+
+def stream_phases(consumer: str) -> StreamPhases:
+    """Time the stages of a stream as separate phases, see ``StreamPhases``; a no-op when nothing is recorded."""
+    return StreamPhases(_recorder, consumer)
+
+
+def run_recorded(command: str, func: Callable[[], T], timings_path: Optional[Path], profile_path: Optional[Path]) -> T:
+    """Run ``func``, writing the json timings report to ``timings_path`` ("-" for stdout) and cProfile stats
+    loadable with ``pstats`` to ``profile_path``.
+    """
+    global _recorder  # pylint: disable=global-statement
+    if timings_path is None and profile_path is None:
+        return func()
+    profiler = cProfile.Profile() if profile_path else None
+    if timings_path:
+        _recorder = Recorder()
+        tracemalloc.start()
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    try:
+        if profiler is not None:
+            return profiler.runcall(func)
+        return func()
+    finally:
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        if profiler is not None and profile_path is not None:
+            profiler.dump_stats(profile_path)
+            print(f"Profile written: {profile_path}", file=sys.stderr)
+        if _recorder is not None and timings_path is not None:
+            report = {
+                "command": command,
+                "wall": wall,
+                "cpu": cpu,
+                "peak_mem": max(tracemalloc.get_traced_memory()[1], _recorder.peak_mem),
+                "summary": _recorder.summary(),
+                "phases": _recorder.phases,
+            }
+            tracemalloc.stop()
+            _recorder = None
+            if str(timings_path) == "-":
+                json.dump(report, sys.stdout, indent=4)
+                print()
+            else:
+                with open(timings_path, "w", encoding="utf-8") as f:
+                    json.dump(report, f, indent=4)
+                print(f"Timings written: {timings_path}", file=sys.stderr)
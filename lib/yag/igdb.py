@@ -1,10 +1,10 @@
-import json
 from dataclasses import (
     field,
 )
 from pathlib import Path
 from typing import (
     ClassVar,
+    Iterator,
     List,
     Optional,
     Type,
@@ -13,6 +13,8 @@ from typing import (
 from marshmallow import Schema
 from marshmallow_dataclass import dataclass
 
+from lib.util import iter_json_array
+
 
 @dataclass
 class IgdbCompany:
@@ -30,32 +32,27 @@ class IgdbGame:
     Schema: ClassVar[Type[Schema]] = Schema  # pylint: disable=invalid-name
 
 
-def get_data(data_path: Path) -> List[IgdbGame]:
-    companies = []
+def iter_data(data_path: Path) -> Iterator[IgdbGame]:
+    companies_dict = {}
     with open(data_path / "igdb" / "companies.json", "r", encoding="utf-8") as jsonfile:
-        data = json.load(jsonfile)
-        for item in data:
-            companies.append(
-                IgdbCompany(
-                    id=item["id"],
-                    name=item["name"],
-                )
+        for item in iter_json_array(jsonfile):
+            company = IgdbCompany(
+                id=item["id"],
+                name=item["name"],
             )
-    companies_dict = {company.id: company.name for company in companies}
+            companies_dict[company.id] = company.name
 
-    games = []
     with open(data_path / "igdb" / "games.json", "r", encoding="utf-8") as jsonfile:
-        data = json.load(jsonfile)
-        for item in data:
+        for item in iter_json_array(jsonfile):
             publisher = next((comp for comp in item.get("involved_companies", []) if comp.get("publisher", True)), None)
-            games.append(
-                IgdbGame(
-                    slug=item.get("slug"),
-                    name=item["name"],
-                    publisher=companies_dict[publisher["company"]] if publisher else None,
-                    genres=[g["name"] for g in item.get("genres", [])],
-                    platforms=item.get("platforms", []),
-                )
+            yield IgdbGame(
+                slug=item.get("slug"),
+                name=item["name"],
+                publisher=companies_dict[publisher["company"]] if publisher else None,
+                genres=[g["name"] for g in item.get("genres", [])],
+                platforms=item.get("platforms", []),
             )
 
-    return games
+
+def get_data(data_path: Path) -> List[IgdbGame]:
+    return list(iter_data(data_path))
@@ -0,0 +1,235 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Literal,
+    Optional,
+)
+
+from lib.yag.igdb import (
+    IgdbGame,
+    iter_data,
+)
+
+MAGIC = b"EXOIGDB\0"
+SNAPSHOT_VERSION = 1
+SOURCE_FILES = ("companies.json", "games.json")
+# string columns, "title" is the lowercased name used for matching and lookups
+COLUMNS = ("slug", "name", "publisher", "title", "extra")
+# item formats of the array sections
+ArrayFormat = Literal["I", "Q"]
+_HEADER_LEN = struct.Struct("<I")
+
+
+def _fingerprint(data_path: Path) -> Dict[str, List[int]]:
+    res = {}
+    for name in SOURCE_FILES:
+        st = (data_path / "igdb" / name).stat()
+        res[name] = [st.st_size, st.st_mtime_ns]
+    return res
+
+
+class _Column:
+    def __init__(self) -> None:
+        self.offsets = array("Q", [0])
+        self.data = bytearray()
+
+    def append(self, value: str) -> None:
+        self.data += value.encode("utf-8")
+        self.offsets.append(len(self.data))
+
+
+def build_snapshot(data_path: Path, snapshot_path: Path) -> int:
+    """Compile the IGDB scrape in ``data_path`` into a snapshot file, returns the number of games.
+
+    The layout is a json header followed by 8-byte aligned sections: for every string column an offsets
+    array and a utf-8 blob, a publisher presence bitmap and two arrays of game ids sorted by title and by
+    slug for binary search lookups.
+    """
+    fingerprint = _fingerprint(data_path)
+    columns = {name: _Column() for name in COLUMNS}
+    has_publisher = bytearray()
+    by_title: Dict[str, int] = {}
+    by_slug: Dict[str, int] = {}
+    for ix, game in enumerate(iter_data(data_path)):
+        title = game.name.lower()
+        # IgdbGame.slug isn't optional, the rare game scraped without one reads back with an empty slug
+        columns["slug"].append(game.slug or "")
+        columns["name"].append(game.name)
+        columns["publisher"].append(game.publisher or "")
+        columns["title"].append(title)
+        columns["extra"].append(json.dumps([game.genres, game.platforms], separators=(",", ":")))
+        has_publisher.append(game.publisher is not None)
+        # later entries win, like they do in a dict keyed on the name
+        by_title[title] = ix
+        if game.slug:
+            by_slug[game.slug] = ix
+
+    sections: Dict[str, bytes] = {}
+    for name, column in columns.items():
+        sections[f"{name}.offsets"] = column.offsets.tobytes()
+        sections[f"{name}.data"] = bytes(column.data)
+    sections["publisher.present"] = bytes(has_publisher)
+    sections["title.index"] = array("I", (by_title[k] for k in sorted(by_title))).tobytes()
+    sections["slug.index"] = array("I", (by_slug[k] for k in sorted(by_slug))).tobytes()
+
+    offset = 0
+    layout = {}
+    for name, data in sections.items():
+        layout[name] = [offset, len(data)]
+        offset += (len(data) + 7) // 8 * 8
+    header = json.dumps(
+        {
+            "version": SNAPSHOT_VERSION,
+            "byteorder": sys.byteorder,
+            "count": len(has_publisher),
+            "source": fingerprint,
+            "sections": layout,
+        }
+    ).encode("utf-8")
+    header += b" " * (-(len(MAGIC) + _HEADER_LEN.size + len(header)) % 8)
+
+    snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = snapshot_path.with_name(snapshot_path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LEN.pack(len(header)))
+        f.write(header)
+        for data in sections.values():
+            f.write(data)
+            f.write(b"\0" * (-len(data) % 8))
+    os.replace(tmp_path, snapshot_path)
+    return len(has_publisher)
+
+
+class IgdbSnapshot:
+    """Read-only, memory mapped view of a snapshot written by ``build_snapshot()``.
+
+    Games are decoded lazily on access, so opening a snapshot only reads its header.
+    """
+
+    def __init__(self, snapshot_path: Path) -> None:
+        self.path = snapshot_path
+        with open(snapshot_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._buf = memoryview(self._mm)
+        self._views: List[memoryview] = [self._buf]
+        try:
+            if self._buf[: len(MAGIC)] != MAGIC:
+                raise ValueError(f"Not an IGDB snapshot: {snapshot_path}")
+            (header_len,) = _HEADER_LEN.unpack_from(self._buf, len(MAGIC))
+            base = len(MAGIC) + _HEADER_LEN.size
+            self.header = json.loads(bytes(self._buf[base : base + header_len]))
+            if self.header["version"] != SNAPSHOT_VERSION or self.header["byteorder"] != sys.byteorder:
+                raise ValueError(f"Incompatible IGDB snapshot: {snapshot_path}")
+            self._base = base + header_len
+            self._offsets = {name: self._section(f"{name}.offsets", "Q") for name in COLUMNS}
+            self._data = {name: self._section(f"{name}.data") for name in COLUMNS}
+            self._has_publisher = self._section("publisher.present")
+            self._title_index = self._section("title.index", "I")
+            self._slug_index = self._section("slug.index", "I")
+        except Exception:
+            self.close()
+            raise
+        self._titles: Optional[List[str]] = None
+
+    def _section(self, name: str, fmt: Optional[ArrayFormat] = None) -> memoryview:
+        offset, length = self.header["sections"][name]
+        view = self._buf[self._base + offset : self._base + offset + length]
+        if fmt is not None:
+            view = view.cast(fmt)
+        self._views.append(view)
+        return view
+
+    def close(self) -> None:
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._mm.close()
+
+    def __enter__(self) -> "IgdbSnapshot":
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return int(self.header["count"])
+
+    def _str(self, column: str, ix: int) -> str:
+        offsets = self._offsets[column]
+        return str(self._data[column][offsets[ix] : offsets[ix + 1]], "utf-8")
+
+    def _game(self, ix: int) -> IgdbGame:
+        genres, platforms = json.loads(self._str("extra", ix))
+        return IgdbGame(
+            slug=self._str("slug", ix),
+            name=self._str("name", ix),
+            publisher=self._str("publisher", ix) if self._has_publisher[ix] else None,
+            genres=genres,
+            platforms=platforms,
+        )
+
+    def __getitem__(self, ix: int) -> IgdbGame:
+        if ix < 0:
+            ix += len(self)
+        if not 0 <= ix < len(self):
+            raise IndexError("IGDB snapshot index out of range")
+        return self._game(ix)
+
+    def __iter__(self) -> Iterator[IgdbGame]:
+        return (self._game(ix) for ix in range(len(self)))
+
+    @property
+    def titles(self) -> List[str]:
+        """Lowercased game names in snapshot order, as used for title matching."""
+        if self._titles is None:
+            offsets = self._offsets["title"]
+            data = bytes(self._data["title"])
+            self._titles = [data[offsets[i] : offsets[i + 1]].decode("utf-8") for i in range(len(self))]
+        return self._titles
+
+    def find_by_name(self, name: str) -> Optional[IgdbGame]:
+        key = name.lower()
+        index = self._title_index
+        pos = bisect_left(index, key, key=lambda ix: self._str("title", ix))
+        if pos < len(index) and self._str("title", index[pos]) == key:
+            return self._game(index[pos])
+        return None
+
+    def find_by_slug(self, slug: str) -> Optional[IgdbGame]:
+        index = self._slug_index
+        pos = bisect_left(index, slug, key=lambda ix: self._str("slug", ix))
+        if pos < len(index) and self._str("slug", index[pos]) == slug:
+            return self._game(index[pos])
+        return None
+
+    def is_fresh(self, data_path: Path) -> bool:
+        try:
+            return bool(self.header["source"] == _fingerprint(data_path))
+        except FileNotFoundError:
+            # source is gone, the snapshot is all there is
+            return True
+
+
+def get_snapshot(data_path: Path, snapshot_path: Path, rebuild: bool = False) -> IgdbSnapshot:
+    """Open the IGDB snapshot, (re)building it first if it's missing or older than the scrape."""
+    if not rebuild and snapshot_path.exists():
+        try:
+            snapshot = IgdbSnapshot(snapshot_path)
+        except ValueError as e:
+            print(f"WARNING: rebuilding IGDB snapshot: {e}")
+        else:
+            if snapshot.is_fresh(data_path):
+                return snapshot
+            snapshot.close()
+    build_snapshot(data_path, snapshot_path)
+    return IgdbSnapshot(snapshot_path)
@@ -6,42 +6,25 @@ from typing import (
     Tuple,
 )
 
-import yaml
-
+from lib.blobstore import BlobStore
 from lib.cmd.ready import ScummvmStateEntry
 from lib.const import (
     SUPPORTED_DISTRO_FORMATS,
     SUPPORTED_PLATFORMS,
 )
 from lib.exo.dc import ScummvmMeta
+from lib.extract import ExtractStats
+from lib.manifest import ManifestStore
+from lib.pipeline import ByteBudget
 from lib.yag.scummvm import add_installer as scummvm_add_installer
 from lib.yag.scummvm import copy_game_data as scummvm_copy_game_data
+from lib.yag.scummvm import get_installer_path as scummvm_get_installer_path
 
 PORTS_DATA_DIR = Path(os.environ["PORTS_DATA_DIR"])
 PORTS_SRC_DIR = Path(os.environ["PORTS_SRC_DIR"])
 EXO_DATA_DIR = Path(os.environ["EXO_DATA_DIR"])
 
 
-def extract_yaml_data(file_path: str) -> Optional[dict]:
-    with open(file_path, "r", encoding="utf-8") as file:
-        try:
-            data = yaml.safe_load(file)
-            return data
-        except yaml.YAMLError as e:
-            print(f"Error reading {file_path}: {e}")
-            return None
-
-
-def get_ports_metadata(ports_src_path: Path) -> List:
-    res = []
-    for root, _, files in os.walk(ports_src_path / "ports" / "games" / ""):
-        for file in files:
-            if file.endswith(".yaml"):
-                file_path = os.path.join(root, file)
-                res.append(extract_yaml_data(file_path))
-    return res
-
-
 def candidate_priority(release: ScummvmMeta.Entity) -> Tuple[int, int]:
     preferred_platforms = SUPPORTED_PLATFORMS
     preferred_distro_formats = SUPPORTED_DISTRO_FORMATS
@@ -65,11 +48,18 @@ def get_best_release(releases: List[ScummvmMeta.Entity]) -> Optional[ScummvmMeta
     return None
 
 
-def add_scummvm_game(game: ScummvmStateEntry) -> None:
+def add_scummvm_game(
+    game: ScummvmStateEntry,
+    budget: Optional[ByteBudget] = None,
+    store: Optional[BlobStore] = None,
+    manifests: Optional[ManifestStore] = None,
+    verify: bool = False,
+) -> ExtractStats:
     release = get_best_release(game.releases)
 
     if release is None:
-        print(f"Suitable release not found for {game.releases}")
-        return
-    scummvm_add_installer(game, release)
-    scummvm_copy_game_data(game, release)
+        raise ValueError(f"Suitable release not found for {game.releases}")
+    # an existing installer belongs to a resumed game, a new one would change its ts_added
+    if not scummvm_get_installer_path(game).exists():
+        scummvm_add_installer(game, release)
+    return scummvm_copy_game_data(game, release, budget, store, manifests, verify)
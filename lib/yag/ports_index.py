@@ -0,0 +1,119 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import (
+    ClassVar,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
+
+import yaml
+from marshmallow import Schema
+from marshmallow_dataclass import dataclass
+
+from lib.cache import FileCache
+
+# libyaml's loader is several times faster, fall back to the pure python one when pyyaml is built without it
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# below this many changed files a process pool costs more than it saves
+PARALLEL_MIN_FILES = 64
+
+
+@dataclass
+class PortsRelease:
+    igdb_slug: str
+    year_released: Optional[int]
+    Schema: ClassVar[Type[Schema]] = Schema  # pylint: disable=invalid-name
+
+
+def _parse_release(path: Path) -> PortsRelease:
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.load(f, Loader=YamlLoader)  # nosec B506: a safe loader
+    try:
+        descr = data["descr"]
+        return PortsRelease(igdb_slug=descr["igdb_slug"], year_released=descr.get("year_released"))
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"missing descr/igdb_slug: {e}") from e
+
+
+def _parse_releases(paths: Sequence[Path]) -> List[Tuple[Optional[PortsRelease], Optional[str]]]:
+    res: List[Tuple[Optional[PortsRelease], Optional[str]]] = []
+    for path in paths:
+        try:
+            res.append((_parse_release(path), None))
+        except (OSError, UnicodeDecodeError, yaml.YAMLError, ValueError) as e:
+            res.append((None, f"{type(e).__name__}: {' '.join(str(e).split())}"))
+    return res
+
+
+class PortsIndex:
+    """igdb_slug (case-insensitive) -> release lookup over the release cards of the ports repo.
+
+    With several releases of one game the one with the last path in sorted order wins.
+    """
+
+    def __init__(self, releases: Sequence[Tuple[Path, PortsRelease]], errors: Sequence[Tuple[Path, str]]) -> None:
+        self.errors = list(errors)
+        self._by_slug: Dict[str, PortsRelease] = {}
+        for _, release in releases:
+            self._by_slug[release.igdb_slug.lower()] = release
+        self._count = len(releases)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get(self, igdb_slug: str) -> Optional[PortsRelease]:
+        return self._by_slug.get(igdb_slug.lower())
+
+    def __contains__(self, igdb_slug: object) -> bool:
+        return isinstance(igdb_slug, str) and igdb_slug.lower() in self._by_slug
+
+    def summary(self) -> str:
+        res = f"Ports index: {self._count} releases, {len(self._by_slug)} games, {len(self.errors)} malformed"
+        for path, error in self.errors:
+            res += f"\n  {path}: {error}"
+        return res
+
+
+def get_ports_index(ports_src_path: Path, cache: Optional[FileCache] = None, jobs: int = 1) -> PortsIndex:
+    """Build the ports index, only release cards changed since the cached run are parsed again."""
+    cache = cache or FileCache(None)
+    paths = sorted(
+        Path(root) / file
+        for root, _, files in os.walk(ports_src_path / "ports" / "games")
+        for file in files
+        if file.endswith(".yaml")
+    )
+    schema = PortsRelease.Schema()
+    parsed: Dict[Path, PortsRelease] = {}
+    changed = []
+    for path in paths:
+        release = cache.get(path, schema)
+        if release is None:
+            changed.append(path)
+        else:
+            parsed[path] = release
+
+    if jobs > 1 and len(changed) >= PARALLEL_MIN_FILES:
+        chunk_size = math.ceil(len(changed) / (jobs * 4))
+        chunks = [changed[i : i + chunk_size] for i in range(0, len(changed), chunk_size)]
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = [r for chunk_res in executor.map(_parse_releases, chunks) for r in chunk_res]
+    else:
+        results = _parse_releases(changed)
+
+    errors = []
+    for path, (release, error) in zip(changed, results):
+        if release is None:
+            errors.append((path, str(error)))
+            continue
+        parsed[path] = release
+        cache.put(path, schema, release)
+    cache.save()
+    return PortsIndex([(path, parsed[path]) for path in paths if path in parsed], errors)
@@ -1,17 +1,32 @@
 import os
+import shutil
 import stat
+import time
 import zipfile
 from datetime import datetime
 from pathlib import Path
+from typing import Optional
 
-import yaml
-
+from lib.blobstore import BlobStore
 from lib.cmd.ready import ScummvmStateEntry
 from lib.exo.dc import ScummvmMeta
-from lib.util import (
-    map_yag_platform,
-    template,
+from lib.extract import (
+    ExtractStats,
+    extract_prefix,
+)
+from lib.manifest import (
+    GameManifest,
+    ManifestStore,
+    is_intact,
+)
+from lib.pipeline import ByteBudget
+from lib.render import (
+    TemplateEngine,
+    dump_card,
+    get_engine,
+    load_card,
 )
+from lib.util import map_yag_platform
 
 PORTS_DATA_DIR = Path(os.environ["PORTS_DATA_DIR"])
 PORTS_SRC_DIR = Path(os.environ["PORTS_SRC_DIR"])
@@ -20,11 +35,57 @@ EXO_DATA_DIR = Path(os.environ["EXO_DATA_DIR"])
 GAME_LANG = "en"
 SCUMMVM_VER = "2.9.0"
 TZ = "America/Los_Angeles"
+SCUMMVM_INI_PARAMS = {
+    "filtering": "true",
+    "fullscreen": "true",
+    "subtitles": "true",
+}
 
 
-def add_installer(game: ScummvmStateEntry, release: ScummvmMeta.Entity) -> None:
-    with open(PORTS_SRC_DIR / "scripts" / "templates" / "release.yaml.tmpl", "r", encoding="utf-8") as f:
-        game_card = yaml.safe_load(f)
+def get_blob_store_path() -> Path:
+    return PORTS_DATA_DIR / "blobs"
+
+
+def get_manifest_store() -> ManifestStore:
+    return ManifestStore(PORTS_DATA_DIR / "manifests")
+
+
+def get_release_path(igdb_slug: str, uuid: str) -> Path:
+    return PORTS_SRC_DIR / "ports" / "games" / igdb_slug / f"{uuid}.yaml"
+
+
+def get_installer_path(game: ScummvmStateEntry) -> Path:
+    return get_release_path(game.igdb.slug, game.uuid)
+
+
+def get_app_dir(igdb_slug: str, uuid: str) -> Path:
+    return PORTS_DATA_DIR / "apps" / igdb_slug / uuid
+
+
+def get_game_dir(game: ScummvmStateEntry) -> Path:
+    return get_app_dir(game.igdb.slug, game.uuid)
+
+
+def get_sync_cache_path(igdb_slug: str, uuid: str) -> Path:
+    return PORTS_DATA_DIR / "sync" / igdb_slug / f"{uuid}.json"
+
+
+def remove_game(game: ScummvmStateEntry) -> None:
+    """Remove whatever a partial add left behind, so the game isn't mistaken for a ported one."""
+    get_manifest_store().remove(game.parent_part)
+    get_installer_path(game).unlink(missing_ok=True)
+    shutil.rmtree(get_game_dir(game), ignore_errors=True)
+    for path in (get_installer_path(game).parent, get_game_dir(game).parent):
+        if path.is_dir() and not any(path.iterdir()):
+            path.rmdir()
+
+
+def get_template_engine() -> TemplateEngine:
+    return get_engine(PORTS_SRC_DIR / "lib" / "scummvm" / "templates", EXO_DATA_DIR / "tmp" / "mako-modules")
+
+
+def gen_release_card(game: ScummvmStateEntry, release: ScummvmMeta.Entity) -> dict:
+    game_card = load_card(PORTS_SRC_DIR / "scripts" / "templates" / "release.yaml.tmpl")
     game_card["descr"]["distro"]["url"] = "exoscummvm"
     game_card["descr"]["distro"]["files"] = ["changeme"]
     game_card["descr"]["distro"]["format"] = release.distro_format or "changeme"
@@ -44,52 +105,109 @@ def add_installer(game: ScummvmStateEntry, release: ScummvmMeta.Entity) -> None:
     game_card["descr"]["year_released"] = game.release_year
     game_card["descr"]["uuid"] = game.uuid
     game_card["descr"]["ts_added"] = f'{datetime.now().strftime("%Y-%m-%d %H:%M:%S.%f %Z")}{TZ}'
-    yaml.SafeDumper.add_representer(
-        type(None), lambda dumper, value: dumper.represent_scalar("tag:yaml.org,2002:null", "")
-    )
-    install_script_dir = PORTS_SRC_DIR / "ports" / "games" / game.igdb.slug
-    install_script_dir.mkdir(parents=True, exist_ok=True)
-    with open(install_script_dir / f"{game.uuid}.yaml", "w", encoding="utf-8") as f:
-        yaml.safe_dump(game_card, f, default_flow_style=False)
+    return game_card
 
 
-def copy_run_scripts(game: ScummvmStateEntry, game_dir: Path) -> None:
-    tmpl_params = {
-        "filtering": "true",
-        "fullscreen": "true",
-        "subtitles": "true",
-    }
-    template(
-        PORTS_SRC_DIR / "lib" / "scummvm" / "templates" / "scummvm.ini.tmpl",
-        game_dir / "scummvm.ini",
-        params=tmpl_params,
-    )
+def add_installer(game: ScummvmStateEntry, release: ScummvmMeta.Entity) -> None:
+    installer_path = get_installer_path(game)
+    installer_path.parent.mkdir(parents=True, exist_ok=True)
+    dump_card(gen_release_card(game, release), installer_path)
+
 
-    tmpl_params = {
+def get_run_script_params(game: ScummvmStateEntry) -> dict:
+    return {
         "config": "scummvm.ini",
         "game": game.scummvm_game,
         "path": "./APP",
         "save_path": "./APP",
         "lang": GAME_LANG,
     }
+
+
+def copy_run_scripts(game: ScummvmStateEntry, game_dir: Path) -> None:
+    engine = get_template_engine()
+    engine.render_to("scummvm.ini.tmpl", game_dir / "scummvm.ini", params=SCUMMVM_INI_PARAMS)
     output_path = game_dir / "run.sh"
-    template(PORTS_SRC_DIR / "lib" / "scummvm" / "templates" / "run.sh.tmpl", output_path, params=tmpl_params)
+    engine.render_to("run.sh.tmpl", output_path, params=get_run_script_params(game))
     output_path.chmod(output_path.stat().st_mode | stat.S_IEXEC)
 
 
-def copy_game_data(game: ScummvmStateEntry, release: ScummvmMeta.Entity) -> None:
-    game_dir = PORTS_DATA_DIR / "apps" / game.igdb.slug / game.uuid
+def copy_game_data(
+    game: ScummvmStateEntry,
+    release: ScummvmMeta.Entity,
+    budget: Optional[ByteBudget] = None,
+    store: Optional[BlobStore] = None,
+    manifests: Optional[ManifestStore] = None,
+    verify: bool = False,
+) -> ExtractStats:
+    """Extract the release into the game's APP dir.
+
+    With ``manifests`` the game's manifest is marked incomplete while its files change, files it lists as
+    intact (checked by size and mtime, with ``verify`` by crc too) are kept and a game whose zip didn't
+    change since its manifest was completed isn't opened at all.
+    """
+    game_dir = get_game_dir(game)
     app_dir = game_dir / "APP"
     app_dir.mkdir(parents=True, exist_ok=True)
     zip_path = EXO_DATA_DIR / "eXoScummVM" / "eXo" / "eXoScummVM" / f"{game.parent_part}.zip"
-    zipped_file_prefix = f"{game.parent_part}/{release.child_part}/"
-    with zipfile.ZipFile(zip_path, "r") as zip_ref:
-        for member in zip_ref.namelist():
-            if member.startswith(zipped_file_prefix) and len(member) > len(zipped_file_prefix):
-                target_path = app_dir / member[len(zipped_file_prefix) :]
-                if member.endswith("/"):
-                    target_path.mkdir(parents=True, exist_ok=True)
-                else:
-                    with zip_ref.open(member) as source, open(target_path, "wb") as target:
-                        target.write(source.read())
+    prefix = f"{game.parent_part}/{release.child_part}/"
+    if manifests is None:
+        stats = extract_prefix(zip_path, prefix, app_dir, budget=budget, store=store)
+        copy_run_scripts(game, game_dir)
+        return stats
+
+    start = time.monotonic()
+    zip_st = zip_path.stat()
+    old = manifests.get(game.parent_part)
+    old_files = {}
+    same_release = old is not None and old.uuid == game.uuid and old.child_part == release.child_part
+    if old is not None and same_release:
+        old_files = old.files_by_path()
+        if (
+            old.complete
+            and (old.zip_size, old.zip_mtime_ns) == (zip_st.st_size, zip_st.st_mtime_ns)
+            and all(is_intact(record, app_dir / record.path, verify) for record in old.files)
+        ):
+            return ExtractStats(files_kept=len(old.files), seconds=time.monotonic() - start)
+
+    manifest = GameManifest(
+        parent_part=game.parent_part,
+        child_part=release.child_part,
+        igdb_slug=game.igdb.slug,
+        uuid=game.uuid,
+        zip_size=zip_st.st_size,
+        zip_mtime_ns=zip_st.st_mtime_ns,
+        complete=False,
+        files=list(old_files.values()),
+        # repairing files doesn't change the release, it stays published
+        published=old is not None and same_release and old.published,
+        announced=old is not None and same_release and old.announced,
+        unconfirmed=old.unconfirmed if old is not None and same_release else None,
+    )
+    manifests.put(manifest)
+
+    def keep(info: zipfile.ZipInfo, path: Path) -> bool:
+        record = old_files.get(info.filename[len(prefix) :])
+        return (
+            record is not None
+            and (record.size, record.crc) == (info.file_size, info.CRC)
+            and is_intact(record, path, verify)
+        )
+
+    stats = extract_prefix(zip_path, prefix, app_dir, budget=budget, store=store, keep=keep)
+    manifest.files = [
+        GameManifest.File(
+            path=info.filename[len(prefix) :],
+            size=info.file_size,
+            crc=info.CRC,
+            mtime_ns=path.stat().st_mtime_ns,
+        )
+        for info, path in stats.members
+    ]
+    # files of a previous version of the release that are gone from the zip
+    for rel_path in old_files.keys() - {record.path for record in manifest.files}:
+        (app_dir / rel_path).unlink(missing_ok=True)
     copy_run_scripts(game, game_dir)
+    manifest.complete = True
+    manifests.put(manifest)
+    return stats
@@ -0,0 +1,103 @@
+import struct
+import zipfile
+from typing import (
+    IO,
+    List,
+    Tuple,
+)
+
+# https://pkware.cachefly.net/webdocs/casestudies/APPNOTE.TXT, sections 4.3.12 to 4.3.16
+_EOCD = struct.Struct("<4s4H2LH")
+_EOCD_SIG = b"PK\x05\x06"
+_ZIP64_LOCATOR = struct.Struct("<4sLQL")
+_ZIP64_LOCATOR_SIG = b"PK\x06\x07"
+_ZIP64_EOCD = struct.Struct("<4sQ2H2L4Q")
+_ZIP64_EOCD_SIG = b"PK\x06\x06"
+_CD_ENTRY = struct.Struct("<4s4xH18x3H12x")
+_CD_ENTRY_SIG = b"PK\x01\x02"
+_MAX_COMMENT = 0xFFFF
+_UTF8_FLAG = 0x800
+_MENU = b"/menu.txt"
+
+
+def _read_at(f: IO[bytes], offset: int, size: int) -> bytes:
+    f.seek(offset)
+    data = f.read(size)
+    if len(data) != size:
+        raise zipfile.BadZipFile("Truncated file")
+    return data
+
+
+def _find_central_directory(f: IO[bytes]) -> Tuple[int, int, int]:
+    """Offset, size and entry count of the central directory, read from the (zip64) end records."""
+    file_size = f.seek(0, 2)
+    if file_size < _EOCD.size:
+        raise zipfile.BadZipFile("File is not a zip file")
+    # most archives have no comment, then the record is all there is to read
+    tail_size = _EOCD.size
+    tail = _read_at(f, file_size - tail_size, tail_size)
+    pos = 0
+    if not tail.startswith(_EOCD_SIG) or _EOCD.unpack(tail)[-1] != 0:
+        tail_size = min(file_size, _EOCD.size + _MAX_COMMENT)
+        tail = _read_at(f, file_size - tail_size, tail_size)
+        # the comment may contain the signature too, the record is the one whose comment ends the file
+        pos = tail.rfind(_EOCD_SIG, 0, len(tail) - _EOCD.size + len(_EOCD_SIG))
+        while pos >= 0 and _EOCD.unpack_from(tail, pos)[-1] != len(tail) - pos - _EOCD.size:
+            pos = tail.rfind(_EOCD_SIG, 0, pos)
+    if pos < 0:
+        raise zipfile.BadZipFile("File is not a zip file")
+    eocd_offset = file_size - tail_size + pos
+    _, _, _, _, count, cd_size, _, _ = _EOCD.unpack_from(tail, pos)
+    end_offset = eocd_offset
+    if eocd_offset >= _ZIP64_LOCATOR.size:
+        locator = _read_at(f, eocd_offset - _ZIP64_LOCATOR.size, _ZIP64_LOCATOR.size)
+        if locator.startswith(_ZIP64_LOCATOR_SIG):
+            zip64_offset = eocd_offset - _ZIP64_LOCATOR.size - _ZIP64_EOCD.size
+            if zip64_offset < 0:
+                raise zipfile.BadZipFile("Corrupt zip64 end of central directory locator")
+            record = _read_at(f, zip64_offset, _ZIP64_EOCD.size)
+            if not record.startswith(_ZIP64_EOCD_SIG):
+                raise zipfile.BadZipFile("Corrupt zip64 end of central directory record")
+            _, _, _, _, _, _, _, count, cd_size, _ = _ZIP64_EOCD.unpack(record)
+            end_offset = zip64_offset
+    # like zipfile, locate the directory relative to its end, so data prepended to the archive doesn't matter
+    cd_offset = end_offset - cd_size
+    if cd_offset < 0:
+        raise zipfile.BadZipFile("Bad offset for central directory")
+    return cd_offset, cd_size, count
+
+
+def release_names(f: IO[bytes]) -> List[str]:
+    """The directory entries up to depth 2 and the ``menu.txt`` files right below them, in archive order.
+
+    Reads only the end records and the central directory of the archive and decodes no other names, there is
+    no per-entry object like zipfile's ZipInfo. Enough for release discovery, where ``namelist()`` would build
+    and decode all of them.
+    """
+    cd_offset, cd_size, count = _find_central_directory(f)
+    cd = _read_at(f, cd_offset, cd_size)
+    unpack_entry = _CD_ENTRY.unpack_from
+    entry_size = _CD_ENTRY.size
+    res = []
+    pos = 0
+    for _ in range(count):
+        if pos + entry_size > cd_size:
+            raise zipfile.BadZipFile("Truncated central directory")
+        sig, flags, name_len, extra_len, comment_len = unpack_entry(cd, pos)
+        if sig != _CD_ENTRY_SIG:
+            raise zipfile.BadZipFile("Bad magic number for central directory")
+        start = pos + entry_size
+        end = start + name_len
+        pos = end + extra_len + comment_len
+        if cd.endswith(b"/", start, end):
+            name = cd[start:end]
+            if name.strip(b"/").count(b"/") > 1:
+                continue
+        elif cd.endswith(_MENU, start, end):
+            name = cd[start:end]
+            if name.strip(b"/").count(b"/") != 2:
+                continue
+        else:
+            continue
+        res.append(name.decode("utf-8" if flags & _UTF8_FLAG else "cp437"))
+    return res
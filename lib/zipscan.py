@@ -0,0 +1,98 @@
+import io
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import (
+    dataclass,
+    field,
+)
+from pathlib import Path
+from typing import (
+    IO,
+    Callable,
+    Generic,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+T = TypeVar("T")
+
+SCAN_WORKERS = 8
+
+
+class _CountingFile(io.FileIO):
+    bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:  # type: ignore[override]
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+@dataclass
+class ScanResult(Generic[T]):
+    path: Path
+    value: Optional[T] = None
+    error: Optional[str] = None
+    bytes_read: int = 0
+
+
+@dataclass
+class ScanStats:
+    files: int = 0
+    errors: List[Tuple[Path, str]] = field(default_factory=list)
+    bytes_read: int = 0
+    seconds: float = 0.0
+
+    def add(self, other: "ScanStats") -> None:
+        self.files += other.files
+        self.errors += other.errors
+        self.bytes_read += other.bytes_read
+        self.seconds += other.seconds
+
+    def __str__(self) -> str:
+        rate = self.files / self.seconds if self.seconds else 0.0
+        return (
+            f"{self.files} archives in {self.seconds:.2f}s ({rate:.1f} files/s), "
+            f"{self.bytes_read / 2**20:.2f} MiB read, {len(self.errors)} errors"
+        )
+
+
+ListZips = Callable[[Sequence[Path]], Tuple[List[ScanResult[List[str]]], ScanStats]]
+
+
+def _scan_one(path: Path, parse: Callable[[IO[bytes]], T]) -> ScanResult[T]:
+    try:
+        with _CountingFile(path, "r") as f:
+            try:
+                return ScanResult(path, value=parse(f), bytes_read=f.bytes_read)
+            except (zipfile.BadZipFile, zipfile.LargeZipFile, EOFError, ValueError, KeyError) as e:
+                return ScanResult(path, error=f"{type(e).__name__}: {e}", bytes_read=f.bytes_read)
+    except OSError as e:
+        return ScanResult(path, error=f"{type(e).__name__}: {e}")
+
+
+def scan_zips(
+    paths: Sequence[Path], parse: Callable[[IO[bytes]], T], workers: int = SCAN_WORKERS
+) -> Tuple[List[ScanResult[T]], ScanStats]:
+    """Run ``parse`` over the archives on a bounded thread pool.
+
+    Results come back in ``paths`` order. A corrupt, truncated or unreadable archive yields a result with
+    ``error`` set instead of raising, so one bad file doesn't abort a full scan.
+    """
+    start = time.monotonic()
+    if workers <= 1:
+        results = [_scan_one(path, parse) for path in paths]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda path: _scan_one(path, parse), paths))
+    stats = ScanStats(
+        files=len(results),
+        errors=[(r.path, r.error) for r in results if r.error is not None],
+        bytes_read=sum(r.bytes_read for r in results),
+        seconds=time.monotonic() - start,
+    )
+    return results, stats
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+# lib reads its data dirs and urls from the environment on import, tests point them at throwaway ones
+_DATA_DIR = tempfile.mkdtemp(prefix="exoconv-tests-")
+for _name in ("EXO_DATA_DIR", "PORTS_DATA_DIR", "PORTS_SRC_DIR", "SCRAPERS_DATA_DIR"):
+    os.environ.setdefault(_name, os.path.join(_DATA_DIR, _name.lower()))
+os.environ.setdefault("DISCORD_HOOK_YAG_NEW_RELEASES_CHANNEL", "http://127.0.0.1:9/webhook")
@@ -0,0 +1,91 @@
+import os
+import zipfile
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+from lib.blobstore import BlobStore
+from lib.extract import extract_prefix
+
+SHARED = b"shared between releases" * 100
+
+
+def _write_zip(path: Path, files: Dict[str, bytes]) -> None:
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("Game/", "")
+        for name, data in files.items():
+            z.writestr(f"Game/{name}", data)
+
+
+def _extract(tmp_path: Path, name: str, files: Dict[str, bytes], store: BlobStore) -> Path:
+    zip_path = tmp_path / f"{name}.zip"
+    _write_zip(zip_path, files)
+    dest = tmp_path / "apps" / name
+    dest.mkdir(parents=True)
+    extract_prefix(zip_path, "Game/", dest, store=store)
+    return dest
+
+
+@pytest.mark.unit
+def test_identical_members_share_one_blob(tmp_path: Path) -> None:
+    store = BlobStore(tmp_path / "blobs")
+    first = _extract(tmp_path, "first", {"SHARED.DAT": SHARED, "FIRST.DAT": b"first"}, store)
+    second = _extract(tmp_path, "second", {"DATA/SHARED.DAT": SHARED, "SECOND.DAT": b"second"}, store)
+    shared = (first / "SHARED.DAT").stat()
+    assert shared.st_ino == (second / "DATA" / "SHARED.DAT").stat().st_ino
+    # the blob and the two games
+    assert shared.st_nlink == 3
+    assert (first / "FIRST.DAT").stat().st_ino != (second / "SECOND.DAT").stat().st_ino
+    report = store.report()
+    assert report.blobs == 3 and report.unreferenced == 0
+    assert report.linked_bytes - report.stored_bytes == len(SHARED)
+
+
+@pytest.mark.unit
+def test_same_crc_and_size_with_other_content_gets_its_own_blob(tmp_path: Path) -> None:
+    store = BlobStore(tmp_path / "blobs")
+    first = _extract(tmp_path, "first", {"DATA.DAT": b"first content"}, store)
+    blob = next(iter(store._by_crc.items()))  # pylint: disable=protected-access
+    # what a CRC32 collision of two members of the same size looks like to the store
+    store._by_crc = {blob[0]: "0" * 64}  # pylint: disable=protected-access
+    (tmp_path / "blobs" / "00").mkdir()
+    (tmp_path / "blobs" / "00" / ("0" * 64)).write_bytes(b"other content")
+    second = _extract(tmp_path, "second", {"DATA.DAT": b"first content"}, store)
+    assert (second / "DATA.DAT").read_bytes() == b"first content"
+    assert (second / "DATA.DAT").stat().st_ino == (first / "DATA.DAT").stat().st_ino
+    assert (tmp_path / "blobs" / "00" / ("0" * 64)).read_bytes() == b"other content"
+
+
+@pytest.mark.unit
+def test_extracting_without_the_store_leaves_the_blobs_alone(tmp_path: Path) -> None:
+    store = BlobStore(tmp_path / "blobs")
+    first = _extract(tmp_path, "first", {"SHARED.DAT": SHARED}, store)
+    second = _extract(tmp_path, "second", {"SHARED.DAT": SHARED}, store)
+    _write_zip(tmp_path / "first.zip", {"SHARED.DAT": b"CHANGED CONTENT"})
+    extract_prefix(tmp_path / "first.zip", "Game/", first)
+    assert (first / "SHARED.DAT").read_bytes() == b"CHANGED CONTENT"
+    assert (second / "SHARED.DAT").read_bytes() == SHARED
+    assert (second / "SHARED.DAT").stat().st_nlink == 2
+
+
+@pytest.mark.unit
+def test_gc_removes_only_unreferenced_blobs(tmp_path: Path) -> None:
+    store = BlobStore(tmp_path / "blobs")
+    first = _extract(tmp_path, "first", {"SHARED.DAT": SHARED, "FIRST.DAT": b"first"}, store)
+    second = _extract(tmp_path, "second", {"SHARED.DAT": SHARED, "SECOND.DAT": b"second"}, store)
+    store.save()
+    for path in first.rglob("*"):
+        if path.is_file():
+            os.unlink(path)
+
+    assert store.gc(dry_run=True).unreferenced == 1
+    assert store.report().blobs == 3
+    report = store.gc()
+    assert (report.unreferenced, report.unreferenced_bytes) == (1, len(b"first"))
+    after = store.report()
+    assert (after.blobs, after.unreferenced) == (2, 0)
+    assert (second / "SHARED.DAT").read_bytes() == SHARED
+    assert (second / "SECOND.DAT").read_bytes() == b"second"
+    # the removed blob is gone from the index too, the next game storing it writes it again
+    assert len(BlobStore(tmp_path / "blobs")._by_crc) == 2  # pylint: disable=protected-access
@@ -0,0 +1,31 @@
+from typing import Optional
+
+import pytest
+
+from lib.classify import KeywordClassifier
+
+DISTRO_FORMATS = KeywordClassifier(["CD", "DVD", "Floppy"])
+PLATFORMS = KeywordClassifier(["Mac", "Macintosh", "DOS", "Amiga"])
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("Loom (DOS CD)", "CD"),
+        ("xcdvd", "DVD"),
+        ("Zak (Amiga Floppy)", "Floppy"),
+        ("Monkey Island", None),
+    ],
+)
+def test_longest_match_wins(text: str, expected: Optional[str]) -> None:
+    assert DISTRO_FORMATS.classify(text) == expected
+    assert DISTRO_FORMATS.classify_many([text, "x"]) == [expected, None]
+
+
+@pytest.mark.unit
+def test_result_does_not_depend_on_keyword_order() -> None:
+    texts = ["Loom (Macintosh CD)", "Loom (Mac CD)", "Loom (DOS Macintosh)", "Loom (Amiga DOS)"]
+    expected = ["Macintosh", "Mac", "Macintosh", "Amiga"]
+    assert PLATFORMS.classify_many(texts) == expected
+    assert KeywordClassifier(reversed(PLATFORMS.keywords)).classify_many(texts) == expected
@@ -0,0 +1,87 @@
+import asyncio
+from typing import (
+    Awaitable,
+    Callable,
+    TypeVar,
+)
+
+import pytest
+
+from bench.stub_server import (
+    WEBHOOK_PATH,
+    StubServer,
+)
+from lib.http import (
+    HttpClient,
+    RequestUncertain,
+)
+
+T = TypeVar("T")
+
+RELEASE_PATH = "/ports/apps/game/releases/0000"
+
+
+def _run(server: StubServer, func: Callable[[HttpClient], Awaitable[T]], retries: int = 5) -> T:
+    async def main() -> T:
+        await server.start()
+        try:
+            async with HttpClient(concurrency=4, retries=retries, backoff=0.01) as client:
+                return await func(client)
+        finally:
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+@pytest.mark.unit
+def test_unprocessed_posts_are_retried_on_kept_alive_connections() -> None:
+    server = StubServer(fail_rate=0.3, seed=1)
+
+    async def post_all(client: HttpClient) -> int:
+        for ix in range(20):
+            response = await client.request("POST", f"{server.url}/ports/apps/game/releases/{ix}", b"yaml")
+            assert response.status == 200
+        return client.stats.retries
+
+    retries = _run(server, post_all, retries=20)
+    assert retries == server.stats.failed > 0
+    assert len(server.stats.releases) == 20
+    assert server.stats.connections == 1
+
+
+@pytest.mark.unit
+def test_rate_limited_webhook_is_retried_after_retry_after() -> None:
+    server = StubServer(webhook_rate=50.0, webhook_burst=1)
+
+    async def post_all(client: HttpClient) -> None:
+        for ix in range(3):
+            await client.request("POST", server.url + WEBHOOK_PATH, str(ix).encode())
+
+    _run(server, post_all)
+    assert server.stats.limited > 0
+    assert server.stats.messages == [b"0", b"1", b"2"]
+
+
+@pytest.mark.unit
+def test_post_without_an_answer_is_not_sent_again() -> None:
+    server = StubServer(drop_rate=1.0)
+
+    async def post(client: HttpClient) -> None:
+        await client.request("POST", server.url + RELEASE_PATH, b"yaml")
+
+    with pytest.raises(RequestUncertain):
+        _run(server, post)
+    assert server.stats.releases == [(RELEASE_PATH, b"yaml")]
+
+
+@pytest.mark.unit
+def test_idempotent_post_without_an_answer_is_sent_again() -> None:
+    server = StubServer(drop_rate=0.5, seed=2)
+
+    async def post_all(client: HttpClient) -> None:
+        for _ in range(10):
+            await client.request("POST", server.url + RELEASE_PATH, b"yaml", idempotent=True)
+
+    _run(server, post_all, retries=20)
+    assert server.stats.dropped > 0
+    assert len(server.stats.releases) == server.stats.dropped + 10
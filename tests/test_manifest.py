@@ -0,0 +1,100 @@
+import os
+import zipfile
+from pathlib import Path
+from typing import Tuple
+
+import pytest
+
+from lib.cmd.dc import ScummvmStateEntry
+from lib.manifest import ManifestStore
+from lib.yag import scummvm
+
+PARENT_PART = "Loom (1990)"
+CHILD_PART = "Loom (DOS CD)"
+FILES = {f"DATA/DISK{ix}.LEC": bytes([ix]) * 4096 for ix in range(4)} | {"LOOM.EXE": b"MZ" * 100}
+
+
+@pytest.fixture(name="game")
+def fixture_game(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Tuple[ScummvmStateEntry, ManifestStore]:
+    for name in ("EXO_DATA_DIR", "PORTS_DATA_DIR", "PORTS_SRC_DIR"):
+        monkeypatch.setattr(scummvm, name, tmp_path / name.lower())
+    template_dir = tmp_path / "ports_src_dir" / "lib" / "scummvm" / "templates"
+    template_dir.mkdir(parents=True)
+    (template_dir / "scummvm.ini.tmpl").write_text("[scummvm]\n")
+    (template_dir / "run.sh.tmpl").write_text("#!/bin/sh\n")
+    zip_dir = tmp_path / "exo_data_dir" / "eXoScummVM" / "eXo" / "eXoScummVM"
+    zip_dir.mkdir(parents=True)
+    with zipfile.ZipFile(zip_dir / f"{PARENT_PART}.zip", "w", zipfile.ZIP_DEFLATED) as z:
+        for name, data in FILES.items():
+            z.writestr(f"{PARENT_PART}/{CHILD_PART}/{name}", data)
+    release = ScummvmStateEntry.Entity(CHILD_PART, True, "DOS", "CD", "loom", "2.7.0")
+    game = ScummvmStateEntry(
+        parent_part=PARENT_PART,
+        title="Loom",
+        publisher="Lucasfilm Games",
+        rating="E",
+        release_year=1990,
+        genre=["Adventure"],
+        releases=[release],
+        scummvm_game="loom",
+        scummvm_ver="2.7.0",
+        igdb=ScummvmStateEntry.IgdbMeta(slug="loom", name="Loom", title_sim_ratio=1.0, publisher="Lucasfilm Games"),
+        in_ports=False,
+        ports_year=None,
+    )
+    return game, scummvm.get_manifest_store()
+
+
+def _app_dir(game: ScummvmStateEntry) -> Path:
+    return scummvm.get_game_dir(game) / "APP"
+
+
+@pytest.mark.unit
+def test_interrupted_game_resumes_with_its_intact_files(game: Tuple[ScummvmStateEntry, ManifestStore]) -> None:
+    entry, manifests = game
+    stats = scummvm.copy_game_data(entry, entry.releases[0], manifests=manifests)
+    assert stats.files == len(FILES)
+    manifest = manifests.get(PARENT_PART)
+    assert manifest is not None and manifest.complete
+    assert sorted(f.path for f in manifest.files) == sorted(FILES)
+
+    # stopped partway: the manifest still lists the files written so far, one of them never made it to disk
+    manifest.complete = False
+    manifests.put(manifest)
+    (_app_dir(entry) / "DATA" / "DISK3.LEC").unlink()
+    stats = scummvm.copy_game_data(entry, entry.releases[0], manifests=manifests)
+    assert (stats.files, stats.files_kept) == (1, len(FILES) - 1)
+    assert (_app_dir(entry) / "DATA" / "DISK3.LEC").read_bytes() == FILES["DATA/DISK3.LEC"]
+    manifest = manifests.get(PARENT_PART)
+    assert manifest is not None and manifest.complete
+
+    # complete and unchanged, nothing is opened
+    stats = scummvm.copy_game_data(entry, entry.releases[0], manifests=manifests)
+    assert (stats.files, stats.files_kept) == (0, len(FILES))
+
+
+@pytest.mark.unit
+def test_corrupted_file_is_repaired_only_with_verify(game: Tuple[ScummvmStateEntry, ManifestStore]) -> None:
+    entry, manifests = game
+    scummvm.copy_game_data(entry, entry.releases[0], manifests=manifests)
+    manifest = manifests.get(PARENT_PART)
+    assert manifest is not None
+    manifest.published = True
+    manifest.unconfirmed = "announce"
+    manifests.put(manifest)
+    path = _app_dir(entry) / "DATA" / "DISK1.LEC"
+    st = path.stat()
+    path.write_bytes(b"\xff" * st.st_size)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    # size and mtime still match, only a crc check finds it
+    stats = scummvm.copy_game_data(entry, entry.releases[0], manifests=manifests)
+    assert stats.files == 0 and path.read_bytes() != FILES["DATA/DISK1.LEC"]
+
+    stats = scummvm.copy_game_data(entry, entry.releases[0], manifests=manifests, verify=True)
+    assert (stats.files, stats.files_kept) == (1, len(FILES) - 1)
+    assert path.read_bytes() == FILES["DATA/DISK1.LEC"]
+    manifest = manifests.get(PARENT_PART)
+    assert manifest is not None and manifest.complete
+    # a repair keeps the release published, and what publish doesn't know about it yet
+    assert manifest.published and not manifest.announced and manifest.unconfirmed == "announce"
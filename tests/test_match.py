@@ -0,0 +1,52 @@
+import random
+from pathlib import Path
+from typing import (
+    List,
+    Sequence,
+    Tuple,
+)
+
+import pytest
+
+from lib.match import (
+    MatchCache,
+    match_iter,
+)
+
+WORDS = ("quest", "king", "monkey", "island", "space", "loom", "day", "tentacle", "sam", "max", "full", "throttle")
+
+
+def _titles(rnd: random.Random, count: int) -> List[str]:
+    return list(dict.fromkeys(" ".join(rnd.sample(WORDS, rnd.randint(2, 4))) for _ in range(count)))
+
+
+def _match(queries: Sequence[str], corpus: Sequence[str], cache: MatchCache) -> List[Tuple[str, float]]:
+    cache.bind(corpus)
+    return [match for _, match in match_iter(queries, lambda q: q, corpus, chunk_size=16, cache=cache)]
+
+
+def _fresh(queries: Sequence[str], corpus: Sequence[str]) -> List[Tuple[str, float]]:
+    return [match for _, match in match_iter(queries, lambda q: q, corpus, chunk_size=16)]
+
+
+@pytest.mark.unit
+def test_cached_matches_equal_fresh_ones(tmp_path: Path) -> None:
+    rnd = random.Random(0)
+    corpus = _titles(rnd, 150)
+    queries = _titles(rnd, 100) + corpus[:20]
+    cache_path = tmp_path / "title-match-cache.json"
+
+    cache = MatchCache(cache_path)
+    assert _match(queries, corpus, cache) == _fresh(queries, corpus)
+    cache.save()
+
+    warm = MatchCache(cache_path)
+    assert _match(queries, corpus, warm) == _fresh(queries, corpus)
+    assert warm.stats.misses == 0
+
+    # titles added (some of them the queries themselves), removed and reordered
+    changed = corpus[40:] + queries[:15] + _titles(random.Random(1), 30) + corpus[:30][::-1]
+    changed = list(dict.fromkeys(changed))
+    rebound = MatchCache(cache_path)
+    assert _match(queries, changed, rebound) == _fresh(queries, changed)
+    assert rebound.stats.rescored > 0 and rebound.stats.dropped > 0
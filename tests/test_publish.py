@@ -0,0 +1,120 @@
+import asyncio
+import socket
+import uuid
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from bench.stub_server import (
+    WEBHOOK_PATH,
+    StubServer,
+)
+from lib.cmd import publish
+from lib.manifest import (
+    GameManifest,
+    ManifestStore,
+)
+
+GAMES = 10
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(name="manifests")
+def fixture_manifests(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> ManifestStore:
+    monkeypatch.setattr(publish, "get_release_path", lambda slug, game_uuid: tmp_path / slug / f"{game_uuid}.yaml")
+    store = ManifestStore(tmp_path / "manifests")
+    for ix in range(GAMES):
+        game = GameManifest(
+            parent_part=f"Game {ix} (1990)",
+            child_part=f"Game {ix} (1990) (DOS)",
+            igdb_slug=f"game-{ix}",
+            uuid=str(uuid.UUID(int=ix)),
+            zip_size=0,
+            zip_mtime_ns=0,
+            complete=True,
+            files=[],
+        )
+        release_path = publish.get_release_path(game.igdb_slug, game.uuid)
+        release_path.parent.mkdir(parents=True)
+        release_path.write_text(f"name: Game {ix}\n")
+        store.put(game)
+    return store
+
+
+def _server(
+    monkeypatch: pytest.MonkeyPatch, fail_rate: float = 0.0, drop_rate: float = 0.0, seed: int = 0
+) -> StubServer:
+    server = StubServer(
+        _free_port(), fail_rate=fail_rate, drop_rate=drop_rate, webhook_rate=100.0, webhook_burst=2, seed=seed
+    )
+    monkeypatch.setattr(publish, "PORTSVC_URL", server.url)
+    monkeypatch.setattr(publish, "DISCORD_HOOK_YAG_NEW_RELEASES_CHANNEL", server.url + WEBHOOK_PATH)
+    return server
+
+
+def _publish(
+    server: StubServer, manifests: ManifestStore, unconfirmed: publish.Unconfirmed = "skip"
+) -> publish.PublishReport:
+    async def main() -> publish.PublishReport:
+        await server.start()
+        try:
+            games = publish.get_pending(manifests, unconfirmed=unconfirmed)
+            return await publish.publish_games(games, manifests, unconfirmed=unconfirmed)
+        finally:
+            await server.stop()
+
+    return asyncio.run(main())
+
+
+def _posted(server: StubServer) -> List[str]:
+    return sorted(path for path, _ in server.stats.releases)
+
+
+@pytest.mark.integration
+def test_every_game_is_published_and_announced_once(manifests: ManifestStore, monkeypatch: pytest.MonkeyPatch) -> None:
+    server = _server(monkeypatch, fail_rate=0.2, seed=3)
+    report = _publish(server, manifests)
+    assert not report.failed and not report.unconfirmed
+    assert server.stats.failed > 0 and server.stats.limited > 0
+    assert _posted(server) == sorted(f"/ports/apps/{m.igdb_slug}/releases/{m.uuid}" for m in manifests)
+    assert len(server.stats.messages) == len(set(server.stats.messages)) == GAMES
+    assert all(m.published and m.announced for m in manifests)
+
+    rerun = _server(monkeypatch)
+    report = _publish(rerun, manifests)
+    assert not report.published and not report.announced
+    assert not rerun.stats.releases and not rerun.stats.messages
+
+
+@pytest.mark.integration
+def test_unanswered_steps_are_not_sent_again_until_resolved(
+    manifests: ManifestStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    server = _server(monkeypatch, drop_rate=0.3, seed=4)
+    report = _publish(server, manifests)
+    unconfirmed = {m.parent_part: m.unconfirmed for m in manifests if m.unconfirmed}
+    assert len(report.unconfirmed) == len(unconfirmed) == server.stats.dropped > 0
+    assert len(server.stats.releases) == GAMES
+    assert len(server.stats.messages) == len(report.announced) + len(
+        [step for step in unconfirmed.values() if step == "announce"]
+    )
+
+    # skipped by default
+    rerun = _server(monkeypatch)
+    _publish(rerun, manifests)
+    assert not rerun.stats.releases and not rerun.stats.messages
+
+    # the stub got them all, so taking them as done completes every game without sending anything twice
+    rerun = _server(monkeypatch)
+    report = _publish(rerun, manifests, "done")
+    assert not report.failed and not report.unconfirmed
+    assert all(m.published and m.announced and m.unconfirmed is None for m in manifests)
+    dropped_publishes = [part for part, step in unconfirmed.items() if step == "publish"]
+    assert not rerun.stats.releases
+    assert len(rerun.stats.messages) == len(dropped_publishes)
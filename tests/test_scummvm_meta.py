@@ -0,0 +1,93 @@
+import zipfile
+from pathlib import Path
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+import pytest
+
+from lib.exo.scummvm import (
+    SCUMMVM_TXT,
+    get_meta,
+)
+
+GAMES = {"Road Journey (1988)": "Road Journey (DOS DVD)", "Road Journey (1992)": "Road Journey (DOS DVD)"}
+
+
+def _write_collection(root: Path, scummvm_txt: List[Tuple[str, str]]) -> Path:
+    data_path = root / "exo"
+    game_dir = data_path / "eXoScummVM" / "eXo" / "eXoScummVM"
+    game_dir.mkdir(parents=True)
+    games = []
+    for parent_part, child_part in GAMES.items():
+        with zipfile.ZipFile(game_dir / f"{parent_part}.zip", "w") as z:
+            z.writestr(f"{parent_part}/", "")
+            z.writestr(f"{parent_part}/{child_part}/", "")
+            z.writestr(f"{parent_part}/{child_part}/GAME.EXE", b"MZ")
+        games.append(
+            f"<Game><RootFolder>eXo\\eXoScummVM\\!scummvm\\{parent_part}</RootFolder><Title>Road Journey</Title>"
+            "<Publisher>Company</Publisher><Rating>E</Rating><ReleaseYear>1990</ReleaseYear><Genre>Adventure</Genre>"
+            "</Game>"
+        )
+    content_dir = data_path / "eXoScummVM" / "Content"
+    content_dir.mkdir(parents=True)
+    with zipfile.ZipFile(content_dir / "XOScummVMMetadata.zip", "w") as z:
+        z.writestr("xml/all/ScummVM.xml", f"<LaunchBox>{''.join(games)}</LaunchBox>")
+        z.writestr("xml/all/ScummVM SVN.xml", "<LaunchBox></LaunchBox>")
+    util_dir = data_path / "eXoScummVM" / "eXo" / "util"
+    util_dir.mkdir(parents=True)
+    with zipfile.ZipFile(util_dir / "utilSVM.zip", "w") as z:
+        z.writestr("scummvm.txt", "".join(f"{name};{game_id};2.7.0\\scummvm.exe\r\n" for name, game_id in scummvm_txt))
+    return data_path
+
+
+def _release_ids(data_path: Path) -> Tuple[Dict[str, Optional[str]], List[str]]:
+    res, report = get_meta(data_path)
+    return {m.parent_part: m.releases[0].scummvm_game for m in res}, report.ambiguous[SCUMMVM_TXT]
+
+
+@pytest.mark.unit
+def test_shared_release_name_takes_the_line_of_its_own_game(tmp_path: Path) -> None:
+    data_path = _write_collection(
+        tmp_path,
+        [
+            ("Road Journey (1988)", "rj109"),
+            ("Road Journey (DOS DVD)", "rj109"),
+            ("Road Journey (1992)", "rj181"),
+            ("Road Journey (DOS DVD)", "rj181"),
+        ],
+    )
+    assert _release_ids(data_path) == ({"Road Journey (1988)": "rj109", "Road Journey (1992)": "rj181"}, [])
+
+
+@pytest.mark.unit
+def test_shared_release_name_falls_back_to_the_line_after_its_game(tmp_path: Path) -> None:
+    data_path = _write_collection(
+        tmp_path,
+        [
+            ("Road Journey (1988)", "rj109"),
+            ("Road Journey (DOS DVD)", "rjdos"),
+            ("Road Journey (1992)", "rj181"),
+            ("Road Journey (DOS DVD)", "rjdvd"),
+        ],
+    )
+    assert _release_ids(data_path) == ({"Road Journey (1988)": "rjdos", "Road Journey (1992)": "rjdvd"}, [])
+
+
+@pytest.mark.unit
+def test_shared_release_name_that_cant_be_told_apart_is_left_out(tmp_path: Path) -> None:
+    data_path = _write_collection(
+        tmp_path,
+        [
+            ("Road Journey (1988)", "rj109"),
+            ("Road Journey (DOS DVD)", "rjdos"),
+            ("Road Journey (DOS DVD)", "rjdvd"),
+            ("Road Journey (1992)", "rj181"),
+        ],
+    )
+    ids, ambiguous = _release_ids(data_path)
+    assert ids == {"Road Journey (1988)": None, "Road Journey (1992)": None}
+    assert ambiguous == ["Road Journey (1988)/Road Journey (DOS DVD)", "Road Journey (1992)/Road Journey (DOS DVD)"]
@@ -0,0 +1,90 @@
+import json
+import sqlite3
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from lib.cmd.dc import ScummvmStateEntry
+from lib.codec import get_codec
+from lib.state import StateStore
+
+
+def _entry(parent_part: str, title: str, ratio: float = 0.9, ver: str = "2.7.0") -> dict:
+    entry = ScummvmStateEntry(
+        parent_part=parent_part,
+        title=title,
+        publisher="Company",
+        rating="E",
+        release_year=1990,
+        genre=["Adventure"],
+        releases=[
+            ScummvmStateEntry.Entity(f"{title} (DOS CD)", True, "DOS", "CD", "game", ver),
+        ],
+        scummvm_game="game",
+        scummvm_ver=ver,
+        igdb=ScummvmStateEntry.IgdbMeta(slug=title.lower(), name=title, title_sim_ratio=ratio, publisher="Company"),
+        in_ports=False,
+        ports_year=None,
+    )
+    return get_codec(ScummvmStateEntry).dump(entry)
+
+
+ENTRIES = [
+    _entry("Zak (1988)", "Zak"),
+    _entry("Loom (1990)", "Loom", ratio=0.5),
+    _entry("Äpfel (1992)", "Äpfel"),
+    _entry("Loom (1992)", "Loom", ver="2.8.0"),
+    _entry("Straße (1993)", "Straße"),
+]
+
+
+def _dumped(entries: List[dict]) -> str:
+    # what ready wrote before the state moved to SQLite
+    with_order = sorted(entries, key=lambda e: (e["title"].lower(), e["parent_part"]))
+    return json.dumps(with_order, indent=4)
+
+
+@pytest.mark.unit
+def test_state_round_trips_through_json(tmp_path: Path) -> None:
+    with StateStore(tmp_path / "state.db") as store:
+        assert store.replace_all(iter(ENTRIES)) == len(store) == len(ENTRIES)
+        found = store.find(0.8, 2000, ["2.7.0"])
+        assert sorted(e.parent_part for e in found) == sorted(["Zak (1988)", "Äpfel (1992)", "Straße (1993)"])
+        assert [e.parent_part for e in store.get_many(["loom (1992)", "STRASSE (1993)", "missing"])] == [
+            "Loom (1992)",
+            "Straße (1993)",
+        ]
+        assert store.export_json(tmp_path / "state.json") == len(ENTRIES)
+    exported = (tmp_path / "state.json").read_text(encoding="utf-8")
+    assert exported == _dumped(ENTRIES)
+
+    with StateStore(tmp_path / "imported.db") as store:
+        assert store.import_json(tmp_path / "state.json") == len(ENTRIES)
+        store.export_json(tmp_path / "reexported.json")
+    assert (tmp_path / "reexported.json").read_text(encoding="utf-8") == exported
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("twin", ["LOOM (1990)", "Strasse (1993)"])
+def test_duplicate_keys_are_refused(tmp_path: Path, twin: str) -> None:
+    with StateStore(tmp_path / "state.db") as store:
+        store.replace_all(ENTRIES)
+        with pytest.raises(ValueError, match="Duplicate state entry"):
+            store.replace_all(ENTRIES + [_entry(twin, "Twin")])
+        assert len(store) == len(ENTRIES)
+        # an upsert replaces the entry of the same key
+        assert store.upsert([_entry(twin, "Twin")]) == 1
+        assert len(store) == len(ENTRIES)
+
+
+@pytest.mark.unit
+def test_old_keys_are_migrated(tmp_path: Path) -> None:
+    with StateStore(tmp_path / "state.db") as store:
+        store.replace_all(ENTRIES)
+    with sqlite3.connect(tmp_path / "state.db") as conn:
+        conn.execute("UPDATE scummvm_state SET key = lower(parent_part)")
+        conn.execute("PRAGMA user_version = 1")
+    conn.close()
+    with StateStore(tmp_path / "state.db") as store:
+        assert [e.parent_part for e in store.get_many(["STRASSE (1993)"])] == ["Straße (1993)"]
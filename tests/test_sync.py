@@ -0,0 +1,99 @@
+import os
+import shutil
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+from lib.cmd import go
+from lib.manifest import (
+    GameManifest,
+    ManifestStore,
+)
+from lib.sync import (
+    SyncStats,
+    copy_file,
+    plan_tree,
+    sync_trees,
+)
+
+
+def _write_tree(root: Path, files: Dict[str, bytes]) -> None:
+    for rel_path, data in files.items():
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+
+def _tree(root: Path) -> Dict[str, bytes]:
+    return {path.relative_to(root).as_posix(): path.read_bytes() for path in root.rglob("*") if path.is_file()}
+
+
+def _push(tmp_path: Path) -> SyncStats:
+    plan = plan_tree(tmp_path / "src", tmp_path / "dst", tmp_path / "dst.json", tmp_path / "src.json")
+    return sync_trees([plan], jobs=2)
+
+
+@pytest.mark.unit
+def test_push_transfers_changes_and_deletes_stale_files(tmp_path: Path) -> None:
+    _write_tree(tmp_path / "src", {"RUN.SH": b"run", "APP/DATA/A.DAT": b"a" * 100, "APP/OLD/B.DAT": b"b"})
+    stats = _push(tmp_path)
+    assert (stats.files, stats.files_kept) == (3, 0)
+    assert _tree(tmp_path / "dst") == _tree(tmp_path / "src")
+
+    stats = _push(tmp_path)
+    assert (stats.files, stats.files_kept, stats.files_deleted) == (0, 3, 0)
+    assert "MiB/s" not in str(stats)
+
+    (tmp_path / "src" / "APP" / "DATA" / "A.DAT").write_bytes(b"c" * 100)
+    shutil.rmtree(tmp_path / "src" / "APP" / "OLD")
+    stats = _push(tmp_path)
+    assert (stats.files, stats.files_kept, stats.files_deleted) == (1, 1, 1)
+    assert _tree(tmp_path / "dst") == _tree(tmp_path / "src")
+    # the directory the stale file was in went with it
+    assert not (tmp_path / "dst" / "APP" / "OLD").exists()
+
+
+@pytest.mark.unit
+def test_copy_replaces_the_target_atomically(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    _write_tree(tmp_path, {"src/A.DAT": b"new", "dst/A.DAT": b"old"})
+    old_inode = (tmp_path / "dst" / "A.DAT").stat().st_ino
+    copy_file(tmp_path / "src" / "A.DAT", tmp_path / "dst" / "A.DAT")
+    # renamed into place, not written into the old file
+    assert (tmp_path / "dst" / "A.DAT").stat().st_ino != old_inode
+    assert os.listdir(tmp_path / "dst") == ["A.DAT"]
+
+    def fail(*args: object) -> None:
+        raise OSError("disk full")
+
+    (tmp_path / "src" / "A.DAT").write_bytes(b"newer")
+    monkeypatch.setattr(shutil, "copymode", fail)
+    with pytest.raises(OSError):
+        copy_file(tmp_path / "src" / "A.DAT", tmp_path / "dst" / "A.DAT")
+    # a failed copy leaves the previous file and no temp file behind
+    assert os.listdir(tmp_path / "dst") == ["A.DAT"]
+    assert (tmp_path / "dst" / "A.DAT").read_bytes() == b"new"
+
+
+@pytest.mark.unit
+def test_dry_run_changes_nothing(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture
+) -> None:
+    manifests = ManifestStore(tmp_path / "manifests")
+    for ix, complete in enumerate((True, False)):
+        game = GameManifest(f"Game {ix} (1990)", f"Game {ix} (DOS)", f"game-{ix}", f"uuid-{ix}", 0, 0, complete, [])
+        manifests.put(game)
+        _write_tree(tmp_path / "apps" / game.igdb_slug / game.uuid, {"APP/GAME.EXE": b"MZ", "run.sh": b"run"})
+    monkeypatch.setattr(go, "get_manifest_store", lambda: manifests)
+    monkeypatch.setattr(go, "get_app_dir", lambda slug, game_uuid: tmp_path / "apps" / slug / game_uuid)
+    monkeypatch.setattr(go, "get_sync_cache_path", lambda slug, game_uuid: tmp_path / "sync" / slug / game_uuid)
+
+    target = tmp_path / "target"
+    go.run(target, jobs=2, dry_run=True)
+    assert not target.exists()
+    assert "game-0/uuid-0: 2 to transfer, 0 to delete" in capsys.readouterr().out
+
+    go.run(target, jobs=2)
+    # games steady didn't finish aren't pushed
+    assert _tree(target / "game-0" / "uuid-0") == {"APP/GAME.EXE": b"MZ", "run.sh": b"run"}
+    assert not (target / "game-1").exists()
@@ -0,0 +1,91 @@
+import zipfile
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from lib.zipdir import release_names
+from lib.zipscan import scan_zips
+
+GAME = "Ritter (1995)"
+RELEASES = ["Ritter (DOS CD)", "Ritter (Windows)", "Ritter: Übersetzung (Mac)", "リッター (PC-98)"]
+
+
+def _expected(names: List[str]) -> List[str]:
+    # what release discovery needs from namelist(): directories up to depth 2 and the menus right below them
+    return [
+        name
+        for name in names
+        if (name.endswith("/") and name.strip("/").count("/") <= 1)
+        or (name.endswith("/menu.txt") and name.strip("/").count("/") == 2)
+    ]
+
+
+def _write_game(path: Path, comment: bytes = b"", extra_files: int = 0) -> None:
+    with zipfile.ZipFile(path, "w") as z:
+        z.writestr(f"{GAME}/", "")
+        for release in RELEASES:
+            z.writestr(f"{GAME}/{release}/", "")
+            z.writestr(f"{GAME}/{release}/menu.txt", "1) Play\n")
+            z.writestr(f"{GAME}/{release}/DATA/", "")
+            z.writestr(f"{GAME}/{release}/DATA/menu.txt", "not a release menu")
+            z.writestr(f"{GAME}/{release}/GAME.EXE", b"MZ")
+        for ix in range(extra_files):
+            z.writestr(f"{GAME}/{RELEASES[0]}/DATA/FILE{ix:05d}.DAT", b"")
+        z.comment = comment
+
+
+def _release_names(path: Path) -> List[str]:
+    with open(path, "rb") as f:
+        return release_names(f)
+
+
+def _namelist(path: Path) -> List[str]:
+    with zipfile.ZipFile(path) as z:
+        return z.namelist()
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("comment", [b"", b"a comment", b"PK\x05\x06 looks like an end record" + bytes(30)])
+def test_release_names_match_zipfile(tmp_path: Path, comment: bytes) -> None:
+    # zipfile takes the last signature in the tail for the end record, so it's asked about the same archive
+    # without the comment
+    plain = tmp_path / "plain.zip"
+    _write_game(plain)
+    path = tmp_path / f"{GAME}.zip"
+    _write_game(path, comment)
+    names = _release_names(path)
+    assert names == _expected(_namelist(plain))
+    assert f"{GAME}/リッター (PC-98)/menu.txt" in names
+
+
+@pytest.mark.unit
+def test_release_names_of_a_zip64_archive(tmp_path: Path) -> None:
+    path = tmp_path / f"{GAME}.zip"
+    _write_game(path, extra_files=70000)
+    with open(path, "rb") as f:
+        # zipfile switches to the zip64 end records past 65535 entries
+        assert b"PK\x06\x06" in f.read()[-200:]
+    assert _release_names(path) == _expected(_namelist(path))
+
+
+@pytest.mark.unit
+def test_prepended_data_is_skipped(tmp_path: Path) -> None:
+    path = tmp_path / f"{GAME}.zip"
+    _write_game(path)
+    data = path.read_bytes()
+    path.write_bytes(b"MZ self-extractor stub" + data)
+    assert _release_names(path) == _expected(_namelist(path))
+
+
+@pytest.mark.unit
+def test_truncated_archive_is_a_scan_error(tmp_path: Path) -> None:
+    good = tmp_path / "good.zip"
+    _write_game(good)
+    truncated = tmp_path / "truncated.zip"
+    truncated.write_bytes(good.read_bytes()[:-30])
+    results, stats = scan_zips([truncated, good], release_names, workers=2)
+    assert [r.path for r in results] == [truncated, good]
+    assert results[0].value is None and results[0].error
+    assert results[1].error is None and results[1].value == _expected(_namelist(good))
+    assert stats.files == 2 and [path for path, _ in stats.errors] == [truncated]